@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -49,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primeiro da lista para medir a requisição inteira (latência, consultas, Server-Timing)
+    'barbershop.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -88,6 +91,30 @@ DATABASES = {
     }
 }
 
+# Modo de produção do SQLite (opcional): WAL, busy_timeout e demais PRAGMAs, conexões
+# persistentes e BEGIN IMMEDIATE. Ative com BARBERAPP_SQLITE_PRODUCTION=1.
+# Detalhes e valores em barbershop/database.py.
+SQLITE_PRODUCTION_MODE = os.environ.get('BARBERAPP_SQLITE_PRODUCTION') == '1'
+
+if SQLITE_PRODUCTION_MODE:
+    from barbershop.database import PRODUCTION_DATABASE_OPTIONS
+
+    DATABASES['default'].update(PRODUCTION_DATABASE_OPTIONS)
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Memória local por padrão. Em produção com vários processos, prefira um cache
+# compartilhado (Redis/Memcached/banco) para que as invalidações valham para todos;
+# o relatório do caixa (cashier_cache.py) só é guardado em um cache compartilhado.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'barberapp',
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -124,6 +151,14 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# `manage.py collectstatic` grava os arquivos com hash no nome e cópias .gz, servidos
+# com cache imutável por barbershop.staticfiles.serve_static
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'barbershop.staticfiles.CompressedManifestStaticFilesStorage'},
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
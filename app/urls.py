@@ -1,10 +1,15 @@
 # app/urls.py
 
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include 
 
+from barbershop.staticfiles import serve_static
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     # Esta linha é a chave para o roteamento do seu app
     path('', include('barbershop.urls', namespace='barbershop')), 
+    # Arquivos estáticos do collectstatic (com hash, pré-comprimidos); em DEBUG o runserver serve antes
+    path(f"{settings.STATIC_URL.lstrip('/')}<path:path>", serve_static, name='static'),
 ]
\ No newline at end of file
@@ -1,16 +1,34 @@
 # barbershop/admin.py
 
 from django.contrib import admin
+from django.db import transaction
+
 from . import models
+from .search import matching_ids
+from .summary import apply_service_changes, snapshot_service, snapshot_services
+
+class IndexedSearchMixin:
+    """Busca do admin pelo índice de palavras (search.py) em vez de LIKE '%termo%' nos search_fields."""
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        ids = matching_ids(self.search_kind, search_term)
+        if ids is None:
+            return queryset.none(), False
+        return queryset.filter(pk__in=ids), False
+
 
 # 1. Defina uma classe de Admin para o seu modelo Service (opcional, mas bom)
-class ServiceAdmin(admin.ModelAdmin):
+class ServiceAdmin(IndexedSearchMixin, admin.ModelAdmin):
     # Campos que serão exibidos na lista de serviços no painel admin
     list_display = ('client_name', 'display_service_types', 'barber', 'price', 'appointment_datetime', 'payment_method', 'payment_date')
     # Campos que podem ser usados para filtrar
     list_filter = ('barber', 'payment_method', 'service_types')
-    # Campos que podem ser pesquisados
-    search_fields = ('client_name', 'service_types__name')
+    # Campos que podem ser pesquisados (pelo índice de busca: nome do cliente e tipos)
+    search_fields = ('client_name', 'service_types_label')
+    search_kind = 'service'
     
     # Define a ordem dos campos no formulário de edição/criação
     fieldsets = (
@@ -19,15 +37,91 @@ class ServiceAdmin(admin.ModelAdmin):
     )
 
     def display_service_types(self, obj):
-        """Cria uma string com os nomes dos serviços para o list_display."""
-        return ", ".join([st.name for st in obj.service_types.all()])
+        """Nomes dos serviços para o list_display (rótulo desnormalizado, sem consultar o M2M)."""
+        return obj.service_types_label
     
     display_service_types.short_description = 'Tipos de Serviço'
 
+    # Alterações feitas aqui também atualizam o resumo do caixa e os fechamentos guardados (summary.py)
+    def get_object(self, request, object_id, from_field=None):
+        obj = super().get_object(request, object_id, from_field)
+        if obj is not None:
+            obj._cashier_before = snapshot_service(obj)
+        return obj
+
+    def save_related(self, request, form, formsets, change):
+        # Depois do ManyToMany salvo, para o estado novo ter os tipos de serviço
+        super().save_related(request, form, formsets, change)
+        apply_service_changes([(getattr(form.instance, '_cashier_before', None), snapshot_service(form.instance))])
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            apply_service_changes([(snapshot_service(obj), None)])
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            apply_service_changes([(snapshot, None) for snapshot in snapshot_services(queryset)])
+            super().delete_queryset(request, queryset)
+
+
+class ArchivedServiceAdmin(admin.ModelAdmin):
+    """Serviços arquivados (comando archive_services): só consulta."""
+    list_display = ('client_name', 'service_types_label', 'barber', 'price', 'payment_method', 'payment_date', 'archived_at')
+    list_filter = ('barber', 'payment_method')
+    search_fields = ('client_name',)
+    date_hierarchy = 'payment_date'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    # Excluir daqui deixaria o resumo do caixa e os fechamentos guardados divergentes
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class ClientAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    list_display = ('name', 'phone_whatsapp')
+    search_fields = ('name', 'phone_whatsapp')
+    search_kind = 'client'
+
+
+class CommissionRuleAdmin(admin.ModelAdmin):
+    list_display = ('barber', 'service_type', 'percentage')
+    list_filter = ('barber', 'service_type')
+
+
+class PayoutLineInline(admin.TabularInline):
+    model = models.PayoutLine
+    extra = 0
+    can_delete = False
+    readonly_fields = ('service_type_name', 'services_count', 'gross', 'discount', 'net', 'percentage', 'commission')
+    exclude = ('service_type',)
+
+
+class PayoutStatementAdmin(admin.ModelAdmin):
+    """Fechamentos guardados de períodos encerrados (commissions.py): só consulta."""
+    list_display = ('barber', 'period', 'services_count', 'net', 'commission')
+    list_filter = ('barber',)
+    list_select_related = ('barber', 'period')
+    inlines = [PayoutLineInline]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 
 # 2. Registre o modelo Service
 admin.site.register(models.Service, ServiceAdmin)
-admin.site.register(models.Client)
+admin.site.register(models.ArchivedService, ArchivedServiceAdmin)
+admin.site.register(models.Client, ClientAdmin)
 admin.site.register(models.ServiceType)
+admin.site.register(models.CommissionRule, CommissionRuleAdmin)
+admin.site.register(models.PayoutStatement, PayoutStatementAdmin)
 
 # 3. Certifique-se de que não há código para 'Product' ou 'ProductAdmin'
\ No newline at end of file
@@ -0,0 +1,227 @@
+# barbershop/analytics.py
+"""
+Relatório de faturamento: tabelas dinâmicas por período (dia, semana ou mês), por
+barbeiro ou tipo de serviço, com uma coluna por forma de pagamento, e comparação
+com o período anterior de mesmo tamanho.
+
+Os números saem de uma única consulta agrupada com agregação condicional
+(Sum(..., filter=...) para cada forma de pagamento e Case para separar o período
+atual do anterior). Se o resumo diário do caixa (DailyCashierSummary) estiver
+preenchido ele é a fonte; senão a consulta é feita sobre Service (e o arquivo,
+ArchivedService) e Expense.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+from itertools import chain
+
+from django.contrib.auth.models import User
+from django.db.models import Case, Count, DateField, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Trunc
+
+from .catalog import get_catalog
+from .archive import reaches_archive
+from .models import PAYMENT_CHOICES, ArchivedService, DailyCashierSummary, Expense, Service
+from .utils import local_day_range
+
+BUCKETS = [('day', 'Dia'), ('week', 'Semana'), ('month', 'Mês')]
+DIMENSIONS = [('barber', 'Barbeiro'), ('service_type', 'Tipo de serviço'), ('none', 'Sem agrupamento')]
+
+ZERO = Decimal('0')
+CURRENT, PREVIOUS = 'current', 'previous'
+NO_ROW = Value(None, output_field=IntegerField())
+
+
+def previous_period(start, end):
+    """Período de mesmo tamanho imediatamente anterior a [start, end]."""
+    previous_end = start - timedelta(days=1)
+    return previous_end - (end - start), previous_end
+
+
+def _period(field, current_start):
+    return Case(When(**{f'{field}__gte': current_start}, then=Value(CURRENT)), default=Value(PREVIOUS))
+
+
+def _method_sums(field):
+    return {
+        f'method_{value}': Sum(field, filter=Q(payment_method=value), default=ZERO)
+        for value, _ in PAYMENT_CHOICES
+    }
+
+
+def _summary_groups(start, end, previous_start, bucket, dimension):
+    """Uma consulta sobre o resumo diário: receitas e despesas por período, bucket e linha."""
+    rows = DailyCashierSummary.objects.filter(date__gte=previous_start, date__lte=end)
+    # Por tipo de serviço as linhas por tipo formam a tabela e as linhas gerais
+    # (service_type nulo) os totais, tudo no mesmo agrupamento
+    if dimension != 'service_type':
+        rows = rows.filter(service_type__isnull=True)
+
+    return rows.values(
+        period=_period('date', start),
+        bucket=Trunc('date', bucket, output_field=DateField()),
+        row=F(f'{dimension}_id') if dimension != 'none' else NO_ROW,
+    ).annotate(
+        **_method_sums('income'),
+        income=Sum('income', default=ZERO),
+        services=Sum('services_count', default=0),
+        expenses=Sum('expenses', default=ZERO),
+    ).order_by()
+
+
+def _raw_groups(start, end, previous_start, bucket, dimension):
+    """Mesmo resultado de _summary_groups calculado sobre os serviços e despesas."""
+    lower, _ = local_day_range(previous_start, None)
+    current_lower, upper = local_day_range(start, end)
+    # Serviços arquivados (archive.py) entram quando o período alcança o arquivo
+    models = [Service, ArchivedService] if reaches_archive(lower) else [Service]
+
+    def service_groups(queryset, row):
+        return queryset.values(
+            period=_period('payment_date', current_lower),
+            bucket=Trunc('payment_date', bucket, output_field=DateField()),
+            row=row,
+        ).annotate(
+            **_method_sums('price'),
+            income=Sum('price', default=ZERO),
+            services=Count('id'),
+        ).order_by()
+
+    services = []
+    for model in models:
+        paid = model.objects.filter(payment_date__gte=lower, payment_date__lt=upper)
+        if dimension == 'service_type':
+            # Os totais não podem somar o mesmo serviço uma vez por tipo
+            services.append(service_groups(paid, NO_ROW))
+            services.append(service_groups(paid.filter(service_types__isnull=False), F('service_types__id')))
+        else:
+            services.append(service_groups(paid, NO_ROW if dimension == 'none' else F('barber_id')))
+    services = chain.from_iterable(services)
+
+    expenses = Expense.objects.filter(expense_date__gte=previous_start, expense_date__lte=end).values(
+        period=_period('expense_date', start),
+        bucket=Trunc('expense_date', bucket, output_field=DateField()),
+    ).annotate(expenses=Sum('value', default=ZERO)).order_by()
+
+    for group in services:
+        yield {**group, 'expenses': ZERO}
+    for group in expenses:
+        yield {**group, 'row': None, 'income': ZERO, 'services': 0, **{key: ZERO for key in _method_sums('price')}}
+
+
+def _row_labels(dimension, keys):
+    if dimension == 'barber':
+        names = dict(User.objects.filter(pk__in=[key for key in keys if key]).values_list('id', 'username'))
+        return {key: names.get(key, 'Sem barbeiro') for key in keys}
+    if dimension == 'service_type':
+        names = {service_type['id']: service_type['name'] for service_type in get_catalog()}
+        return {key: names.get(key, '—') for key in keys}
+    return {key: 'Total' for key in keys}
+
+
+def _change(current, previous):
+    """Variação percentual (None quando o período anterior é zero)."""
+    if not previous:
+        return None
+    return round((current - previous) * 100 / previous, 1)
+
+
+def _empty_totals():
+    return {'income': ZERO, 'expenses': ZERO, 'services': 0}
+
+
+def revenue_report(start, end, bucket='month', dimension='barber', source=None):
+    """
+    Faturamento de [start, end] (datas inclusivas) agrupado por `bucket` ('day',
+    'week', 'month') e `dimension` ('barber', 'service_type', 'none'), comparado com
+    o período anterior. `source` força 'summary' ou 'raw'; por padrão usa o resumo
+    do caixa se ele estiver preenchido.
+    """
+    previous_start, previous_end = previous_period(start, end)
+    if source is None:
+        source = 'summary' if DailyCashierSummary.objects.exists() else 'raw'
+    groups = _summary_groups if source == 'summary' else _raw_groups
+    methods = [value for value, _ in PAYMENT_CHOICES]
+
+    cells = {}
+    buckets = {}
+    by_row = {}
+    totals = {CURRENT: _empty_totals(), PREVIOUS: _empty_totals()}
+
+    for group in groups(start, end, previous_start, bucket, dimension):
+        period = group['period']
+        # Por tipo de serviço, os grupos sem tipo dão os totais e os demais a tabela
+        is_total = dimension != 'service_type' or group['row'] is None
+        is_cell = (group['income'] or group['services']) and (dimension != 'service_type' or group['row'] is not None)
+
+        if is_total:
+            totals[period]['income'] += group['income']
+            totals[period]['services'] += group['services']
+            totals[period]['expenses'] += group['expenses']
+        if is_cell:
+            row_totals = by_row.setdefault(group['row'], {CURRENT: ZERO, PREVIOUS: ZERO})
+            row_totals[period] += group['income']
+        if period != CURRENT:
+            continue
+
+        if is_total:
+            bucket_totals = buckets.setdefault(group['bucket'], _empty_totals())
+            bucket_totals['income'] += group['income']
+            bucket_totals['services'] += group['services']
+            bucket_totals['expenses'] += group['expenses']
+        if is_cell:
+            cell = cells.setdefault((group['bucket'], group['row']), {
+                'methods': dict.fromkeys(methods, ZERO), 'income': ZERO, 'services': 0,
+            })
+            for method in methods:
+                cell['methods'][method] += group[f'method_{method}']
+            cell['income'] += group['income']
+            cell['services'] += group['services']
+
+    labels = _row_labels(dimension, list(by_row))
+    for period_totals in totals.values():
+        period_totals['net'] = period_totals['income'] - period_totals['expenses']
+
+    return {
+        'start': start,
+        'end': end,
+        'previous_start': previous_start,
+        'previous_end': previous_end,
+        'bucket': bucket,
+        'dimension': dimension,
+        'source': source,
+        'rows': sorted(
+            (
+                {
+                    'bucket': bucket_start,
+                    'label': labels[row],
+                    'methods': [cell['methods'][method] for method in methods],
+                    'income': cell['income'],
+                    'services': cell['services'],
+                }
+                for (bucket_start, row), cell in cells.items()
+            ),
+            key=lambda item: (item['bucket'], item['label']),
+        ),
+        'buckets': [
+            {'bucket': bucket_start, **values, 'net': values['income'] - values['expenses']}
+            for bucket_start, values in sorted(buckets.items())
+        ],
+        'comparison': sorted(
+            (
+                {
+                    'label': labels[row],
+                    'current': values[CURRENT],
+                    'previous': values[PREVIOUS],
+                    'change': _change(values[CURRENT], values[PREVIOUS]),
+                }
+                for row, values in by_row.items()
+            ),
+            key=lambda item: -item['current'],
+        ),
+        'totals': totals[CURRENT],
+        'previous_totals': totals[PREVIOUS],
+        'changes': {
+            key: _change(totals[CURRENT][key], totals[PREVIOUS][key]) for key in ('income', 'expenses', 'net', 'services')
+        },
+    }
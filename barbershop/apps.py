@@ -1,8 +1,23 @@
 # barbershop/apps.py
 
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
 
 class BarbershopConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     # Renomeie esta linha para 'barbershop'
-    name = 'barbershop'
\ No newline at end of file
+    name = 'barbershop'
+
+    def ready(self):
+        # Registra os sinais (rótulo desnormalizado dos tipos de serviço)
+        from . import signals  # noqa: F401
+
+        # Métricas por requisição: mede as consultas de toda conexão aberta (metrics.py)
+        from .metrics import install_sql_wrapper
+        connection_created.connect(install_sql_wrapper, dispatch_uid='barbershop_request_metrics')
+
+        # PRAGMAs do modo de produção do SQLite em cada conexão nova
+        if getattr(settings, 'SQLITE_PRODUCTION_MODE', False):
+            from .database import configure_sqlite
+            connection_created.connect(configure_sqlite, dispatch_uid='barbershop_configure_sqlite')
@@ -0,0 +1,77 @@
+# barbershop/archive.py
+"""
+Arquivo de serviços pagos antigos.
+
+O comando `archive_services` move os serviços pagos antes de uma data de corte (e
+suas linhas do ManyToMany de tipos) da tabela Service para ArchivedService, em lotes
+e uma transação por lote. Assim a agenda, o admin e as consultas do dia a dia
+trabalham sobre uma tabela pequena.
+
+Os serviços arquivados continuam contando no caixa: o resumo diário não muda, e a
+lista/exportação do caixa e o relatório de faturamento incluem o arquivo quando o
+período filtrado alcança a data do serviço arquivado mais recente (archived_until).
+"""
+
+from django.db import transaction
+from django.db.models import Max
+
+from .changefeed import without_tombstones
+from .models import ArchivedService, Service
+
+ARCHIVE_BATCH_SIZE = 500
+
+# Campos copiados de Service para ArchivedService (inclui o id)
+ARCHIVED_FIELDS = [field.attname for field in ArchivedService._meta.concrete_fields if field.name != 'archived_at']
+
+ServiceTypesThrough = Service.service_types.through
+ArchivedTypesThrough = ArchivedService.service_types.through
+
+
+def archived_until():
+    """Data/hora de pagamento do serviço arquivado mais recente (None se o arquivo estiver vazio)."""
+    return ArchivedService.objects.aggregate(latest=Max('payment_date'))['latest']
+
+
+def reaches_archive(lower):
+    """Se um período que começa em `lower` (datetime, None = sem limite) inclui serviços arquivados."""
+    latest = archived_until()
+    return latest is not None and (lower is None or lower <= latest)
+
+
+def archivable_services(cutoff):
+    return Service.objects.filter(payment_date__isnull=False, payment_date__lt=cutoff)
+
+
+def archive_batch(cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    """Move um lote de serviços pagos antes de `cutoff` para o arquivo. Devolve quantos moveu."""
+    with transaction.atomic():
+        ids = list(archivable_services(cutoff).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return 0
+
+        services = Service.objects.filter(pk__in=ids).values(*ARCHIVED_FIELDS)
+        ArchivedService.objects.bulk_create([ArchivedService(**values) for values in services])
+        type_rows = ServiceTypesThrough.objects.filter(service_id__in=ids).values_list('service_id', 'servicetype_id')
+        ArchivedTypesThrough.objects.bulk_create([
+            ArchivedTypesThrough(archivedservice_id=service_id, servicetype_id=service_type_id)
+            for service_id, service_type_id in type_rows
+        ])
+
+        # O resumo do caixa continua valendo para os arquivados, e para o feed de
+        # alterações eles não foram excluídos
+        ServiceTypesThrough.objects.filter(service_id__in=ids).delete()
+        with without_tombstones():
+            Service.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def archive_services(cutoff, batch_size=ARCHIVE_BATCH_SIZE, log=None):
+    """Arquiva todos os serviços pagos antes de `cutoff`, lote a lote. Devolve o total movido."""
+    total = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        if not moved:
+            return total
+        total += moved
+        if log:
+            log(f"  {total:,} serviços arquivados")
@@ -0,0 +1,174 @@
+# barbershop/async_views.py
+"""
+Versões assíncronas do caixa e da exportação CSV, para uso sob ASGI (app/asgi.py).
+
+O ORM assíncrono do Django (aaggregate, async for...) encaminha todas as consultas
+para uma única thread (sync_to_async com thread_sensitive=True), ou seja, elas
+continuam em fila. Para que as consultas independentes do caixa (totais, receitas
+da página, despesas da página, barbeiros, catálogo) rodem de fato ao mesmo tempo,
+cada uma é executada em uma thread própria, com sua própria conexão ao banco
+(run_concurrently). O resultado é o mesmo das views síncronas em views.py.
+"""
+
+import asyncio
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.http import StreamingHttpResponse
+from django.shortcuts import render
+from django.utils import timezone
+
+from .cashier_cache import REPORT_TIMEOUT, report_cache_key
+from .catalog import get_catalog
+from .pagination import keyset_after
+from .views import (
+    CSV_CHUNK_SIZE,
+    _CashierCsv,
+    _cashier_context,
+    _cashier_page_querysets,
+    _cashier_querysets,
+    _expense_sort_time,
+    _get_cashier_filters,
+    _get_cashier_totals,
+    _merge_cashier_page,
+)
+
+
+def _isolated(func, *args):
+    """Executa func em uma thread do pool e libera a conexão dessa thread ao final."""
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+async def run_isolated(func, *args):
+    return await sync_to_async(_isolated, thread_sensitive=False)(func, *args)
+
+
+async def run_concurrently(*funcs):
+    """Executa funções síncronas (consultas ORM) em paralelo, cada uma com sua conexão."""
+    return await asyncio.gather(*(run_isolated(func) for func in funcs))
+
+
+def _list_barbers():
+    return list(User.objects.all().order_by('username'))
+
+
+@login_required
+async def daily_cashier_async(request):
+    """Caixa com as consultas independentes executadas em paralelo."""
+    params, filters = _get_cashier_filters(request)
+
+    # Obtém Receitas (services) e Despesas (expenses) — QuerySets ainda não avaliados
+    # (consulta só o limite do arquivo, para saber se ele entra nas receitas)
+    services_queries, expenses_query = await run_isolated(_cashier_querysets, filters)
+    cursor = request.GET.get('cursor')
+
+    cache_key = await sync_to_async(report_cache_key)(filters, cursor)
+    report = await cache.aget(cache_key) if cache_key else None
+
+    if report is None:
+        services_pages, expenses_page = _cashier_page_querysets(services_queries, expenses_query, cursor)
+        totals, expenses, service_types, barbers, *services = await run_concurrently(
+            partial(_get_cashier_totals, filters),
+            partial(list, expenses_page),
+            get_catalog,
+            _list_barbers,
+            *(partial(list, page) for page in services_pages),
+        )
+        page = _merge_cashier_page([service for chunk in services for service in chunk], expenses)
+        report = {'totals': totals, 'transactions': page.items, 'next_cursor': page.next_cursor}
+        if cache_key:
+            await cache.aset(cache_key, report, REPORT_TIMEOUT)
+    else:
+        service_types, barbers = await run_concurrently(get_catalog, _list_barbers)
+
+    context = _cashier_context(request, params, report, service_types, barbers)
+    return render(request, 'barbershop/daily_cashier.html', context)
+
+
+async def _aiter_keyset(queryset, fields, chunk_size=CSV_CHUNK_SIZE):
+    """
+    Percorre o queryset em ordem decrescente de `fields`, em blocos por keyset. O bloco
+    seguinte é buscado em paralelo (em outra thread) enquanto o atual é consumido.
+    """
+    ordering = [f'-{field}' for field in fields]
+
+    def fetch(after):
+        chunk = queryset
+        if after is not None:
+            chunk = chunk.filter(keyset_after(fields, after, descending=True))
+        return list(chunk.order_by(*ordering)[:chunk_size])
+
+    pending = asyncio.ensure_future(run_isolated(fetch, None))
+    while pending is not None:
+        chunk = await pending
+        pending = None
+        if len(chunk) == chunk_size:
+            after = [getattr(chunk[-1], field) for field in fields]
+            pending = asyncio.ensure_future(run_isolated(fetch, after))
+        for item in chunk:
+            yield item
+
+
+async def _amerge_desc(first, second, first_key, second_key):
+    """Intercala dois iteradores assíncronos já ordenados de forma decrescente (empates: o primeiro)."""
+    # Os primeiros blocos dos dois lados são buscados ao mesmo tempo
+    left, right = await asyncio.gather(anext(first, None), anext(second, None))
+    while left is not None or right is not None:
+        if right is None or (left is not None and first_key(left) >= second_key(right)):
+            yield False, left
+            left = await anext(first, None)
+        else:
+            yield True, right
+            right = await anext(second, None)
+
+
+def _payment_date(service):
+    return service.payment_date
+
+
+async def _aiter_services(services_queries):
+    """Receitas de todas as fontes (Service e arquivo) em uma única sequência decrescente."""
+    services = _aiter_keyset(services_queries[0], ('payment_date', 'id'))
+    for query in services_queries[1:]:
+        merged = _amerge_desc(services, _aiter_keyset(query, ('payment_date', 'id')), _payment_date, _payment_date)
+        services = (service async for _, service in merged)
+    async for service in services:
+        yield service
+
+
+async def _aiter_cashier_csv(services_queries, expenses_query):
+    """Mesmo conteúdo de views._iter_cashier_csv, lendo receitas e despesas em paralelo."""
+    rows = _CashierCsv()
+    yield rows.header()
+
+    transactions = _amerge_desc(
+        _aiter_services(services_queries),
+        _aiter_keyset(expenses_query, ('expense_date', 'id')),
+        _payment_date,
+        lambda e: _expense_sort_time(e.expense_date),
+    )
+    async for is_expense, obj in transactions:
+        yield rows.expense_row(obj) if is_expense else rows.service_row(obj)
+
+    yield rows.summary()
+
+
+@login_required
+async def export_cashier_csv_async(request):
+    """Exporta o caixa filtrado em CSV (streaming assíncrono)."""
+    _, filters = _get_cashier_filters(request)
+    services_queries, expenses_query = await run_isolated(_cashier_querysets, filters)
+
+    response = StreamingHttpResponse(
+        _aiter_cashier_csv(services_queries, expenses_query),
+        content_type='text/csv; charset=utf-8',
+    )
+    response['Content-Disposition'] = f'attachment; filename="caixa_{timezone.now().strftime("%Y-%m-%d")}.csv"'
+    return response
@@ -0,0 +1,213 @@
+# barbershop/benchmarks.py
+"""
+Utilitários compartilhados pelos comandos de benchmark (`manage.py bench_*`).
+
+Os benchmarks rodam sempre em um banco temporário, criado e migrado do zero, para
+nunca tocar no banco de dados real da barbearia.
+"""
+
+import os
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection, connections, transaction
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+from .models import PAYMENT_CHOICES, Client, Expense, Service, ServiceType
+from .search import rebuild_index
+from .summary import rebuild_summary
+from .utils import normalize_search_text
+
+# Nomes usados nos dados sintéticos
+SERVICE_TYPE_NAMES = ['Corte', 'Barba', 'Sobrancelha', 'Pezinho', 'Hidratação', 'Pigmentação', 'Relaxamento', 'Luzes']
+SURNAMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Ferreira', 'Almeida', 'Araújo', 'Gomes']
+EXPENSE_DESCRIPTIONS = ['Aluguel', 'Energia', 'Água', 'Produtos', 'Limpeza', 'Internet', 'Manutenção']
+
+
+@contextmanager
+def isolated_database(path=None, verbosity=0):
+    """
+    Cria um banco de dados SQLite temporário em disco (migrado) e o descarta ao final.
+    Passe `path` para escolher o arquivo; por padrão usa um diretório temporário.
+    """
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix='barberapp-bench-'), 'bench.sqlite3')
+    connection.settings_dict.setdefault('TEST', {})['NAME'] = str(path)
+    old_name = connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity)
+
+
+def best_of(func, repeat=5):
+    """Executa `func` algumas vezes e devolve o menor tempo (em segundos) e o último resultado."""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def create_barbers(count):
+    barbers = []
+    for i in range(count):
+        barber = User.objects.filter(username=f'barbeiro{i}').first()
+        barbers.append(barber or User.objects.create_user(username=f'barbeiro{i}'))
+    return barbers
+
+
+def create_bench_services(count, barbers, days=365, batch_size=5000, seed=42, service_types=None, clients=None):
+    """
+    Insere `count` serviços distribuídos nos últimos `days` dias (≈80% pagos).
+    Usa bulk_create em lotes. Com `service_types`, cada serviço recebe de 1 a 3 tipos
+    (relação ManyToMany, preço e rótulo coerentes); sem eles, não cria as relações.
+    Com `clients` (lista de (id, nome)), cada serviço é de um desses clientes.
+    """
+    rng = random.Random(seed)
+    methods = [value for value, _ in PAYMENT_CHOICES]
+    Through = Service.service_types.through
+    now = timezone.now()
+    created = 0
+    while created < count:
+        batch = []
+        for _ in range(min(batch_size, count - created)):
+            appointment = now - timedelta(minutes=rng.randrange(days * 24 * 60))
+            paid = rng.random() < 0.8
+            chosen = rng.sample(service_types, min(rng.choice([1, 1, 2, 3]), len(service_types))) if service_types else []
+            client_id, client_name = rng.choice(clients) if clients else (None, f'Cliente {rng.randrange(100000)}')
+            service = Service(
+                client_name=client_name,
+                client_id=client_id,
+                barber=rng.choice(barbers),
+                price=sum((t.price for t in chosen), Decimal('0')) if chosen else Decimal(rng.choice([30, 45, 50, 70])),
+                appointment_datetime=appointment,
+                payment_method=rng.choice(methods) if paid else None,
+                payment_date=appointment + timedelta(minutes=40) if paid else None,
+                service_types_label=', '.join(t.name for t in chosen),
+            )
+            service.bench_types = chosen
+            batch.append(service)
+        with transaction.atomic():
+            Service.objects.bulk_create(batch)
+            Through.objects.bulk_create(
+                [Through(service_id=s.pk, servicetype_id=t.pk) for s in batch for t in s.bench_types],
+                batch_size=batch_size,
+            )
+        created += len(batch)
+    return created
+
+
+def create_service_types(count, seed=42):
+    """Cria `count` tipos de serviço (os primeiros com nomes reais, os demais numerados)."""
+    rng = random.Random(seed)
+    names = [SERVICE_TYPE_NAMES[i] if i < len(SERVICE_TYPE_NAMES) else f'Serviço {i + 1}' for i in range(count)]
+    return [
+        ServiceType.objects.create(
+            name=name,
+            price=Decimal(rng.choice([10, 20, 30, 45, 60])),
+            estimated_time=rng.choice([10, 20, 30, 45]),
+        )
+        for name in names
+    ]
+
+
+def create_clients(count, batch_size=5000, seed=42):
+    """Insere `count` clientes (com os campos de busca que Client.save() preencheria)."""
+    rng = random.Random(seed)
+    created = 0
+    while created < count:
+        batch = []
+        for i in range(created, min(created + batch_size, count)):
+            name = f'Cliente {i} {rng.choice(SURNAMES)}'
+            phone = f'119{rng.randrange(10**8):08d}'
+            batch.append(Client(
+                name=name, phone_whatsapp=phone, search_name=normalize_search_text(name), phone_digits=phone,
+            ))
+        Client.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+def create_expenses(count, days=365, batch_size=5000, seed=42):
+    """Insere `count` despesas distribuídas nos últimos `days` dias."""
+    rng = random.Random(seed)
+    today = timezone.localdate()
+    created = 0
+    while created < count:
+        batch = [
+            Expense(
+                description=rng.choice(EXPENSE_DESCRIPTIONS),
+                value=Decimal(rng.randrange(1000, 50000)) / 100,
+                expense_date=today - timedelta(days=rng.randrange(days)),
+            )
+            for _ in range(min(batch_size, count - created))
+        ]
+        Expense.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+def seed_database(services, barbers=8, clients=None, service_types=8, expenses=None, years=2, seed=42, log=None):
+    """
+    Popula o banco com dados sintéticos coerentes (clientes dos serviços, relação
+    ManyToMany, rótulos, campos e índice de busca, resumo do caixa). Por padrão gera 1 cliente a cada 5 serviços e
+    1 despesa a cada 50. Devolve {'barbers', 'service_types', 'clients', 'services', 'expenses'}.
+    """
+    log = log or (lambda message: None)
+    days = max(1, int(years * 365))
+    clients = services // 5 if clients is None else clients
+    expenses = services // 50 if expenses is None else expenses
+
+    barber_list = create_barbers(barbers)
+    type_list = create_service_types(service_types, seed)
+    log(f"{clients:,} clientes...")
+    create_clients(clients, seed=seed)
+    log(f"{services:,} serviços em {days} dias...")
+    client_list = list(Client.objects.values_list('id', 'name'))
+    create_bench_services(services, barber_list, days=days, seed=seed, service_types=type_list, clients=client_list)
+    log(f"{expenses:,} despesas...")
+    create_expenses(expenses, days=days, seed=seed)
+    log("Resumo do caixa...")
+    rebuild_summary()
+    log("Índice de busca...")
+    rebuild_index()
+    return {
+        'barbers': barber_list,
+        'service_types': type_list,
+        'clients': clients,
+        'services': services,
+        'expenses': expenses,
+    }
+
+
+@contextmanager
+def simulated_latency(seconds):
+    """
+    Acrescenta `seconds` de espera a cada consulta, em todas as conexões (inclusive as
+    abertas por outras threads durante o bloco), simulando um banco remoto.
+    """
+    def wrapper(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def attach(sender, connection, **kwargs):
+        connection.execute_wrappers.append(wrapper)
+
+    for conn in connections.all(initialized_only=True):
+        conn.execute_wrappers.append(wrapper)
+    connection_created.connect(attach, weak=False)
+    try:
+        yield
+    finally:
+        connection_created.disconnect(attach)
+        for conn in connections.all(initialized_only=True):
+            if wrapper in conn.execute_wrappers:
+                conn.execute_wrappers.remove(wrapper)
@@ -0,0 +1,122 @@
+# barbershop/cashier_cache.py
+"""
+Cache do relatório do caixa (totais + página de transações).
+
+A chave de cada relatório combina os filtros normalizados, o cursor da página, a
+versão do catálogo e um contador de geração para cada dia do período. Quando um
+serviço é pago/editado/excluído ou uma despesa é lançada, summary.py incrementa a
+geração apenas dos dias afetados: só os relatórios que cobrem esses dias deixam de
+ser encontrados, os demais continuam válidos.
+
+Só vale com um cache compartilhado entre os processos (Redis, Memcached, banco,
+arquivos): com LocMemCache, que é por processo, um pagamento invalidaria apenas as
+cópias do processo que o registrou e os demais mostrariam totais antigos por até
+REPORT_TIMEOUT. Nesse caso (e com DummyCache) o relatório é calculado a cada acesso.
+"""
+
+import hashlib
+import json
+import time
+from datetime import timedelta
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from .catalog import catalog_version
+
+DAY_GENERATION_KEY = 'barbershop:cashier:day:{day}'
+EPOCH_KEY = 'barbershop:cashier:epoch'
+REPORT_KEY = 'barbershop:cashier:report:{digest}'
+REPORT_TIMEOUT = 600
+
+# Períodos maiores que isso (ou sem data inicial/final) não são guardados em cache
+MAX_CACHED_DAYS = 366
+
+
+def _day_key(day):
+    return DAY_GENERATION_KEY.format(day=day.isoformat())
+
+
+def _generation(key):
+    value = cache.get(key)
+    if value is None:
+        # Valor inicial baseado no relógio: se o contador for despejado do cache,
+        # o novo valor nunca coincide com o usado por relatórios antigos
+        cache.add(key, time.time_ns(), None)
+        value = cache.get(key, 0)
+    return value
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def day_generations(start, end):
+    """Geração atual de cada dia de start a end (inclusive)."""
+    keys = [_day_key(start + timedelta(days=offset)) for offset in range((end - start).days + 1)]
+    generations = cache.get_many(keys)
+    missing = [key for key in keys if key not in generations]
+    for key in missing:
+        generations[key] = _generation(key)
+    return [generations[key] for key in keys]
+
+
+def invalidate_days(days):
+    """Invalida os relatórios que cobrem algum dos dias informados."""
+    for day in set(days):
+        _bump(_day_key(day))
+
+
+def invalidate_all():
+    """Invalida todos os relatórios (ex.: após reconstruir o resumo do caixa)."""
+    _bump(EPOCH_KEY)
+
+
+def is_shared_cache():
+    """O cache padrão é visto por todos os processos (não é memória local nem o cache nulo)."""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def reports_epoch():
+    """
+    Geração global dos relatórios (muda com invalidate_all(), ex.: barbeiro renomeado),
+    ou None se o cache não for compartilhado, já que o valor seria diferente em cada processo.
+    """
+    return _generation(EPOCH_KEY) if is_shared_cache() else None
+
+
+def report_cache_key(filters, cursor):
+    """
+    Chave do relatório para os filtros normalizados, ou None se o período não for
+    cacheável ou o cache não for compartilhado.
+    """
+    if not is_shared_cache():
+        return None
+    start, end = filters['start'], filters['end']
+    if not start or not end or end < start or (end - start).days >= MAX_CACHED_DAYS:
+        return None
+
+    payload = json.dumps({
+        'filters': {key: str(value) for key, value in filters.items()},
+        'cursor': cursor or '',
+        'catalog': catalog_version(),
+        'epoch': _generation(EPOCH_KEY),
+        'days': day_generations(start, end),
+    }, sort_keys=True)
+    return REPORT_KEY.format(digest=hashlib.sha256(payload.encode()).hexdigest())
+
+
+def cached_report(filters, cursor, build):
+    """Devolve o relatório do cache ou o calcula com build() e o guarda."""
+    key = report_cache_key(filters, cursor)
+    if key is None:
+        return build()
+    report = cache.get(key)
+    if report is None:
+        report = build()
+        cache.set(key, report, REPORT_TIMEOUT)
+    return report
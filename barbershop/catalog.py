@@ -0,0 +1,68 @@
+# barbershop/catalog.py
+"""
+Cache do catálogo de tipos de serviço (ServiceType).
+
+O catálogo muda raramente, mas é lido em quase toda tela (formulário de agendamento,
+filtros do caixa). Ele fica no cache do Django sob uma chave versionada; os sinais de
+ServiceType (post_save/post_delete) incrementam a versão, invalidando a cópia antiga.
+
+Sem CACHES configurado o Django usa memória local (LocMemCache), que é por processo:
+nesse caso a invalidação só alcança o processo que fez a alteração e os demais
+expiram a cópia em CATALOG_TIMEOUT. Com um cache compartilhado (Redis, Memcached,
+banco de dados) a invalidação é imediata em todos os processos.
+"""
+
+import time
+
+from django.core.cache import cache
+
+from .models import ServiceType
+
+CATALOG_VERSION_KEY = 'barbershop:catalog:version'
+CATALOG_KEY = 'barbershop:catalog:v{version}'
+CATALOG_TIMEOUT = 300
+
+
+def catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Começa de um valor baseado no relógio para não reaproveitar entradas antigas
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(CATALOG_VERSION_KEY, 0)
+    return version
+
+
+def invalidate_catalog():
+    """Troca a versão do catálogo; a próxima leitura vai ao banco."""
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, time.time_ns(), None)
+
+
+def get_catalog():
+    """Tipos de serviço ordenados por nome: [{'id', 'name', 'price', 'estimated_time'}]."""
+    key = CATALOG_KEY.format(version=catalog_version())
+    catalog = cache.get(key)
+    if catalog is None:
+        catalog = list(ServiceType.objects.order_by('name', 'id').values('id', 'name', 'price', 'estimated_time'))
+        cache.set(key, catalog, CATALOG_TIMEOUT)
+    return catalog
+
+
+def get_price_map():
+    """{id: preço} para o cálculo do total no formulário de agendamento."""
+    return {service_type['id']: service_type['price'] for service_type in get_catalog()}
+
+
+def get_service_options():
+    """[{'pk', 'name'}] para montar as opções de serviço no formulário."""
+    return [{'pk': service_type['id'], 'name': service_type['name']} for service_type in get_catalog()]
+
+
+def get_choices():
+    """Choices do campo service_types do ServiceForm (mesmo rótulo de ServiceType.__str__)."""
+    return [
+        (service_type['id'], f"{service_type['name']} (R$ {service_type['price']})")
+        for service_type in get_catalog()
+    ]
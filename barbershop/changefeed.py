@@ -0,0 +1,153 @@
+# barbershop/changefeed.py
+"""
+Feed incremental de alterações (NDJSON) para BI e backup.
+
+Cada fonte (serviços, despesas, clientes) é lida em ordem de (updated_at, id) a
+partir da posição guardada no cursor, em blocos por keyset sobre os índices
+(updated_at, id); as exclusões vêm da tabela Tombstone, em ordem de id. O cursor
+junta a posição de todas as fontes, então quem consome só precisa guardar o
+último cursor recebido e pedir de novo a partir dele.
+
+Só entram alterações com mais de SETTLE_SECONDS: uma transação ainda aberta pode
+gravar um updated_at anterior ao de outra já confirmada, e sem essa folga o
+cursor passaria por cima dela.
+"""
+
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Client, Expense, Service, Tombstone
+from .pagination import decode_cursor, encode_cursor, keyset_after
+
+SETTLE_SECONDS = 5
+FEED_CHUNK_SIZE = 500
+DEFAULT_LIMIT = 5000
+MAX_LIMIT = 50_000
+
+SOURCES = {
+    'service': (Service, [
+        'id', 'client_name', 'client_id', 'service_types_label', 'barber_id', 'price', 'discount',
+        'appointment_datetime', 'payment_method', 'payment_date', 'created_at', 'updated_at',
+    ]),
+    'expense': (Expense, ['id', 'description', 'value', 'expense_date', 'created_at', 'updated_at']),
+    'client': (Client, ['id', 'name', 'phone_whatsapp', 'updated_at']),
+}
+KEY_FIELDS = ('updated_at', 'id')
+# [updated_at, id] de cada fonte (nulos antes da primeira alteração) + id do último Tombstone
+CURSOR_TYPES = ((datetime, None), (int, None)) * len(SOURCES) + (int,)
+
+# Posição inicial: antes de qualquer alteração
+_START = {name: None for name in SOURCES}
+
+_record_tombstones = ContextVar('barbershop_record_tombstones', default=True)
+
+
+@contextmanager
+def without_tombstones():
+    """Exclusões feitas dentro do bloco não aparecem no feed (ex.: serviços movidos para o arquivo)."""
+    token = _record_tombstones.set(False)
+    try:
+        yield
+    finally:
+        _record_tombstones.reset(token)
+
+
+def record_tombstone(model_name, object_id):
+    if _record_tombstones.get():
+        Tombstone.objects.create(model=model_name, object_id=object_id)
+
+
+def is_valid_cursor(cursor):
+    """Cursor com o formato e os tipos esperados (verificado antes de começar a resposta)."""
+    return decode_cursor(cursor, CURSOR_TYPES) is not None
+
+
+def _decode(cursor):
+    """Posições do cursor: {fonte: [updated_at, id] ou None} e o id do último Tombstone."""
+    values = decode_cursor(cursor, CURSOR_TYPES)
+    if values is None:
+        return dict(_START), 0
+    positions = {}
+    for index, name in enumerate(SOURCES):
+        updated_at, pk = values[index * 2:index * 2 + 2]
+        positions[name] = [updated_at, pk] if updated_at is not None else None
+    return positions, values[-1]
+
+
+def _encode(positions, tombstone_id):
+    values = []
+    for name in SOURCES:
+        values.extend(positions[name] or [None, None])
+    return encode_cursor([*values, tombstone_id])
+
+
+def _service_type_ids(services):
+    rows = Service.service_types.through.objects.filter(service_id__in=[row['id'] for row in services])
+    type_ids = {row['id']: [] for row in services}
+    for service_id, service_type_id in rows.order_by('id').values_list('service_id', 'servicetype_id'):
+        type_ids[service_id].append(service_type_id)
+    return type_ids
+
+
+def _iter_source(name, position, until, limit):
+    """Alterações de uma fonte depois de `position`, em blocos. Atualiza `position` a cada linha."""
+    model, fields = SOURCES[name]
+    queryset = model.objects.filter(updated_at__lt=until).order_by(*KEY_FIELDS)
+    sent = 0
+    while sent < limit:
+        chunk = queryset
+        if position[name] is not None:
+            chunk = chunk.filter(keyset_after(KEY_FIELDS, position[name]))
+        rows = list(chunk.values(*fields)[:min(FEED_CHUNK_SIZE, limit - sent)])
+        if not rows:
+            return
+        type_ids = _service_type_ids(rows) if name == 'service' else None
+        for row in rows:
+            if type_ids is not None:
+                row['service_type_ids'] = type_ids[row['id']]
+            position[name] = [row['updated_at'], row['id']]
+            yield {'type': name, 'op': 'upsert', 'id': row['id'], 'data': row}
+        sent += len(rows)
+
+
+def _iter_tombstones(after_id, until, limit):
+    rows = (
+        Tombstone.objects.filter(pk__gt=after_id, deleted_at__lt=until)
+        .order_by('pk').values('id', 'model', 'object_id', 'deleted_at')[:limit]
+    )
+    for row in rows.iterator(chunk_size=FEED_CHUNK_SIZE):
+        yield row['id'], {'type': row['model'], 'op': 'delete', 'id': row['object_id'], 'deleted_at': row['deleted_at']}
+
+
+def iter_changes(cursor=None, limit=DEFAULT_LIMIT):
+    """
+    Linhas NDJSON com as alterações desde `cursor` (até `limit` por fonte). A última linha
+    traz o cursor para a próxima chamada e se ainda há alterações pendentes.
+    """
+    positions, tombstone_id = _decode(cursor)
+    until = timezone.now() - timedelta(seconds=SETTLE_SECONDS)
+    has_more = False
+
+    for name in SOURCES:
+        sent = 0
+        for change in _iter_source(name, positions, until, limit):
+            sent += 1
+            yield _dumps(change)
+        has_more = has_more or sent == limit
+
+    sent = 0
+    for tombstone_id, change in _iter_tombstones(tombstone_id, until, limit):
+        sent += 1
+        yield _dumps(change)
+    has_more = has_more or sent == limit
+
+    yield _dumps({'type': 'cursor', 'cursor': _encode(positions, tombstone_id), 'has_more': has_more})
+
+
+def _dumps(value):
+    return json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
@@ -0,0 +1,94 @@
+# barbershop/clients.py
+"""
+Ligação entre serviços e clientes cadastrados, e o histórico de cada cliente.
+
+Service.client é preenchido pelo formulário de agendamento, pelo importador e pela
+migração que ligou os serviços antigos, sempre pelo mesmo critério: o nome
+normalizado (Client.search_name) igual ao nome digitado, desde que só um cliente
+tenha esse nome.
+
+O histórico (quantidade de visitas, última visita, total gasto e a lista de
+atendimentos) é lido pelo índice (client, appointment_datetime) de Service e do
+arquivo (ArchivedService): o custo depende das visitas do cliente, não do tamanho
+das tabelas.
+"""
+
+from decimal import Decimal
+from itertools import chain
+
+from django.db.models import Count, Max, Min, Q, Sum
+from django.utils import timezone
+
+from .models import ArchivedService, Client, Service
+from .pagination import KeysetPage, decode_cursor, encode_cursor, field_types, keyset_after
+from .utils import normalize_search_text
+
+HISTORY_PAGE_SIZE = 30
+HISTORY_KEY = ('appointment_datetime', 'id')
+
+
+def client_ids_by_name(names):
+    """{nome: id do cliente} para os nomes que correspondem a exatamente um cliente (uma consulta)."""
+    normalized = {name: normalize_search_text(name)[:100] for name in names if name}
+    ids = {}
+    repeated = set()
+    rows = Client.objects.filter(search_name__in=set(normalized.values())).values_list('search_name', 'id')
+    for search_name, pk in rows:
+        if search_name in ids:
+            repeated.add(search_name)
+        ids[search_name] = pk
+    return {
+        name: ids[search_name]
+        for name, search_name in normalized.items()
+        if search_name in ids and search_name not in repeated
+    }
+
+
+def find_client(name):
+    """O cliente com esse nome (normalizado), ou None se não houver ou houver mais de um."""
+    matches = list(Client.objects.filter(search_name=normalize_search_text(name)[:100])[:2])
+    return matches[0] if len(matches) == 1 else None
+
+
+def client_stats(client):
+    """Visitas (serviços pagos), primeira e última visita, total gasto e agendamentos futuros."""
+    paid = Q(payment_date__isnull=False)
+    stats = {'visits': 0, 'spent': Decimal('0'), 'first_visit': None, 'last_visit': None, 'upcoming': 0}
+    for model in (Service, ArchivedService):
+        row = model.objects.filter(client=client).aggregate(
+            visits=Count('id', filter=paid),
+            spent=Sum('price', filter=paid),
+            first_visit=Min('appointment_datetime', filter=paid),
+            last_visit=Max('appointment_datetime', filter=paid),
+            upcoming=Count('id', filter=Q(payment_date__isnull=True, appointment_datetime__gte=timezone.now())),
+        )
+        stats['visits'] += row['visits']
+        stats['spent'] += row['spent'] or 0
+        stats['upcoming'] += row['upcoming']
+        dates = [value for value in (stats['first_visit'], row['first_visit']) if value]
+        stats['first_visit'] = min(dates, default=None)
+        dates = [value for value in (stats['last_visit'], row['last_visit']) if value]
+        stats['last_visit'] = max(dates, default=None)
+    return stats
+
+
+def client_history(client, cursor=None, page_size=HISTORY_PAGE_SIZE):
+    """
+    Atendimentos do cliente (com data marcada), do mais recente para o mais antigo,
+    juntando Service e o arquivo. Cada fonte busca no máximo page_size + 1 linhas.
+    """
+    values = decode_cursor(cursor, field_types(Service, HISTORY_KEY))
+    ordering = [f'-{field}' for field in HISTORY_KEY]
+    pages = []
+    for model in (Service, ArchivedService):
+        queryset = model.objects.filter(client=client, appointment_datetime__isnull=False).select_related('barber')
+        if values is not None:
+            queryset = queryset.filter(keyset_after(HISTORY_KEY, values, descending=True))
+        pages.append(queryset.order_by(*ordering)[:page_size + 1])
+
+    services = sorted(chain.from_iterable(pages), key=lambda s: (s.appointment_datetime, s.pk), reverse=True)
+    next_cursor = None
+    if len(services) > page_size:
+        services = services[:page_size]
+        next_cursor = encode_cursor([services[-1].appointment_datetime, services[-1].pk])
+    return KeysetPage(services, next_cursor)
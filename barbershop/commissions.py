@@ -0,0 +1,236 @@
+# barbershop/commissions.py
+"""
+Comissões e fechamento dos barbeiros.
+
+O percentual de cada barbeiro e tipo de serviço vem de CommissionRule (vale a regra
+mais específica; sem nenhuma regra, DEFAULT_PERCENTAGE). O fechamento de um período
+sai de duas consultas agrupadas por fonte (Service e, se o período alcançar o
+arquivo, ArchivedService), para todos os barbeiros de uma vez:
+
+- sobre a relação ManyToMany, por barbeiro e tipo: cada serviço com vários tipos é
+  dividido entre eles na proporção do preço de tabela de cada tipo (partes iguais se
+  todos custarem zero), e o desconto do serviço é dividido da mesma forma;
+- sobre os serviços, por barbeiro: os totais (cada serviço uma vez) e os serviços
+  sem nenhum tipo.
+
+Os arredondamentos de cada tipo são acertados na maior linha, para que as linhas
+somem exatamente o total do barbeiro.
+
+Um período encerrado (fim antes de hoje) é guardado em PayoutPeriod/PayoutStatement/
+PayoutLine apenas quando fechado explicitamente (`manage.py payouts`); a tela só lê o
+fechamento guardado ou calcula na hora, sem gravar. Quando um serviço pago ou uma
+despesa de um dia muda, summary.py apaga os fechamentos guardados que cobrem esse dia
+(drop_stored_periods), na mesma transação; `manage.py payouts --refresh` recalcula um
+período guardado (ex.: depois de mudar as regras de comissão).
+"""
+
+from bisect import bisect_left
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Case, Count, Exists, F, FloatField, OuterRef, Subquery, Sum, When
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .archive import reaches_archive
+from .catalog import get_catalog
+from .models import ArchivedService, CommissionRule, PayoutLine, PayoutPeriod, PayoutStatement, Service
+from .utils import local_day_range
+
+DEFAULT_PERCENTAGE = Decimal('50.00')
+ZERO = Decimal('0')
+CENT = Decimal('0.01')
+
+
+def _money(value):
+    return Decimal(str(value or 0)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def commission_rates():
+    """{(barber_id, service_type_id): percentual}, com None no lugar de "todos"."""
+    return {
+        (barber_id, service_type_id): percentage
+        for barber_id, service_type_id, percentage
+        in CommissionRule.objects.values_list('barber_id', 'service_type_id', 'percentage')
+    }
+
+
+def rate_for(rates, barber_id, service_type_id):
+    """Percentual da regra mais específica para o barbeiro e o tipo de serviço."""
+    for key in ((barber_id, service_type_id), (barber_id, None), (None, service_type_id), (None, None)):
+        if key in rates:
+            return rates[key]
+    return DEFAULT_PERCENTAGE
+
+
+def _type_groups(model, paid):
+    """Por (barbeiro, tipo): serviços, valor cobrado e desconto rateados entre os tipos de cada serviço."""
+    through = model.service_types.through
+    owner = model._meta.model_name
+    same_service = through.objects.filter(**{owner: OuterRef(owner)}).values(owner).order_by()
+    list_total = Subquery(same_service.annotate(total=Sum('servicetype__price')).values('total'))
+    types_count = Subquery(same_service.annotate(total=Count('pk')).values('total'))
+
+    def share(field):
+        # Cast para REAL: no SQLite os decimais inteiros fariam divisão inteira
+        value = Cast(f'{owner}__{field}', FloatField())
+        return Sum(Case(
+            When(list_total=0, then=value / F('types_count')),
+            default=value * F('servicetype__price') / F('list_total'),
+            output_field=FloatField(),
+        ))
+
+    return (
+        through.objects.filter(**{f'{owner}__in': paid})
+        .annotate(list_total=list_total, types_count=types_count)
+        .values(barber_id=F(f'{owner}__barber_id'), service_type_id=F('servicetype_id'))
+        .annotate(services=Count('pk'), charged=share('price'), discounts=share('discount'))
+        .order_by()
+    )
+
+
+def _barber_groups(model, paid):
+    """Por barbeiro: totais de cada serviço uma vez e a parte dos serviços sem tipo."""
+    untyped = ~Exists(model.service_types.through.objects.filter(**{model._meta.model_name: OuterRef('pk')}))
+    return paid.values('barber_id').annotate(
+        services=Count('pk'),
+        charged=Sum('price', default=ZERO),
+        discounts=Sum('discount', default=ZERO),
+        untyped_services=Count('pk', filter=untyped),
+        untyped_charged=Sum('price', filter=untyped, default=ZERO),
+        untyped_discounts=Sum('discount', filter=untyped, default=ZERO),
+    ).order_by()
+
+
+def _reconcile(lines, field, total):
+    """Acerta o arredondamento das linhas na maior delas, para que somem `total`."""
+    if not lines:
+        return
+    difference = total - sum(getattr(line, field) for line in lines)
+    if difference:
+        largest = max(lines, key=lambda line: line.net)
+        setattr(largest, field, getattr(largest, field) + difference)
+
+
+def compute_statements(start, end):
+    """
+    Fechamentos (não gravados) de todos os barbeiros com serviços pagos em [start, end]
+    (datas inclusivas), cada um com suas linhas por tipo em `line_items`.
+    """
+    lower, upper = local_day_range(start, end)
+    models = [Service, ArchivedService] if reaches_archive(lower) else [Service]
+
+    totals = defaultdict(lambda: defaultdict(lambda: ZERO))
+    by_type = defaultdict(lambda: defaultdict(lambda: [0, 0.0, 0.0]))
+    for model in models:
+        paid = model.objects.filter(payment_date__gte=lower, payment_date__lt=upper)
+        for group in _barber_groups(model, paid):
+            barber_totals = totals[group.pop('barber_id')]
+            for key, value in group.items():
+                barber_totals[key] += value
+        for group in _type_groups(model, paid):
+            line = by_type[group['barber_id']][group['service_type_id']]
+            line[0] += group['services']
+            line[1] += group['charged'] or 0
+            line[2] += group['discounts'] or 0
+
+    rates = commission_rates()
+    names = {service_type['id']: service_type['name'] for service_type in get_catalog()}
+    barbers = User.objects.in_bulk([barber_id for barber_id in totals if barber_id])
+
+    statements = []
+    for barber_id, barber_totals in totals.items():
+        lines = [
+            PayoutLine(
+                service_type_id=service_type_id, service_type_name=names.get(service_type_id, ''),
+                services_count=count, net=_money(net), discount=_money(discount),
+            )
+            for service_type_id, (count, net, discount) in by_type[barber_id].items()
+        ]
+        _reconcile(lines, 'net', barber_totals['charged'] - barber_totals['untyped_charged'])
+        _reconcile(lines, 'discount', barber_totals['discounts'] - barber_totals['untyped_discounts'])
+        lines.sort(key=lambda line: line.service_type_name)
+        if barber_totals['untyped_services']:
+            lines.append(PayoutLine(
+                service_type_id=None, services_count=barber_totals['untyped_services'],
+                net=barber_totals['untyped_charged'], discount=barber_totals['untyped_discounts'],
+            ))
+
+        for line in lines:
+            line.gross = line.net + line.discount
+            line.percentage = rate_for(rates, barber_id, line.service_type_id)
+            line.commission = _money(line.net * line.percentage / 100)
+
+        statement = PayoutStatement(
+            barber=barbers.get(barber_id),
+            services_count=barber_totals['services'],
+            gross=barber_totals['charged'] + barber_totals['discounts'],
+            discount=barber_totals['discounts'],
+            net=barber_totals['charged'],
+            commission=sum((line.commission for line in lines), ZERO),
+        )
+        statement.line_items = lines
+        statements.append(statement)
+
+    statements.sort(key=lambda statement: statement.barber.username if statement.barber else '')
+    return statements
+
+
+def is_closed(end):
+    """Um período está encerrado quando termina antes de hoje."""
+    return end < timezone.localdate()
+
+
+def _stored_statements(period):
+    statements = list(period.statements.select_related('barber').prefetch_related('lines').order_by('barber__username'))
+    for statement in statements:
+        statement.line_items = sorted(statement.lines.all(), key=lambda line: (line.service_type_id is None, line.service_type_name))
+    return statements
+
+
+def _store(start, end, statements):
+    with transaction.atomic():
+        PayoutPeriod.objects.filter(start=start, end=end).delete()
+        period = PayoutPeriod.objects.create(start=start, end=end)
+        for statement in statements:
+            statement.period = period
+        PayoutStatement.objects.bulk_create(statements)
+        lines = []
+        for statement in statements:
+            for line in statement.line_items:
+                line.statement = statement
+                lines.append(line)
+        PayoutLine.objects.bulk_create(lines)
+
+
+def drop_stored_periods(days):
+    """Apaga os fechamentos guardados que cobrem algum dos dias (os dados desses dias mudaram)."""
+    days = sorted(set(days))
+    if not days:
+        return
+    candidates = PayoutPeriod.objects.filter(start__lte=days[-1], end__gte=days[0]).values_list('pk', 'start', 'end')
+    stale = []
+    for pk, start, end in candidates:
+        # Primeiro dia alterado a partir do início do período
+        position = bisect_left(days, start)
+        if position < len(days) and days[position] <= end:
+            stale.append(pk)
+    if stale:
+        PayoutPeriod.objects.filter(pk__in=stale).delete()
+
+
+def payout_statements(start, end, store=False, refresh=False):
+    """
+    Fechamentos de [start, end]: os guardados, se houver, ou calculados na hora.
+    store=True guarda o cálculo de um período encerrado; refresh=True recalcula e
+    substitui o que estiver guardado.
+    """
+    period = None if refresh else PayoutPeriod.objects.filter(start=start, end=end).first()
+    if period is not None:
+        return _stored_statements(period)
+    statements = compute_statements(start, end)
+    if (store or refresh) and is_closed(end):
+        _store(start, end, statements)
+    return statements
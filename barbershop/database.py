@@ -0,0 +1,75 @@
+# barbershop/database.py
+"""
+Modo de produção do SQLite (opcional, ligado por BARBERAPP_SQLITE_PRODUCTION=1).
+
+Com vários tablets gravando ao mesmo tempo, o SQLite padrão (journal "delete",
+uma conexão nova por requisição) trava leituras durante as escritas e devolve
+"database is locked". No modo de produção:
+
+- cada conexão nova recebe os PRAGMAs de PRODUCTION_PRAGMAS (WAL, busy_timeout,
+  synchronous=NORMAL, mmap/cache), aplicados pelo sinal connection_created;
+- as conexões são reaproveitadas entre requisições (CONN_MAX_AGE) e as transações
+  começam com BEGIN IMMEDIATE, serializando as escritas logo no início;
+- as views que gravam usam @retry_on_lock, que repete a operação com espera
+  crescente se ainda assim o banco estiver ocupado.
+"""
+
+import random
+import time
+from functools import wraps
+
+from django.db import OperationalError, connection
+
+PRODUCTION_PRAGMAS = [
+    ('journal_mode', 'WAL'),     # leitores não bloqueiam o escritor (e vice-versa)
+    ('busy_timeout', 5000),      # espera até 5 s por um lock antes de falhar (ms)
+    ('synchronous', 'NORMAL'),   # seguro com WAL e bem mais rápido que FULL
+    ('mmap_size', 268435456),    # 256 MB de leitura via mmap
+    ('cache_size', -20000),      # ~20 MB de cache de páginas (negativo = KiB)
+    ('temp_store', 'MEMORY'),
+]
+
+# Opções do DATABASES['default'] no modo de produção
+PRODUCTION_DATABASE_OPTIONS = {
+    'CONN_MAX_AGE': 600,
+    'CONN_HEALTH_CHECKS': True,
+    'OPTIONS': {'timeout': 5, 'transaction_mode': 'IMMEDIATE'},
+}
+
+LOCK_RETRIES = 5
+LOCK_BASE_DELAY = 0.05
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Receptor de connection_created: aplica os PRAGMAs de produção."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in PRODUCTION_PRAGMAS:
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def is_lock_error(error):
+    message = str(error).lower()
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def retry_on_lock(func=None, retries=LOCK_RETRIES, base_delay=LOCK_BASE_DELAY):
+    """
+    Repete a função (ex.: uma view que grava) quando o SQLite responde "database is
+    locked", com espera exponencial e variação aleatória. Só repete fora de uma
+    transação: dentro de um atomic() o erro sobe para quem abriu a transação.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(retries + 1):
+                try:
+                    return func(*args, **kwargs)
+                except OperationalError as error:
+                    if attempt == retries or connection.in_atomic_block or not is_lock_error(error):
+                        raise
+                    time.sleep(base_delay * 2 ** attempt * (1 + random.random()))
+        return wrapper
+
+    return decorator(func) if func is not None else decorator
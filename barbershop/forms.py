@@ -4,6 +4,10 @@ from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
 # Importe o novo modelo Expense
 from .models import Service, Client, ServiceType, Expense 
+from .catalog import get_choices
+from .clients import find_client
+from .scheduling import is_barber_free, services_duration
+from .utils import normalize_search_text
 
 
 class ServiceForm(forms.ModelForm):
@@ -14,9 +18,12 @@ class ServiceForm(forms.ModelForm):
         widget=forms.Select(attrs={'class': 'form-control'}) 
     )
 
+    # Preenchido pelo autocomplete quando um cliente da lista é escolhido
+    client = forms.ModelChoiceField(queryset=Client.objects.all(), required=False, widget=forms.HiddenInput)
+
     class Meta:
         model = Service
-        fields = ['client_name', 'service_types', 'barber', 'discount', 'appointment_datetime']
+        fields = ['client_name', 'client', 'service_types', 'barber', 'discount', 'appointment_datetime']
         labels = {
             'client_name': 'Nome do Cliente',
             'service_types': 'Tipos de Serviço',
@@ -34,6 +41,31 @@ class ServiceForm(forms.ModelForm):
             'payment_method': forms.HiddenInput(),
             'payment_date': forms.HiddenInput(),
         }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Opções vindas do cache do catálogo (a validação no POST continua usando o queryset)
+        self.fields['service_types'].choices = get_choices()
+
+    def clean(self):
+        cleaned_data = super().clean()
+        # Sem cliente escolhido (ou com o nome alterado depois), liga pelo nome digitado
+        client_name = cleaned_data.get('client_name')
+        client = cleaned_data.get('client')
+        if client_name and (client is None or normalize_search_text(client.name) != normalize_search_text(client_name)):
+            cleaned_data['client'] = find_client(client_name)
+
+        barber = cleaned_data.get('barber')
+        start = cleaned_data.get('appointment_datetime')
+        service_types = cleaned_data.get('service_types')
+        changed = {'barber', 'appointment_datetime', 'service_types'} & set(self.changed_data)
+        if barber and start and service_types is not None and changed:
+            # Impede dois agendamentos do mesmo barbeiro no mesmo horário
+            duration = services_duration([service_type.pk for service_type in service_types])
+            if not is_barber_free(barber.pk, start, duration, exclude_service_id=self.instance.pk):
+                self.add_error('appointment_datetime', "O barbeiro já possui um agendamento neste horário.")
+        return cleaned_data
+
 # ... (O método __init__ para remover campos ocultos no ServiceForm foi mantido comentado por enquanto, 
 # mas se você o descomentar, ele deve ser incluído aqui.)
 # ...
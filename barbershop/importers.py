@@ -0,0 +1,222 @@
+# barbershop/importers.py
+"""
+Importação em massa de clientes, serviços e despesas a partir de CSV
+(usada pelo comando `manage.py import_data`).
+
+O arquivo é lido linha a linha (csv.DictReader) e cada importador converte as linhas
+em instâncias ainda não salvas (build) e as grava com bulk_create em lotes (save).
+Como bulk_create não chama save() nem dispara sinais, os dados derivados são
+preenchidos aqui mesmo: campos de busca do cliente, cliente do serviço (pelo nome),
+rótulo e relação ManyToMany dos tipos de serviço, o resumo do caixa e o índice de
+busca (search.py).
+
+Colunas esperadas (cabeçalho na primeira linha):
+
+- clientes: name, phone_whatsapp
+- servicos: client_name, service_types (nomes separados por "|"), barber (username),
+  price (opcional: soma dos tipos menos o desconto), discount, appointment_datetime,
+  payment_method, payment_date
+- despesas: description, value, expense_date
+
+Datas aceitam ISO 8601 (AAAA-MM-DD[ HH:MM[:SS]]) ou DD/MM/AAAA[ HH:MM]; valores aceitam vírgula
+decimal ("50,00"); a forma de pagamento aceita o código ("pix") ou o nome ("Pix").
+"""
+
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .clients import client_ids_by_name
+from .models import PAYMENT_CHOICES, Client, Expense, Service, ServiceType
+from .search import reindex
+from .summary import ServiceSnapshot, apply_expenses, apply_service_changes
+from .utils import normalize_search_text, only_digits
+
+SERVICE_TYPES_SEPARATOR = '|'
+
+DATETIME_FORMATS = ['%d/%m/%Y %H:%M', '%d/%m/%Y %H:%M:%S']
+DATE_FORMATS = ['%d/%m/%Y']
+
+
+class ImportRowError(ValueError):
+    """Linha do CSV com valor inválido."""
+
+
+def _value(row, column, required=False):
+    value = (row.get(column) or '').strip()
+    if required and not value:
+        raise ImportRowError(f"coluna '{column}' vazia")
+    return value
+
+
+def parse_decimal(value, column):
+    if not value:
+        return None
+    if ',' in value:
+        value = value.replace('.', '').replace(',', '.')
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ImportRowError(f"valor inválido em '{column}': {value!r}")
+
+
+def parse_datetime(value, column):
+    """Data/hora local (aware); aceita também só a data (meia-noite)."""
+    if not value:
+        return None
+    try:
+        # Caminho rápido para o formato ISO, o mais comum em exportações
+        parsed = datetime.fromisoformat(value)
+        return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+    except ValueError:
+        pass
+    for fmt in DATETIME_FORMATS + DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        return timezone.make_aware(parsed)
+    raise ImportRowError(f"data/hora inválida em '{column}': {value!r}")
+
+
+def parse_date(value, column):
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ImportRowError(f"data inválida em '{column}': {value!r}")
+
+
+class ClientImporter:
+    def build(self, row):
+        name = _value(row, 'name', required=True)
+        phone = _value(row, 'phone_whatsapp') or None
+        # Mesmos valores que Client.save() calcula
+        return Client(
+            name=name,
+            phone_whatsapp=phone,
+            search_name=normalize_search_text(name)[:100],
+            phone_digits=only_digits(phone),
+        )
+
+    def save(self, clients, batch_size):
+        Client.objects.bulk_create(clients, batch_size=batch_size)
+        reindex('client', [client.pk for client in clients])
+
+
+class ServiceImporter:
+    def __init__(self):
+        # Tipos e barbeiros são resolvidos pelo nome uma única vez
+        self.service_types = {}
+        for service_type in ServiceType.objects.order_by('-id'):
+            self.service_types[normalize_search_text(service_type.name)] = service_type
+        self.barbers = dict(User.objects.values_list('username', 'id'))
+        self.payment_methods = {}
+        for value, label in PAYMENT_CHOICES:
+            self.payment_methods[normalize_search_text(value)] = value
+            self.payment_methods[normalize_search_text(label)] = value
+
+    def _service_types(self, row):
+        names = [name.strip() for name in _value(row, 'service_types').split(SERVICE_TYPES_SEPARATOR)]
+        service_types = []
+        for name in filter(None, names):
+            service_type = self.service_types.get(normalize_search_text(name))
+            if service_type is None:
+                raise ImportRowError(f"tipo de serviço desconhecido: {name!r}")
+            service_types.append(service_type)
+        return service_types
+
+    def build(self, row):
+        service_types = self._service_types(row)
+
+        barber_id = None
+        username = _value(row, 'barber')
+        if username:
+            barber_id = self.barbers.get(username)
+            if barber_id is None:
+                raise ImportRowError(f"barbeiro desconhecido: {username!r}")
+
+        payment_method = None
+        method = _value(row, 'payment_method')
+        if method:
+            payment_method = self.payment_methods.get(normalize_search_text(method))
+            if payment_method is None:
+                raise ImportRowError(f"forma de pagamento desconhecida: {method!r}")
+
+        discount = parse_decimal(_value(row, 'discount'), 'discount') or Decimal('0')
+        price = parse_decimal(_value(row, 'price'), 'price')
+        if price is None:
+            # Mesmo cálculo do formulário de agendamento
+            price = sum((service_type.price for service_type in service_types), Decimal('0')) - discount
+
+        service = Service(
+            client_name=_value(row, 'client_name', required=True),
+            barber_id=barber_id,
+            price=price,
+            discount=discount,
+            appointment_datetime=parse_datetime(_value(row, 'appointment_datetime'), 'appointment_datetime'),
+            payment_method=payment_method,
+            payment_date=parse_datetime(_value(row, 'payment_date'), 'payment_date'),
+            service_types_label=', '.join(service_type.name for service_type in service_types),
+        )
+        # Guardado na instância para gravar a relação ManyToMany após o bulk_create
+        service.imported_service_types = service_types
+        return service
+
+    def save(self, services, batch_size):
+        # Liga ao cliente cadastrado pelo nome (uma consulta por bloco)
+        client_ids = client_ids_by_name({service.client_name for service in services})
+        for service in services:
+            service.client_id = client_ids.get(service.client_name)
+        Service.objects.bulk_create(services, batch_size=batch_size)
+        Through = Service.service_types.through
+        Through.objects.bulk_create([
+            Through(service_id=service.pk, servicetype_id=service_type.pk)
+            for service in services
+            for service_type in service.imported_service_types
+        ], batch_size=batch_size)
+        apply_service_changes([(None, self.snapshot(service)) for service in services])
+        reindex('service', [service.pk for service in services])
+
+    def snapshot(self, service):
+        """Contribuição do serviço para o caixa (equivale a summary.snapshot_service sem consulta)."""
+        if not service.payment_date:
+            return None
+        return ServiceSnapshot(
+            date=timezone.localdate(service.payment_date),
+            barber_id=service.barber_id,
+            payment_method=service.payment_method or '',
+            price=service.price,
+            service_type_ids=tuple(service_type.pk for service_type in service.imported_service_types),
+        )
+
+
+class ExpenseImporter:
+    def build(self, row):
+        value = parse_decimal(_value(row, 'value', required=True), 'value')
+        return Expense(
+            description=_value(row, 'description', required=True),
+            value=value,
+            expense_date=parse_date(_value(row, 'expense_date'), 'expense_date') or timezone.localdate(),
+        )
+
+    def save(self, expenses, batch_size):
+        Expense.objects.bulk_create(expenses, batch_size=batch_size)
+        apply_expenses(expenses)
+        reindex('expense', [expense.pk for expense in expenses])
+
+
+IMPORTERS = {
+    'clientes': ClientImporter,
+    'servicos': ServiceImporter,
+    'despesas': ExpenseImporter,
+}
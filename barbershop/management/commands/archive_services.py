@@ -0,0 +1,49 @@
+# barbershop/management/commands/archive_services.py
+
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from barbershop.archive import ARCHIVE_BATCH_SIZE, archivable_services, archive_services
+from barbershop.utils import local_day_start
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Data inválida: {value!r} (use AAAA-MM-DD).")
+
+
+class Command(BaseCommand):
+    help = (
+        "Move os serviços pagos antigos (e seus tipos) para as tabelas de arquivo, em lotes. "
+        "O caixa, a exportação e os relatórios continuam incluindo os serviços arquivados."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help="Arquiva serviços pagos há mais de N dias (padrão: 365).",
+        )
+        parser.add_argument('--before', type=_parse_date, help="Arquiva serviços pagos antes deste dia (AAAA-MM-DD).")
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE, help="Serviços por transação.")
+        parser.add_argument('--dry-run', action='store_true', help="Só mostra quantos serviços seriam arquivados.")
+
+    def handle(self, *args, **options):
+        cutoff_day = options['before'] or timezone.localdate() - timedelta(days=options['days'])
+        cutoff = local_day_start(cutoff_day)
+
+        if options['dry_run']:
+            count = archivable_services(cutoff).count()
+            self.stdout.write(f"{count:,} serviços pagos antes de {cutoff_day:%d/%m/%Y} seriam arquivados.")
+            return
+
+        started = time.perf_counter()
+        total = archive_services(cutoff, options['batch_size'], log=self.stdout.write)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{total:,} serviços pagos antes de {cutoff_day:%d/%m/%Y} arquivados em {elapsed:.1f} s."
+        ))
@@ -0,0 +1,28 @@
+# barbershop/management/commands/backfill_service_labels.py
+
+from django.core.management.base import BaseCommand
+
+from barbershop.models import Service
+from barbershop.signals import LABEL_BATCH_SIZE, refresh_service_types_labels
+
+
+class Command(BaseCommand):
+    help = "Recalcula o rótulo desnormalizado dos tipos de serviço (Service.service_types_label) de todos os serviços."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=LABEL_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total, last_pk = 0, 0
+        while True:
+            # Percorre por faixas de pk (keyset) para não manter um cursor aberto durante os updates
+            batch = list(
+                Service.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            refresh_service_types_labels(batch, batch_size=batch_size)
+            total += len(batch)
+            last_pk = batch[-1]
+        self.stdout.write(self.style.SUCCESS(f"Rótulos recalculados para {total} serviços."))
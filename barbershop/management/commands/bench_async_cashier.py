@@ -0,0 +1,80 @@
+# barbershop/management/commands/bench_async_cashier.py
+
+import asyncio
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from barbershop import async_views, views
+from barbershop.benchmarks import create_barbers, create_bench_services, isolated_database, simulated_latency
+from barbershop.summary import rebuild_summary
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara o tempo de resposta do caixa (e da exportação CSV) síncrono com a versão "
+        "assíncrona, com uma latência artificial por consulta, em um banco temporário."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=50_000, help="Quantidade de serviços gerados.")
+        parser.add_argument('--barbers', type=int, default=8)
+        parser.add_argument('--latency', type=float, default=20, help="Latência simulada por consulta (ms).")
+        parser.add_argument('--repeat', type=int, default=5, help="Execuções por view (vale a menor).")
+        parser.add_argument('--db-path', help="Arquivo SQLite temporário (padrão: diretório temporário).")
+
+    def handle(self, *args, **options):
+        with isolated_database(options['db_path']):
+            self.stdout.write(f"Gerando {options['services']:,} serviços...")
+            barbers = create_barbers(options['barbers'])
+            create_bench_services(options['services'], barbers)
+            rebuild_summary()
+
+            factory = RequestFactory()
+            user = barbers[0]
+
+            def request(path):
+                req = factory.get(path, {'filter_month': time.strftime('%Y-%m')})
+                req.user = user
+                return req
+
+            def sync_page():
+                return views.daily_cashier.__wrapped__(request('/caixa/'))
+
+            def async_page():
+                return asyncio.run(async_views.daily_cashier_async.__wrapped__(request('/caixa/async/')))
+
+            def sync_csv():
+                response = views.export_cashier_csv.__wrapped__(request('/caixa/export/csv/'))
+                return b''.join(response.streaming_content)
+
+            def async_csv():
+                async def consume():
+                    response = await async_views.export_cashier_csv_async.__wrapped__(request('/caixa/export/csv/async/'))
+                    return b''.join([chunk async for chunk in response.streaming_content])
+                return asyncio.run(consume())
+
+            scenarios = [
+                ("Caixa do mês", sync_page, async_page),
+                ("Exportação CSV do mês", sync_csv, async_csv),
+            ]
+
+            self.stdout.write(f"Latência simulada: {options['latency']:.0f} ms por consulta")
+            with simulated_latency(options['latency'] / 1000):
+                for title, sync_view, async_view in scenarios:
+                    self.stdout.write(self.style.MIGRATE_HEADING(f"\n{title}"))
+                    for label, func in (("síncrona", sync_view), ("assíncrona", async_view)):
+                        elapsed = self._best_of(func, options['repeat'])
+                        self.stdout.write(f"  [{label}] {elapsed * 1000:.1f} ms")
+
+    def _best_of(self, func, repeat):
+        # O cache de relatórios é limpo a cada execução para medir as consultas
+        best = float('inf')
+        for _ in range(repeat):
+            cache.clear()
+            started = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - started)
+        return best
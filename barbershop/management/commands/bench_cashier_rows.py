@@ -0,0 +1,100 @@
+# barbershop/management/commands/bench_cashier_rows.py
+
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from barbershop.benchmarks import isolated_database, seed_database
+from barbershop.models import Service
+from barbershop.views import CSV_CHUNK_SIZE, _CashierCsv, _cashier_querysets, _service_transaction
+
+ORDERING = ('-payment_date', '-id')
+
+
+def _instance_transaction(s):
+    """Linha do caixa como era montada antes: instância completa, dict e rótulo pelo modelo."""
+    return {
+        'description': f"Receita: {s.client_name} - {s.service_types_label}",
+        'value': s.price,
+        'is_expense': False,
+        'barber': s.barber.username if s.barber else 'N/A',
+        'payment_method': s.get_payment_method_display(),
+        'date': s.payment_date.date(),
+        'sort_time': s.payment_date,
+        'sort_key': (s.payment_date, 1, s.pk),
+    }
+
+
+def _instance_csv_row(rows, s):
+    rows.total_income += s.price
+    return rows.writer.writerow([
+        s.payment_date.strftime('%d/%m/%Y %H:%M'),
+        'RECEITA',
+        f"{s.client_name} - {s.service_types_label}",
+        s.barber.username if s.barber else 'N/A',
+        s.get_payment_method_display(),
+        str(s.price).replace('.', ','),
+    ])
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara o tempo de CPU por linha e o pico de memória do caixa e da exportação CSV lendo "
+        "instâncias completas de Service ou linhas com só as colunas usadas (values_list)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50_000, help="Receitas lidas por medição.")
+        parser.add_argument('--repeat', type=int, default=3, help="Execuções por medição (vale a menor).")
+        parser.add_argument('--db-path', help="Arquivo SQLite temporário (padrão: diretório temporário).")
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        with isolated_database(options['db_path']):
+            # ≈80% dos serviços gerados estão pagos
+            seed_database(services=rows * 5 // 4 + 1000, years=1, log=self.stdout.write)
+
+            instances = Service.objects.filter(payment_date__isnull=False).select_related('barber').order_by(*ORDERING)[:rows]
+            filters = {'start': None, 'end': None, 'service_type': '', 'barber': '', 'payment_method': ''}
+            projected = _cashier_querysets(filters)[0][0].order_by(*ORDERING)[:rows]
+
+            def page(queryset, transaction):
+                # Lista do caixa: todas as linhas montadas e guardadas
+                return lambda: [transaction(s) for s in queryset.iterator(chunk_size=CSV_CHUNK_SIZE)]
+
+            def export(queryset, row):
+                # Exportação: cada linha é formatada e descartada
+                def run():
+                    csv_rows = _CashierCsv()
+                    return sum(len(row(csv_rows, s)) for s in queryset.iterator(chunk_size=CSV_CHUNK_SIZE))
+                return run
+
+            scenarios = [
+                ("caixa", "instâncias", page(instances, _instance_transaction)),
+                ("caixa", "linhas", page(projected, _service_transaction)),
+                ("exportação CSV", "instâncias", export(instances, _instance_csv_row)),
+                ("exportação CSV", "linhas", export(projected, _CashierCsv.service_row)),
+            ]
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{rows:,} receitas"))
+            for name, label, func in scenarios:
+                cpu = min(self._cpu_time(func) for _ in range(options['repeat']))
+                peak = self._peak_memory(func)
+                self.stdout.write(
+                    f"  {name:<15} [{label:<10}] {cpu * 1e6 / rows:>6.1f} µs de CPU por linha  "
+                    f"pico de memória {peak / 2**20:>7.1f} MiB"
+                )
+
+    def _cpu_time(self, func):
+        started = time.process_time()
+        func()
+        return time.process_time() - started
+
+    def _peak_memory(self, func):
+        tracemalloc.start()
+        try:
+            func()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
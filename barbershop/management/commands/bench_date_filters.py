@@ -0,0 +1,76 @@
+# barbershop/management/commands/bench_date_filters.py
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from barbershop.benchmarks import best_of, create_barbers, create_bench_services, isolated_database
+from barbershop.models import Expense, Service
+from barbershop.utils import local_day_range
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara o plano de consulta e o tempo dos filtros de data antigos (__date, __year, __month) "
+        "com os intervalos semiabertos indexados, em um banco temporário."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=1_000_000, help="Quantidade de serviços gerados.")
+        parser.add_argument('--barbers', type=int, default=8)
+        parser.add_argument('--repeat', type=int, default=5, help="Execuções por consulta (vale a menor).")
+        parser.add_argument('--db-path', help="Arquivo SQLite temporário (padrão: diretório temporário).")
+
+    def handle(self, *args, **options):
+        with isolated_database(options['db_path']) as connection:
+            self.stdout.write(f"Gerando {options['services']:,} serviços...")
+            barbers = create_barbers(options['barbers'])
+            create_bench_services(options['services'], barbers)
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+            day = timezone.localdate() - timedelta(days=10)
+            month_start = day.replace(day=1)
+            month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            barber = barbers[0]
+
+            day_lower, day_upper = local_day_range(day, day)
+            month_lower, month_upper = local_day_range(month_start, month_end)
+
+            scenarios = [
+                (
+                    "Agenda do dia",
+                    Service.objects.filter(appointment_datetime__date=day),
+                    Service.objects.filter(appointment_datetime__gte=day_lower, appointment_datetime__lt=day_upper),
+                ),
+                (
+                    "Caixa do dia",
+                    Service.objects.filter(payment_date__date=day),
+                    Service.objects.filter(payment_date__gte=day_lower, payment_date__lt=day_upper),
+                ),
+                (
+                    "Caixa do mês",
+                    Service.objects.filter(payment_date__year=day.year, payment_date__month=day.month),
+                    Service.objects.filter(payment_date__gte=month_lower, payment_date__lt=month_upper),
+                ),
+                (
+                    "Caixa do mês por barbeiro",
+                    Service.objects.filter(payment_date__year=day.year, payment_date__month=day.month, barber=barber),
+                    Service.objects.filter(payment_date__gte=month_lower, payment_date__lt=month_upper, barber=barber),
+                ),
+                (
+                    "Despesas do mês",
+                    Expense.objects.filter(expense_date__year=day.year, expense_date__month=day.month),
+                    Expense.objects.filter(expense_date__gte=month_start, expense_date__lte=month_end),
+                ),
+            ]
+
+            for title, old_query, new_query in scenarios:
+                self.stdout.write(self.style.MIGRATE_HEADING(f"\n{title}"))
+                for label, queryset in (("antes", old_query), ("depois", new_query)):
+                    queryset = queryset.values_list('pk', flat=True)
+                    elapsed, rows = best_of(lambda qs=queryset: list(qs.all()), options['repeat'])
+                    self.stdout.write(f"  [{label}] {len(rows):,} linhas em {elapsed * 1000:.1f} ms")
+                    for line in queryset.explain().splitlines():
+                        self.stdout.write(f"      {line}")
@@ -0,0 +1,90 @@
+# barbershop/management/commands/bench_scheduling.py
+
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from barbershop.benchmarks import best_of, create_barbers, isolated_database
+from barbershop.models import Service, ServiceType
+from barbershop.scheduling import availability, business_hours, day_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o índice de disponibilidade (horários livres e barbeiro disponível) com muitos "
+        "agendamentos por barbeiro no mesmo dia, comparando com uma varredura linear."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--barbers', type=int, default=10)
+        parser.add_argument('--per-barber', type=int, default=300, help="Agendamentos por barbeiro no dia.")
+        parser.add_argument('--checks', type=int, default=10_000, help="Consultas de horário livre por medição.")
+        parser.add_argument('--repeat', type=int, default=5, help="Execuções por medição (vale a menor).")
+        parser.add_argument('--db-path', help="Arquivo SQLite temporário (padrão: diretório temporário).")
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        day = timezone.localdate()
+        opening, closing = business_hours(day)
+        minutes_open = int((closing - opening).total_seconds() // 60)
+
+        with isolated_database(options['db_path']):
+            barbers = create_barbers(options['barbers'])
+            quick = ServiceType.objects.create(name='Pezinho', price=10, estimated_time=2)
+
+            self.stdout.write(f"Gerando {options['per_barber']} agendamentos por barbeiro...")
+            with transaction.atomic():
+                services = Service.objects.bulk_create([
+                    Service(
+                        client_name=f'Cliente {i}',
+                        barber=barber,
+                        price=quick.price,
+                        appointment_datetime=opening + timedelta(minutes=rng.randrange(minutes_open - 2)),
+                    )
+                    for barber in barbers
+                    for i in range(options['per_barber'])
+                ])
+                Through = Service.service_types.through
+                Through.objects.bulk_create([Through(service_id=s.pk, servicetype_id=quick.pk) for s in services])
+
+            repeat = options['repeat']
+            elapsed, index = best_of(lambda: day_index(day), repeat)
+            self.stdout.write(f"Montagem do índice do dia (1 consulta): {elapsed * 1000:.1f} ms")
+
+            intervals = {
+                barber_id: list(zip(busy.starts, busy.ends)) for barber_id, busy in index.items()
+            }
+            probes = [
+                (rng.choice(barbers).pk, opening + timedelta(minutes=rng.randrange(minutes_open - 30)))
+                for _ in range(options['checks'])
+            ]
+            duration = timedelta(minutes=quick.estimated_time)
+
+            def indexed():
+                return sum(index[barber_id].is_free(start, start + duration) for barber_id, start in probes)
+
+            def linear():
+                return sum(
+                    not any(s < start + duration and start < e for s, e in intervals[barber_id])
+                    for barber_id, start in probes
+                )
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{options['checks']:,} consultas \"horário livre?\""))
+            for label, func in (("bisect", indexed), ("linear", linear)):
+                elapsed, free = best_of(func, repeat)
+                self.stdout.write(f"  [{label}] {elapsed * 1000:.1f} ms ({free:,} livres)")
+
+            self.stdout.write(self.style.MIGRATE_HEADING("\nEndpoint de horários (todos os barbeiros)"))
+            for label, at in (("horários do dia", None), ("barbeiro livre às 14:00", opening + timedelta(hours=6))):
+                elapsed, result = best_of(lambda at=at: availability(day, [quick.pk], at=at), repeat)
+                first = result['first_available']
+                self.stdout.write(
+                    f"  [{label}] {elapsed * 1000:.1f} ms, "
+                    f"primeiro: {first['barber']['username'] if first else '-'}"
+                )
+
+            merged = sum(len(busy) for busy in index.values())
+            self.stdout.write(f"\nIntervalos ocupados após unir sobreposições: {merged:,}")
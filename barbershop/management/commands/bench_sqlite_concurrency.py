@@ -0,0 +1,120 @@
+# barbershop/management/commands/bench_sqlite_concurrency.py
+
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection, connections, transaction
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+from barbershop.benchmarks import create_barbers, create_bench_services, isolated_database
+from barbershop.database import PRODUCTION_DATABASE_OPTIONS, configure_sqlite, is_lock_error, retry_on_lock
+from barbershop.models import Service
+from barbershop.summary import apply_service_changes, get_cashier_totals, rebuild_summary, snapshot_service
+from barbershop.utils import local_day_range
+
+
+class Command(BaseCommand):
+    help = (
+        "Simula vários tablets lendo e gravando ao mesmo tempo (threads) e compara vazão e erros "
+        "\"database is locked\" do SQLite padrão com o modo de produção (WAL, busy_timeout, retry)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--ops', type=int, default=300, help="Operações por thread.")
+        parser.add_argument('--write-ratio', type=float, default=0.3, help="Fração das operações que gravam.")
+        parser.add_argument('--services', type=int, default=50_000, help="Serviços já existentes no banco.")
+
+    def handle(self, *args, **options):
+        for label, production in (("SQLite padrão", False), ("Modo de produção", True)):
+            with isolated_database():
+                barbers = create_barbers(4)
+                create_bench_services(options['services'], barbers)
+                rebuild_summary()
+
+                with self._mode(production):
+                    elapsed, stats = self._run(options, [barber.pk for barber in barbers], production)
+
+            total = stats['read'] + stats['write']
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{label}"))
+            self.stdout.write(f"  {total:,} operações em {elapsed:.2f} s ({total / elapsed:,.0f} ops/s)")
+            self.stdout.write(f"  leituras: {stats['read']:,}  gravações: {stats['write']:,}")
+            self.stdout.write(f"  erros \"database is locked\": {stats['locked']:,}")
+
+    @contextmanager
+    def _mode(self, production):
+        saved = {key: connection.settings_dict.get(key) for key in PRODUCTION_DATABASE_OPTIONS}
+        if production:
+            # As threads abrem conexões a partir deste mesmo settings_dict
+            connection.settings_dict.update(PRODUCTION_DATABASE_OPTIONS)
+            connection_created.connect(configure_sqlite, dispatch_uid='bench_configure_sqlite')
+        connection.close()
+        try:
+            yield
+        finally:
+            connection_created.disconnect(dispatch_uid='bench_configure_sqlite')
+            connection.close()
+            connection.settings_dict.update(saved)
+
+    def _run(self, options, barber_ids, production):
+        day_lower, day_upper = local_day_range(timezone.localdate(), timezone.localdate())
+        month_start = timezone.localdate().replace(day=1)
+        stats = Counter()
+        lock = threading.Lock()
+        max_pk = Service.objects.order_by('-pk').values_list('pk', flat=True).first()
+
+        def write(rng):
+            # Mesmo padrão de mark_as_paid: lê o serviço e depois grava, na mesma transação
+            with transaction.atomic():
+                service = (
+                    Service.objects.filter(payment_date__isnull=True, pk__gte=rng.randrange(max_pk))
+                    .order_by('pk').first()
+                )
+                if service is None:
+                    return
+                before = snapshot_service(service)
+                service.payment_method = 'pix'
+                service.payment_date = timezone.now()
+                service.save()
+                apply_service_changes([(before, snapshot_service(service))])
+
+        def read(rng):
+            get_cashier_totals(month_start, timezone.localdate(), barber_id=rng.choice(barber_ids))
+            list(Service.objects.filter(
+                appointment_datetime__gte=day_lower, appointment_datetime__lt=day_upper,
+            ).order_by('appointment_datetime')[:50])
+
+        if production:
+            write = retry_on_lock(write)
+
+        def worker(seed):
+            rng = random.Random(seed)
+            local = Counter()
+            for _ in range(options['ops']):
+                kind = 'write' if rng.random() < options['write_ratio'] else 'read'
+                try:
+                    (write if kind == 'write' else read)(rng)
+                    local[kind] += 1
+                except OperationalError as error:
+                    if not is_lock_error(error):
+                        raise
+                    local['locked'] += 1
+                finally:
+                    # Fim da "requisição": fecha a conexão, a menos que CONN_MAX_AGE a mantenha
+                    close_old_connections()
+            connections.close_all()
+            with lock:
+                stats.update(local)
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started, stats
@@ -0,0 +1,66 @@
+# barbershop/management/commands/bench_static_bytes.py
+
+import re
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from barbershop.benchmarks import isolated_database
+from barbershop.staticfiles import IMMUTABLE_CACHE_CONTROL
+
+ASSET_PATTERN = re.compile(r'(?:href|src)="(/[^"]+\.(?:css|js))"')
+EXTERNAL_PATTERN = re.compile(r'(?:href|src)="(https?://[^"]+)"')
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede os bytes transferidos por carregamento das principais telas (HTML + CSS/JS locais): "
+        "arquivos sem compressão baixados a cada visita contra o pipeline do collectstatic "
+        "(gzip na primeira visita, cache imutável nas seguintes)."
+    )
+
+    def handle(self, *args, **options):
+        overrides = {'DEBUG': False, 'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver']}
+        with tempfile.TemporaryDirectory(prefix='barberapp-static-') as static_root, \
+                override_settings(STATIC_ROOT=static_root, **overrides), isolated_database():
+            call_command('collectstatic', interactive=False, verbosity=0)
+            user = User.objects.create_user('bench', password='bench')
+            logged_in = Client()
+            logged_in.force_login(user)
+            pages = [
+                ('login', Client(), reverse('barbershop:login')),
+                ('service_list', logged_in, reverse('barbershop:service_list')),
+                ('daily_cashier', logged_in, reverse('barbershop:daily_cashier')),
+            ]
+
+            self.stdout.write(self.style.MIGRATE_HEADING("\nBytes por carregamento (HTML + CSS/JS locais)"))
+            self.stdout.write(f"  {'tela':<15} {'antes':>10} {'1ª visita':>10} {'repetida':>10}  externos")
+            for name, client, url in pages:
+                html = client.get(url).content.decode()
+                before, first, repeat = self._measure(client, html)
+                self.stdout.write(
+                    f"  {name:<15} {before + len(html):>10,} {first + len(html):>10,} "
+                    f"{repeat + len(html):>10,}  {len(EXTERNAL_PATTERN.findall(html))}"
+                )
+
+        self.stdout.write(
+            "\nAntes: arquivos sem compressão e sem cache imutável, transferidos de novo a cada visita. "
+            "Os recursos externos (CDN) ficam fora da conta."
+        )
+
+    def _measure(self, client, html):
+        before = first = repeat = 0
+        for url in ASSET_PATTERN.findall(html):
+            plain = client.get(url)
+            compressed = client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+            before += len(b''.join(plain.streaming_content))
+            size = len(b''.join(compressed.streaming_content))
+            first += size
+            if compressed.headers['Cache-Control'] != IMMUTABLE_CACHE_CONTROL:
+                repeat += size
+        return before, first, repeat
@@ -0,0 +1,103 @@
+# barbershop/management/commands/bench_views.py
+
+import json
+import subprocess
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from barbershop.benchmarks import isolated_database, seed_database
+
+
+def _current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def _parse_sizes(value):
+    return [int(size) for size in value.split(',') if size.strip()]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede tempo e quantidade de consultas das principais telas (agenda, caixa, exportação CSV, "
+        "clientes) em bancos temporários de vários tamanhos e grava o resultado em JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=_parse_sizes, default=[10_000, 100_000, 1_000_000],
+            help="Quantidades de serviços, separadas por vírgula (padrão: 10000,100000,1000000).",
+        )
+        parser.add_argument('--years', type=float, default=2, help="Anos de histórico gerados.")
+        parser.add_argument('--repeat', type=int, default=5, help="Execuções por tela (vale a menor).")
+        parser.add_argument('--output', help="Arquivo JSON (padrão: bench_views-<commit>.json).")
+
+    def handle(self, *args, **options):
+        commit = _current_commit()
+        month = timezone.localdate().strftime('%Y-%m')
+        scenarios = [
+            ('service_list', reverse('barbershop:service_list')),
+            ('daily_cashier (dia)', reverse('barbershop:daily_cashier')),
+            ('daily_cashier (mês)', f"{reverse('barbershop:daily_cashier')}?filter_month={month}"),
+            ('export_cashier_csv (mês)', f"{reverse('barbershop:export_cashier_csv')}?filter_month={month}"),
+            ('client_list', reverse('barbershop:client_list')),
+        ]
+
+        results = []
+        for size in options['sizes']:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{size:,} serviços"))
+            with isolated_database():
+                created = seed_database(services=size, years=options['years'], log=self.stdout.write)
+                client = Client()
+                client.force_login(created['barbers'][0])
+
+                for name, url in scenarios:
+                    result = self._measure(client, url, options['repeat'])
+                    results.append({'services': size, 'view': name, 'url': url, **result})
+                    self.stdout.write(
+                        f"  {name:<26} {result['best_ms']:>9.1f} ms  {result['queries']:>3} consultas  "
+                        f"{result['bytes']:>10,} bytes"
+                    )
+
+        output = options['output'] or f'bench_views-{commit}.json'
+        with open(output, 'w') as f:
+            json.dump({
+                'commit': commit,
+                'generated_at': timezone.now().isoformat(),
+                'repeat': options['repeat'],
+                'results': results,
+            }, f, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"\nResultados gravados em {output}"))
+
+    def _measure(self, client, url, repeat):
+        timings = []
+        queries = size = None
+        for _ in range(repeat):
+            # Sem cache: mede as consultas de verdade a cada execução
+            cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url)
+                body = b''.join(response.streaming_content) if response.streaming else response.content
+                timings.append(time.perf_counter() - started)
+            if queries is None:
+                queries, size = len(captured), len(body)
+        timings.sort()
+        return {
+            'status': response.status_code,
+            'best_ms': round(timings[0] * 1000, 2),
+            'median_ms': round(timings[len(timings) // 2] * 1000, 2),
+            'queries': queries,
+            'bytes': size,
+        }
@@ -0,0 +1,42 @@
+# barbershop/management/commands/cashier_summary.py
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from barbershop.summary import rebuild_summary, verify_summary
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Data inválida: {value!r} (use AAAA-MM-DD).")
+
+
+class Command(BaseCommand):
+    help = "Reconstrói ou confere o resumo diário do caixa a partir dos serviços e despesas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help="Apaga e recria as linhas do resumo no período.")
+        parser.add_argument('--start', type=_parse_date, help="Primeiro dia do período (AAAA-MM-DD).")
+        parser.add_argument('--end', type=_parse_date, help="Último dia do período (AAAA-MM-DD).")
+
+    def handle(self, *args, **options):
+        start, end = options['start'], options['end']
+
+        if options['rebuild']:
+            total_rows = rebuild_summary(start, end)
+            self.stdout.write(self.style.SUCCESS(f"Resumo reconstruído: {total_rows} linhas."))
+            return
+
+        mismatches = verify_summary(start, end)
+        for key, expected, stored in mismatches:
+            day, barber_id, payment_method, service_type_id = key
+            self.stdout.write(
+                f"{day} barbeiro={barber_id} pagamento={payment_method or '-'} tipo={service_type_id}: "
+                f"esperado={expected} armazenado={stored}"
+            )
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} divergência(s) encontradas. Rode com --rebuild para corrigir.")
+        self.stdout.write(self.style.SUCCESS("Resumo do caixa confere com os dados brutos."))
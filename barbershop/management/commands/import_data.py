@@ -0,0 +1,99 @@
+# barbershop/management/commands/import_data.py
+
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from barbershop.importers import IMPORTERS, ImportRowError
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa clientes, serviços ou despesas de um arquivo CSV grande, em lotes (bulk_create) "
+        "e transações por bloco. Se um bloco falhar, rode de novo com --resume para continuar dali."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS), help="Tipo de dado do arquivo.")
+        parser.add_argument('path', help="Arquivo CSV (UTF-8, com cabeçalho).")
+        parser.add_argument('--delimiter', default=',', help="Separador de colunas (padrão: vírgula).")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Linhas por INSERT (bulk_create).")
+        parser.add_argument('--chunk-size', type=int, default=20_000, help="Linhas por transação.")
+        parser.add_argument('--resume', action='store_true', help="Continua a partir do último bloco gravado.")
+        parser.add_argument('--state-file', help="Arquivo de progresso (padrão: <path>.import-state.json).")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f"Arquivo não encontrado: {path}")
+        state_file = options['state_file'] or f"{path}.import-state.json"
+        batch_size, chunk_size = options['batch_size'], options['chunk_size']
+
+        skip = self._resume_position(state_file, options) if options['resume'] else 0
+        importer = IMPORTERS[options['kind']]()
+
+        started = time.perf_counter()
+        imported = 0
+        with open(path, newline='', encoding='utf-8-sig') as csv_file:
+            reader = csv.DictReader(csv_file, delimiter=options['delimiter'])
+            rows = enumerate(reader, start=1)
+            if skip:
+                self.stdout.write(f"Retomando após {skip:,} linhas já importadas.")
+                rows = islice(rows, skip, None)
+
+            done = skip
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                objects = []
+                for number, row in chunk:
+                    try:
+                        objects.append(importer.build(row))
+                    except ImportRowError as error:
+                        # +1 pelo cabeçalho
+                        raise CommandError(f"Linha {number + 1} do CSV: {error}. Corrija e rode com --resume.")
+
+                try:
+                    with transaction.atomic():
+                        importer.save(objects, batch_size)
+                except Exception as error:
+                    raise CommandError(
+                        f"Falha ao gravar o bloco das linhas {chunk[0][0]}-{chunk[-1][0]}: {error}. "
+                        f"Nada desse bloco foi gravado; rode com --resume para continuar."
+                    )
+
+                done = chunk[-1][0]
+                imported += len(objects)
+                self._write_state(state_file, options['kind'], path, done)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"  {done:,} linhas ({imported / elapsed:,.0f} linhas/s)")
+
+        if os.path.exists(state_file):
+            os.remove(state_file)
+        elapsed = time.perf_counter() - started
+        rate = imported / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{imported:,} registros importados em {elapsed:.1f} s ({rate:,.0f} linhas/s)."
+        ))
+
+    def _resume_position(self, state_file, options):
+        if not os.path.exists(state_file):
+            raise CommandError(f"Nenhum progresso salvo em {state_file}.")
+        with open(state_file) as f:
+            state = json.load(f)
+        if state.get('kind') != options['kind'] or state.get('path') != os.path.abspath(options['path']):
+            raise CommandError("O progresso salvo é de outro arquivo ou tipo de dado.")
+        return state['rows']
+
+    def _write_state(self, state_file, kind, path, rows):
+        # Escreve em arquivo temporário e renomeia, para nunca deixar o progresso pela metade
+        tmp_file = f"{state_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump({'kind': kind, 'path': os.path.abspath(path), 'rows': rows}, f)
+        os.replace(tmp_file, state_file)
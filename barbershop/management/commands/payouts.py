@@ -0,0 +1,46 @@
+# barbershop/management/commands/payouts.py
+
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from barbershop.commissions import is_closed, payout_statements
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Data inválida: {value!r} (use AAAA-MM-DD).")
+
+
+class Command(BaseCommand):
+    help = (
+        "Fecha e mostra a comissão de cada barbeiro em um período (padrão: o mês anterior). "
+        "Períodos encerrados são guardados; alterações nos dias do período apagam o fechamento guardado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=_parse_date, help="Primeiro dia do período (AAAA-MM-DD).")
+        parser.add_argument('--end', type=_parse_date, help="Último dia do período (AAAA-MM-DD).")
+        parser.add_argument('--refresh', action='store_true', help="Recalcula um período já guardado.")
+
+    def handle(self, *args, **options):
+        last_month_end = timezone.localdate().replace(day=1) - timedelta(days=1)
+        start = options['start'] or last_month_end.replace(day=1)
+        end = options['end'] or last_month_end
+        if end < start:
+            raise CommandError("O fim do período é anterior ao início.")
+
+        statements = payout_statements(start, end, store=True, refresh=options['refresh'])
+        state = "encerrado (guardado)" if is_closed(end) else "em aberto (não guardado)"
+        self.stdout.write(f"Fechamento de {start:%d/%m/%Y} a {end:%d/%m/%Y} — {state}")
+        for statement in statements:
+            barber = statement.barber.username if statement.barber else "Sem barbeiro"
+            self.stdout.write(
+                f"  {barber:<20} {statement.services_count:>6} serviços  "
+                f"cobrado R$ {statement.net:>12,.2f}  comissão R$ {statement.commission:>10,.2f}"
+            )
+        if not statements:
+            self.stdout.write("  Nenhum serviço pago no período.")
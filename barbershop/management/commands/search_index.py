@@ -0,0 +1,28 @@
+# barbershop/management/commands/search_index.py
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from barbershop.models import SearchToken
+from barbershop.search import SEARCH_KINDS, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Mostra o tamanho do índice de busca ou o recria a partir dos dados (--rebuild)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help="Apaga e recria o índice inteiro.")
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            started = time.perf_counter()
+            total = rebuild_index(log=self.stdout.write)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(f"Índice de busca recriado: {total:,} palavras em {elapsed:.1f} s."))
+            return
+
+        counts = dict(SearchToken.objects.values_list('kind').annotate(total=Count('id')).order_by())
+        for kind, spec in SEARCH_KINDS.items():
+            self.stdout.write(f"  {spec.label:<18} {counts.get(kind, 0):>12,} palavras")
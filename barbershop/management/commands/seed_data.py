@@ -0,0 +1,42 @@
+# barbershop/management/commands/seed_data.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from barbershop.benchmarks import seed_database
+from barbershop.models import Service
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera dados sintéticos (barbeiros, clientes, tipos de serviço, serviços com seus tipos e "
+        "despesas) ao longo de N anos, para testar as telas com volumes realistas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=10_000)
+        parser.add_argument('--barbers', type=int, default=8)
+        parser.add_argument('--clients', type=int, help="Padrão: 1 a cada 5 serviços.")
+        parser.add_argument('--service-types', type=int, default=8)
+        parser.add_argument('--expenses', type=int, help="Padrão: 1 a cada 50 serviços.")
+        parser.add_argument('--years', type=float, default=2, help="Anos de histórico até hoje.")
+        parser.add_argument('--seed', type=int, default=42, help="Semente do gerador (dados reproduzíveis).")
+        parser.add_argument('--force', action='store_true', help="Gera mesmo se o banco já tiver serviços.")
+
+    def handle(self, *args, **options):
+        if Service.objects.exists() and not options['force']:
+            raise CommandError("O banco já possui serviços. Use --force para acrescentar os dados sintéticos.")
+
+        created = seed_database(
+            services=options['services'],
+            barbers=options['barbers'],
+            clients=options['clients'],
+            service_types=options['service_types'],
+            expenses=options['expenses'],
+            years=options['years'],
+            seed=options['seed'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Gerados {len(created['barbers'])} barbeiros, {len(created['service_types'])} tipos de serviço, "
+            f"{created['clients']:,} clientes, {created['services']:,} serviços e {created['expenses']:,} despesas."
+        ))
@@ -0,0 +1,246 @@
+# barbershop/metrics.py
+"""
+Métricas por view: latência, quantidade de consultas e tempo total de SQL.
+
+RequestMetricsMiddleware abre um coletor por requisição (ContextVar) e um
+execute_wrapper instalado em toda conexão nova (sinal connection_created) soma
+cada consulta ao coletor ativo. Funciona com DEBUG desligado e também conta as
+consultas feitas em outras threads pelas views assíncronas, pois sync_to_async
+propaga o contexto.
+
+Cada resposta recebe o cabeçalho Server-Timing; os valores também alimentam
+histogramas em memória (por processo), publicados em /metrics no formato texto
+do Prometheus (apenas para staff).
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+_collector = ContextVar('barbershop_request_metrics', default=None)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class RequestStats:
+    """Consultas e tempo de SQL de uma requisição (pode receber dados de várias threads)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self._lock = threading.Lock()
+
+    def add_query(self, elapsed):
+        with self._lock:
+            self.queries += 1
+            self.sql_time += elapsed
+
+
+def record_sql(execute, sql, params, many, context):
+    """execute_wrapper: mede a consulta se houver uma requisição sendo medida."""
+    stats = _collector.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(time.perf_counter() - started)
+
+
+def install_sql_wrapper(sender, connection, **kwargs):
+    """Receptor de connection_created: instala record_sql na conexão nova."""
+    if record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_sql)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # último = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Histogramas em memória por (view, método, status)."""
+
+    METRICS = {
+        'barberapp_request_duration_seconds': ("Latência das requisições.", DURATION_BUCKETS),
+        'barberapp_request_queries': ("Consultas SQL por requisição.", QUERY_BUCKETS),
+        'barberapp_request_sql_seconds': ("Tempo total de SQL por requisição.", DURATION_BUCKETS),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {name: {} for name in self.METRICS}
+
+    def observe(self, labels, duration, queries, sql_time):
+        values = {
+            'barberapp_request_duration_seconds': duration,
+            'barberapp_request_queries': queries,
+            'barberapp_request_sql_seconds': sql_time,
+        }
+        with self._lock:
+            for name, value in values.items():
+                series = self._histograms[name]
+                if labels not in series:
+                    series[labels] = Histogram(self.METRICS[name][1])
+                series[labels].observe(value)
+
+    def render(self):
+        """Texto no formato de exposição do Prometheus (0.0.4)."""
+        lines = []
+        with self._lock:
+            for name, (help_text, buckets) in self.METRICS.items():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for labels, histogram in sorted(self._histograms[name].items()):
+                    base = ','.join(f'{key}="{_escape(value)}"' for key, value in labels)
+                    cumulative = 0
+                    for bound, count in zip((*buckets, '+Inf'), histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{base},le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_sum{{{base}}} {histogram.sum}')
+                    lines.append(f'{name}_count{{{base}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {name: {} for name in self.METRICS}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
+
+
+class RequestMetricsMiddleware:
+    """Mede cada requisição, adiciona Server-Timing e alimenta os histogramas."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _collector.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _collector.reset(token)
+        return self._finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _collector.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _collector.reset(token)
+        return self._finish(request, response, stats)
+
+    def _finish(self, request, response, stats):
+        response['Server-Timing'] = _server_timing(stats, time.perf_counter() - stats.started)
+        labels = _labels(request, response)
+        if response.streaming:
+            # As consultas continuam durante o envio do corpo: mede até o fechamento
+            stream_class = _AsyncTrackedStream if response.is_async else _TrackedStream
+            response.streaming_content = stream_class(response.streaming_content, stats, labels)
+        else:
+            _observe(labels, stats)
+        return response
+
+
+def _labels(request, response):
+    match = getattr(request, 'resolver_match', None)
+    # Nome da rota (não o caminho) para manter poucas séries
+    view = match.view_name if match else 'nao_encontrada'
+    return (('view', view), ('method', request.method), ('status', str(response.status_code)))
+
+
+def _observe(labels, stats):
+    registry.observe(labels, time.perf_counter() - stats.started, stats.queries, stats.sql_time)
+
+
+def _server_timing(stats, duration):
+    return (
+        f'app;dur={duration * 1000:.1f}, '
+        f'db;dur={stats.sql_time * 1000:.1f};desc="{stats.queries} consultas"'
+    )
+
+
+class _TrackedStream:
+    """
+    Corpo de uma resposta em streaming: as consultas feitas durante o envio entram em
+    `stats`, e as métricas são registradas uma vez quando o Django fecha a resposta
+    (ele chama o close() do iterador de conteúdo que tiver um).
+    """
+
+    def __init__(self, chunks, stats, labels):
+        self._chunks = chunks
+        self._stats = stats
+        self._labels = labels
+        self._closed = False
+
+    def __iter__(self):
+        return _tracked(self._chunks, self._stats)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            _observe(self._labels, self._stats)
+
+
+class _AsyncTrackedStream(_TrackedStream):
+    """_TrackedStream para respostas assíncronas (o Django escolhe pelo __aiter__)."""
+
+    __iter__ = None
+
+    def __aiter__(self):
+        return _atracked(self._chunks, self._stats)
+
+
+def _tracked(chunks, stats):
+    iterator = iter(chunks)
+    while True:
+        token = _collector.set(stats)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _collector.reset(token)
+        yield chunk
+
+
+async def _atracked(chunks, stats):
+    iterator = aiter(chunks)
+    while True:
+        token = _collector.set(stats)
+        try:
+            chunk = await anext(iterator)
+        except StopAsyncIteration:
+            return
+        finally:
+            _collector.reset(token)
+        yield chunk
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:34
+
+import django.db.models.deletion
+from django.conf import settings
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def populate_summary(apps, schema_editor):
+    """Preenche o resumo com o histórico já existente de serviços pagos e despesas."""
+    Service = apps.get_model('barbershop', 'Service')
+    Expense = apps.get_model('barbershop', 'Expense')
+    DailyCashierSummary = apps.get_model('barbershop', 'DailyCashierSummary')
+
+    totals = defaultdict(lambda: [Decimal('0'), 0, Decimal('0')])
+    paid = Service.objects.filter(payment_date__isnull=False).annotate(day=TruncDate('payment_date'))
+    for row in paid.values('day', 'barber_id', 'payment_method').annotate(income=Sum('price'), count=Count('id')).order_by():
+        key = (row['day'], row['barber_id'], row['payment_method'] or '', None)
+        totals[key][0] += row['income']
+        totals[key][1] += row['count']
+
+    through = Service.service_types.through.objects.filter(service__payment_date__isnull=False)
+    per_type = (
+        through.annotate(day=TruncDate('service__payment_date'))
+        .values('day', 'service__barber_id', 'service__payment_method', 'servicetype_id')
+        .annotate(income=Sum('service__price'), count=Count('service_id'))
+        .order_by()
+    )
+    for row in per_type:
+        key = (row['day'], row['service__barber_id'], row['service__payment_method'] or '', row['servicetype_id'])
+        totals[key][0] += row['income']
+        totals[key][1] += row['count']
+
+    for row in Expense.objects.values('expense_date').annotate(total=Sum('value')).order_by():
+        totals[(row['expense_date'], None, '', None)][2] += row['total']
+
+    DailyCashierSummary.objects.bulk_create([
+        DailyCashierSummary(
+            date=day, barber_id=barber_id, payment_method=payment_method, service_type_id=service_type_id,
+            income=income, services_count=count, expenses=expenses,
+        )
+        for (day, barber_id, payment_method, service_type_id), (income, count, expenses) in totals.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barbershop', '0006_expense'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCashierSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('payment_method', models.CharField(blank=True, choices=[('credito', 'Cartão de Crédito'), ('debito', 'Cartão de Débito'), ('pix', 'Pix'), ('dinheiro', 'Dinheiro')], default='', max_length=20)),
+                ('income', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Receitas (R$)')),
+                ('services_count', models.IntegerField(default=0, verbose_name='Serviços Pagos')),
+                ('expenses', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Despesas (R$)')),
+                ('barber', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cashier_summaries', to=settings.AUTH_USER_MODEL)),
+                ('service_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='cashier_summaries', to='barbershop.servicetype')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'service_type'], name='summary_date_type_idx')],
+            },
+        ),
+        migrations.RunPython(populate_summary, migrations.RunPython.noop),
+    ]
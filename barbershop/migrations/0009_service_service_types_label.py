@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:37
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def populate_labels(apps, schema_editor):
+    """Preenche o rótulo dos serviços existentes (equivale a `manage.py backfill_service_labels`)."""
+    Service = apps.get_model('barbershop', 'Service')
+    through = Service.service_types.through
+
+    names = defaultdict(list)
+    for service_id, name in through.objects.order_by('service_id', 'id').values_list('service_id', 'servicetype__name').iterator():
+        names[service_id].append(name)
+
+    services = [Service(pk=pk, service_types_label=', '.join(labels)) for pk, labels in names.items()]
+    Service.objects.bulk_update(services, ['service_types_label'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barbershop', '0008_service_expense_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='service_types_label',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Tipos de Serviço'),
+        ),
+        migrations.RunPython(populate_labels, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:38
+
+from django.db import migrations, models
+
+from barbershop.utils import normalize_search_text, only_digits
+
+
+def populate_search_fields(apps, schema_editor):
+    Client = apps.get_model('barbershop', 'Client')
+    clients = list(Client.objects.only('pk', 'name', 'phone_whatsapp'))
+    for client in clients:
+        client.search_name = normalize_search_text(client.name)[:100]
+        client.phone_digits = only_digits(client.phone_whatsapp)
+    Client.objects.bulk_update(clients, ['search_name', 'phone_digits'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barbershop', '0009_service_service_types_label'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='phone_digits',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='search_name',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(populate_search_fields, migrations.RunPython.noop),
+    ]
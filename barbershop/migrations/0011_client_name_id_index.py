@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barbershop', '0010_client_search_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['name', 'id'], name='client_name_id_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:03
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barbershop', '0011_client_name_id_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedService',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('client_name', models.CharField(max_length=100, verbose_name='Nome do Cliente')),
+                ('service_types_label', models.TextField(blank=True, default='', verbose_name='Tipos de Serviço')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=6, verbose_name='Preço Final')),
+                ('discount', models.DecimalField(decimal_places=2, default=0.0, max_digits=6, verbose_name='Desconto (R$)')),
+                ('appointment_datetime', models.DateTimeField(blank=True, null=True)),
+                ('payment_method', models.CharField(blank=True, choices=[('credito', 'Cartão de Crédito'), ('debito', 'Cartão de Débito'), ('pix', 'Pix'), ('dinheiro', 'Dinheiro')], max_length=20, null=True)),
+                ('payment_date', models.DateTimeField()),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('barber', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_services', to=settings.AUTH_USER_MODEL)),
+                ('service_types', models.ManyToManyField(related_name='archived_appointments', to='barbershop.servicetype', verbose_name='Tipos de Serviço')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['payment_date', 'barber'], name='archived_paydate_barber_idx'), models.Index(fields=['payment_date', 'payment_method'], name='archived_paydate_method_idx')],
+            },
+        ),
+    ]
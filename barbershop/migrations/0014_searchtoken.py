@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:07
+
+from django.db import migrations, models
+
+from barbershop.utils import only_digits, search_tokens
+
+# Mesmos campos de search.SEARCH_KINDS: (modelo, campos de palavras, campos de telefone)
+INDEXED = {
+    'client': ('Client', ('name',), ('phone_whatsapp',)),
+    'service': ('Service', ('client_name', 'service_types_label'), ()),
+    'service_type': ('ServiceType', ('name',), ()),
+    'expense': ('Expense', ('description',), ()),
+}
+
+
+def populate_search_index(apps, schema_editor):
+    SearchToken = apps.get_model('barbershop', 'SearchToken')
+    for kind, (model_name, words, digits) in INDEXED.items():
+        model = apps.get_model('barbershop', model_name)
+        tokens = []
+        for row in model.objects.values('id', *words, *digits).iterator(chunk_size=2000):
+            values = {token[:40] for field in words for token in search_tokens(row[field])}
+            for field in digits:
+                # Com e sem DDD (últimos 9 e 8 dígitos), como search.phone_tokens
+                number = only_digits(row[field])[:40]
+                values.update(number[-length:] for length in (len(number), 9, 8) if len(number) >= length > 0)
+            tokens.extend(SearchToken(kind=kind, object_id=row['id'], token=token) for token in values)
+            if len(tokens) >= 5000:
+                SearchToken.objects.bulk_create(tokens, batch_size=500)
+                tokens = []
+        SearchToken.objects.bulk_create(tokens, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barbershop', '0013_change_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('token', models.CharField(max_length=40)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'token', 'object_id'], name='search_kind_token_idx'), models.Index(fields=['kind', 'object_id'], name='search_kind_object_idx')],
+            },
+        ),
+        migrations.RunPython(populate_search_index, migrations.RunPython.noop),
+    ]
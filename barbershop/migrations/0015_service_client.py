@@ -0,0 +1,77 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+from barbershop.utils import normalize_search_text
+
+LINK_BATCH_SIZE = 2000
+
+
+def link_services_to_clients(apps, schema_editor):
+    """
+    Liga serviços (e arquivados) ao cliente cujo nome normalizado é igual ao client_name.
+    Nomes repetidos entre clientes ficam sem ligação: não dá para saber qual é o certo.
+    Os serviços ligados têm updated_at atualizado para que o feed de alterações envie
+    o client_id (o arquivo não entra no feed e guarda o updated_at original).
+    """
+    Client = apps.get_model('barbershop', 'Client')
+    ids_by_name = {}
+    repeated = set()
+    for pk, search_name in Client.objects.values_list('id', 'search_name').iterator(chunk_size=5000):
+        if search_name in ids_by_name:
+            repeated.add(search_name)
+        ids_by_name[search_name] = pk
+    for search_name in repeated:
+        del ids_by_name[search_name]
+
+    now = timezone.now()
+    for model_name in ('Service', 'ArchivedService'):
+        model = apps.get_model('barbershop', model_name)
+        fields = ['client', 'updated_at'] if model_name == 'Service' else ['client']
+        last_id = 0
+        while True:
+            rows = list(
+                model.objects.filter(pk__gt=last_id).order_by('pk').values_list('id', 'client_name')[:LINK_BATCH_SIZE]
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            linked = []
+            for pk, client_name in rows:
+                client_id = ids_by_name.get(normalize_search_text(client_name)[:100])
+                if client_id:
+                    linked.append(model(pk=pk, client_id=client_id, updated_at=now))
+            model.objects.bulk_update(linked, fields, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barbershop', '0014_searchtoken'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedservice',
+            name='client',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_services', to='barbershop.client'),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='client',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='services', to='barbershop.client', verbose_name='Cliente'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedservice',
+            index=models.Index(fields=['client', 'appointment_datetime'], name='archived_client_appt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['client', 'appointment_datetime'], name='service_client_appt_idx'),
+        ),
+        migrations.RunPython(link_services_to_clients, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:16
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barbershop', '0015_service_client'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayoutPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateField(verbose_name='Início')),
+                ('end', models.DateField(verbose_name='Fim')),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'unique_together': {('start', 'end')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PayoutStatement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('services_count', models.IntegerField(default=0, verbose_name='Serviços Pagos')),
+                ('gross', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Valor de Tabela (R$)')),
+                ('discount', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Descontos (R$)')),
+                ('net', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Valor Cobrado (R$)')),
+                ('commission', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Comissão (R$)')),
+                ('barber', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payout_statements', to=settings.AUTH_USER_MODEL)),
+                ('period', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='statements', to='barbershop.payoutperiod')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PayoutLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service_type_name', models.CharField(blank=True, default='', max_length=100)),
+                ('services_count', models.IntegerField(default=0, verbose_name='Serviços')),
+                ('gross', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Valor de Tabela (R$)')),
+                ('discount', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Descontos (R$)')),
+                ('net', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Valor Cobrado (R$)')),
+                ('percentage', models.DecimalField(decimal_places=2, max_digits=5, verbose_name='Comissão (%)')),
+                ('commission', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Comissão (R$)')),
+                ('service_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='barbershop.servicetype')),
+                ('statement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='barbershop.payoutstatement')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CommissionRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('percentage', models.DecimalField(decimal_places=2, max_digits=5, verbose_name='Comissão (%)')),
+                ('barber', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='commission_rules', to=settings.AUTH_USER_MODEL, verbose_name='Barbeiro')),
+                ('service_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='commission_rules', to='barbershop.servicetype', verbose_name='Tipo de Serviço')),
+            ],
+            options={
+                'unique_together': {('barber', 'service_type')},
+            },
+        ),
+    ]
@@ -4,6 +4,8 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone # NOVO: Necessário para a data padrão da despesa
 
+from .utils import normalize_search_text, only_digits
+
 # Opções para a forma de pagamento
 PAYMENT_CHOICES = [
     ('credito', 'Cartão de Crédito'),
@@ -11,15 +13,39 @@ PAYMENT_CHOICES = [
     ('pix', 'Pix'),
     ('dinheiro', 'Dinheiro'),
 ]
+# Rótulo de cada forma de pagamento, para linhas lidas com values_list (sem get_payment_method_display)
+PAYMENT_LABELS = dict(PAYMENT_CHOICES)
 
 class Client(models.Model):
     """Modelo para armazenar informações dos clientes."""
     name = models.CharField(max_length=100, verbose_name="Nome do Cliente")
     phone_whatsapp = models.CharField(max_length=20, blank=True, null=True, verbose_name="Fone/WhatsApp")
 
+    # Campos normalizados e indexados para o autocomplete (preenchidos no save)
+    search_name = models.CharField(max_length=100, blank=True, default='', editable=False, db_index=True)
+    phone_digits = models.CharField(max_length=20, blank=True, default='', editable=False, db_index=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def save(self, *args, **kwargs):
+        self.search_name = normalize_search_text(self.name)[:100]
+        self.phone_digits = only_digits(self.phone_whatsapp)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'search_name', 'phone_digits', 'updated_at'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.name
 
+    class Meta:
+        # Chave da paginação por cursor da lista de clientes
+        indexes = [
+            models.Index(fields=['name', 'id'], name='client_name_id_idx'),
+            # Feed de alterações (changefeed.py)
+            models.Index(fields=['updated_at', 'id'], name='client_updated_id_idx'),
+        ]
+
 class ServiceType(models.Model):
     """Modelo para os tipos de serviço oferecidos."""
     name = models.CharField(max_length=100, verbose_name="Nome do Serviço")
@@ -30,8 +56,16 @@ class ServiceType(models.Model):
         return f"{self.name} (R$ {self.price})"
 
 class Service(models.Model):
+    # Nome exibido (cópia do nome do cliente, mantida pelos sinais) e o cliente cadastrado, se houver
     client_name = models.CharField(max_length=100, verbose_name="Nome do Cliente")
+    # Sem índice próprio: o índice (client, appointment_datetime) já atende as buscas por cliente
+    client = models.ForeignKey(
+        Client, on_delete=models.SET_NULL, null=True, blank=True, db_index=False,
+        related_name='services', verbose_name="Cliente",
+    )
     service_types = models.ManyToManyField(ServiceType, related_name='appointments', verbose_name="Tipos de Serviço")
+    # Cópia desnormalizada dos nomes dos tipos ("Corte, Barba"), mantida pelos sinais em signals.py
+    service_types_label = models.TextField(blank=True, default='', editable=False, verbose_name="Tipos de Serviço")
     barber = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='services') 
     price = models.DecimalField(max_digits=6, decimal_places=2, verbose_name="Preço Final")
     discount = models.DecimalField(max_digits=6, decimal_places=2, default=0.00, verbose_name="Desconto (R$)")
@@ -46,6 +80,57 @@ class Service(models.Model):
     def __str__(self):
         return f"Serviço para {self.client_name} em {self.appointment_datetime}"
 
+    class Meta:
+        # Índices para os filtros por intervalo de data do caixa e da agenda
+        indexes = [
+            models.Index(fields=['payment_date', 'barber'], name='service_paydate_barber_idx'),
+            models.Index(fields=['payment_date', 'payment_method'], name='service_paydate_method_idx'),
+            models.Index(fields=['appointment_datetime'], name='service_appointment_idx'),
+            models.Index(fields=['updated_at', 'id'], name='service_updated_id_idx'),
+            # Histórico do cliente (clients.py)
+            models.Index(fields=['client', 'appointment_datetime'], name='service_client_appt_idx'),
+        ]
+
+# ----------------------------------------------------------------------
+# Arquivo de serviços antigos (ver archive.py)
+# ----------------------------------------------------------------------
+class ArchivedService(models.Model):
+    """
+    Serviço pago antigo movido da tabela Service pelo comando `archive_services`.
+
+    Mesmos campos de Service e o mesmo id (único entre as duas tabelas), para que o
+    caixa, a exportação e os relatórios possam juntar as duas fontes. Não é editado.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    client_name = models.CharField(max_length=100, verbose_name="Nome do Cliente")
+    client = models.ForeignKey(
+        Client, on_delete=models.SET_NULL, null=True, blank=True, db_index=False, related_name='archived_services',
+    )
+    service_types = models.ManyToManyField(ServiceType, related_name='archived_appointments', verbose_name="Tipos de Serviço")
+    service_types_label = models.TextField(blank=True, default='', verbose_name="Tipos de Serviço")
+    barber = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='archived_services')
+    price = models.DecimalField(max_digits=6, decimal_places=2, verbose_name="Preço Final")
+    discount = models.DecimalField(max_digits=6, decimal_places=2, default=0.00, verbose_name="Desconto (R$)")
+    appointment_datetime = models.DateTimeField(null=True, blank=True)
+
+    payment_method = models.CharField(max_length=20, choices=PAYMENT_CHOICES, null=True, blank=True)
+    payment_date = models.DateTimeField()
+
+    # Valores copiados do serviço original (sem auto_now)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Serviço arquivado para {self.client_name} em {self.appointment_datetime}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['payment_date', 'barber'], name='archived_paydate_barber_idx'),
+            models.Index(fields=['payment_date', 'payment_method'], name='archived_paydate_method_idx'),
+            models.Index(fields=['client', 'appointment_datetime'], name='archived_client_appt_idx'),
+        ]
+
 # ----------------------------------------------------------------------
 # NOVO MODELO: Despesas da Barbearia
 # ----------------------------------------------------------------------
@@ -57,10 +142,145 @@ class Expense(models.Model):
     # Usa DateField para registrar a data da despesa (necessário para filtro no caixa)
     expense_date = models.DateField(default=timezone.now, verbose_name="Data da Despesa") 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Despesa: {self.description} - R${self.value}"
 
     class Meta:
         # Ordena as despesas da mais recente para a mais antiga por padrão
-        ordering = ['-expense_date']
\ No newline at end of file
+        ordering = ['-expense_date']
+        indexes = [
+            models.Index(fields=['expense_date'], name='expense_date_idx'),
+            models.Index(fields=['updated_at', 'id'], name='expense_updated_id_idx'),
+        ]
+
+# ----------------------------------------------------------------------
+# Registro de exclusões para o feed de alterações (ver changefeed.py)
+# ----------------------------------------------------------------------
+class Tombstone(models.Model):
+    """Marca a exclusão de um serviço, despesa ou cliente, para quem sincroniza pelo feed."""
+    MODEL_CHOICES = [
+        ('service', 'Serviço'),
+        ('expense', 'Despesa'),
+        ('client', 'Cliente'),
+    ]
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.get_model_display()} {self.object_id} excluído em {self.deleted_at}"
+
+# ----------------------------------------------------------------------
+# Índice de busca (ver search.py)
+# ----------------------------------------------------------------------
+class SearchToken(models.Model):
+    """Uma palavra normalizada (ou o telefone só com dígitos) de um cliente, serviço, tipo ou despesa."""
+    kind = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    token = models.CharField(max_length=40)
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.token}"
+
+    class Meta:
+        indexes = [
+            # Busca por prefixo dentro de um tipo de objeto (cobre a consulta inteira)
+            models.Index(fields=['kind', 'token', 'object_id'], name='search_kind_token_idx'),
+            # Reindexação/remoção de um objeto
+            models.Index(fields=['kind', 'object_id'], name='search_kind_object_idx'),
+        ]
+
+# ----------------------------------------------------------------------
+# NOVO MODELO: Resumo diário do Caixa (pré-agregado)
+# ----------------------------------------------------------------------
+class DailyCashierSummary(models.Model):
+    """
+    Totais do caixa pré-agregados por dia, barbeiro, forma de pagamento e tipo de serviço.
+
+    Linhas com service_type vazio guardam o total de cada serviço uma única vez; linhas
+    com service_type preenchido guardam o total dos serviços que contêm aquele tipo
+    (mesma semântica do filtro por tipo no caixa). As despesas ficam em linhas sem
+    barbeiro, forma de pagamento ou tipo. Mantido por barbershop/summary.py.
+    """
+    date = models.DateField(verbose_name="Data")
+    barber = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='cashier_summaries')
+    payment_method = models.CharField(max_length=20, choices=PAYMENT_CHOICES, blank=True, default='')
+    service_type = models.ForeignKey(ServiceType, on_delete=models.CASCADE, null=True, blank=True, related_name='cashier_summaries')
+
+    income = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Receitas (R$)")
+    services_count = models.IntegerField(default=0, verbose_name="Serviços Pagos")
+    expenses = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Despesas (R$)")
+
+    def __str__(self):
+        return f"Resumo do caixa em {self.date}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'service_type'], name='summary_date_type_idx'),
+        ]
+
+# ----------------------------------------------------------------------
+# Comissões e fechamento dos barbeiros (ver commissions.py)
+# ----------------------------------------------------------------------
+class CommissionRule(models.Model):
+    """
+    Percentual de comissão. Sem barbeiro vale para todos; sem tipo de serviço vale para
+    todos os tipos. Vale a regra mais específica (barbeiro e tipo > barbeiro > tipo > geral).
+    """
+    barber = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='commission_rules', verbose_name="Barbeiro")
+    service_type = models.ForeignKey(ServiceType, on_delete=models.CASCADE, null=True, blank=True, related_name='commission_rules', verbose_name="Tipo de Serviço")
+    percentage = models.DecimalField(max_digits=5, decimal_places=2, verbose_name="Comissão (%)")
+
+    def __str__(self):
+        barber = self.barber.username if self.barber_id else "Todos os barbeiros"
+        service_type = self.service_type.name if self.service_type_id else "todos os tipos"
+        return f"{barber} / {service_type}: {self.percentage}%"
+
+    class Meta:
+        unique_together = ('barber', 'service_type')
+
+
+class PayoutPeriod(models.Model):
+    """Período de pagamento já encerrado cujos fechamentos foram calculados e guardados."""
+    start = models.DateField(verbose_name="Início")
+    end = models.DateField(verbose_name="Fim")
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Fechamento de {self.start} a {self.end}"
+
+    class Meta:
+        unique_together = ('start', 'end')
+
+
+class PayoutStatement(models.Model):
+    """Fechamento de um barbeiro em um período: totais dos serviços pagos e a comissão."""
+    period = models.ForeignKey(PayoutPeriod, on_delete=models.CASCADE, null=True, blank=True, related_name='statements')
+    barber = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='payout_statements')
+    services_count = models.IntegerField(default=0, verbose_name="Serviços Pagos")
+    gross = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Valor de Tabela (R$)")
+    discount = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Descontos (R$)")
+    net = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Valor Cobrado (R$)")
+    commission = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Comissão (R$)")
+
+    def __str__(self):
+        return f"Fechamento de {self.barber} ({self.period})"
+
+
+class PayoutLine(models.Model):
+    """Parte do fechamento referente a um tipo de serviço (vazio: serviços sem tipo)."""
+    statement = models.ForeignKey(PayoutStatement, on_delete=models.CASCADE, related_name='lines')
+    service_type = models.ForeignKey(ServiceType, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    # Nome do tipo na data do fechamento
+    service_type_name = models.CharField(max_length=100, blank=True, default='')
+    services_count = models.IntegerField(default=0, verbose_name="Serviços")
+    gross = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Valor de Tabela (R$)")
+    discount = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Descontos (R$)")
+    net = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Valor Cobrado (R$)")
+    percentage = models.DecimalField(max_digits=5, decimal_places=2, verbose_name="Comissão (%)")
+    commission = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Comissão (R$)")
+
+    def __str__(self):
+        return f"{self.service_type_name or 'Sem tipo'}: {self.commission}"
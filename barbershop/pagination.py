@@ -0,0 +1,143 @@
+# barbershop/pagination.py
+"""
+Paginação por cursor (keyset).
+
+Em vez de OFFSET, cada página continua a partir da chave de ordenação do último item
+da página anterior (ex.: nome e id). Assim, a página N custa o mesmo que a página 1,
+desde que exista um índice sobre as colunas da chave.
+
+O cursor vem da URL e pode ter sido alterado: decode_cursor() confere o tipo de cada
+posição e, se algum não bater, trata o cursor como inválido (None), igual a um token
+malformado.
+"""
+
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from django.db.models import Q
+from django.utils import timezone
+
+# Tipo esperado no cursor para cada tipo de campo usado em chaves de ordenação
+_FIELD_TYPES = {
+    'AutoField': int, 'BigAutoField': int, 'ForeignKey': int,
+    'IntegerField': int, 'BigIntegerField': int, 'PositiveIntegerField': int,
+    'CharField': str, 'TextField': str,
+    'DateTimeField': datetime, 'DateField': date,
+}
+
+
+class KeysetPage:
+    """Itens de uma página e o cursor para a próxima (None na última)."""
+
+    def __init__(self, items, next_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+    return value
+
+
+def encode_cursor(values):
+    """Serializa a chave de ordenação em um token seguro para URL."""
+    payload = json.dumps([_encode_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def _matches(value, expected):
+    """
+    `value` corresponde a `expected`: um tipo (datetime exige fuso), None (nulo), um
+    conjunto de valores aceitos ou uma tupla de alternativas.
+    """
+    if isinstance(expected, tuple):
+        return any(_matches(value, option) for option in expected)
+    if expected is None:
+        return value is None
+    if isinstance(value, bool) or isinstance(value, (list, dict)):
+        return False
+    if isinstance(expected, frozenset):
+        return value in expected
+    if expected is datetime:
+        return isinstance(value, datetime) and timezone.is_aware(value)
+    if expected is date:
+        return isinstance(value, date) and not isinstance(value, datetime)
+    return isinstance(value, expected)
+
+
+def field_types(model, fields):
+    """Tipos esperados no cursor para a chave `fields` de `model`."""
+    return tuple(_FIELD_TYPES[model._meta.get_field(field).get_internal_type()] for field in fields)
+
+
+def decode_cursor(token, types):
+    """
+    Lê um cursor gerado por encode_cursor(), com uma posição para cada item de `types`
+    (ver _matches). Devolve None se o token for inválido ou algum valor não tiver o tipo esperado.
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list):
+            return None
+        values = [_decode_value(value) for value in values]
+    except (ValueError, TypeError, binascii.Error):
+        return None
+    if len(values) != len(types) or not all(map(_matches, values, types)):
+        return None
+    return values
+
+
+def keyset_after(fields, values, descending=False):
+    """Condição "vem depois de `values`" na ordenação por `fields` (ex.: (name, id) > (n, i))."""
+    operator = 'lt' if descending else 'gt'
+    condition = Q()
+    for position, field in enumerate(fields):
+        equal_prefix = {prefix: value for prefix, value in zip(fields[:position], values[:position])}
+        condition |= Q(**equal_prefix, **{f'{field}__{operator}': values[position]})
+    return condition
+
+
+def keyset_paginate(queryset, fields, cursor, page_size, descending=False):
+    """
+    Pagina `queryset` pela chave `fields` (o último campo deve ser único, ex.: id).
+    Busca page_size + 1 linhas para saber se existe próxima página.
+    """
+    values = decode_cursor(cursor, field_types(queryset.model, fields))
+    if values is not None:
+        queryset = queryset.filter(keyset_after(fields, values, descending))
+
+    ordering = [f'-{field}' if descending else field for field in fields]
+    items = list(queryset.order_by(*ordering)[:page_size + 1])
+
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = encode_cursor([getattr(items[-1], field) for field in fields])
+    return KeysetPage(items, next_cursor)
@@ -0,0 +1,156 @@
+# barbershop/scheduling.py
+"""
+Disponibilidade dos barbeiros (horários livres e barbeiro disponível).
+
+A duração de um agendamento é a soma do `estimated_time` dos seus tipos de serviço.
+Para cada barbeiro e dia, os agendamentos existentes viram um índice de intervalos
+ocupados (BarberDay): intervalos ordenados e unidos, em duas listas paralelas de
+início e fim. Saber se [início, fim) está livre é uma busca binária (bisect) sobre
+essas listas, ou seja, O(log n) no número de agendamentos do dia.
+
+O índice de um dia é montado com uma única consulta (day_index), pelo índice
+service_appointment_idx.
+"""
+
+from bisect import bisect_right
+from datetime import time, timedelta
+
+from django.contrib.auth.models import User
+from django.db.models import Sum
+from django.utils import timezone
+
+from .catalog import get_catalog
+from .models import Service
+from .utils import local_day_range, local_day_start
+
+# Horário de funcionamento e intervalo entre os horários oferecidos
+OPENING_TIME = time(8, 0)
+CLOSING_TIME = time(20, 0)
+SLOT_STEP_MINUTES = 15
+
+# Duração assumida para agendamentos sem tipo de serviço
+DEFAULT_DURATION_MINUTES = 30
+
+
+class BarberDay:
+    """Intervalos ocupados de um barbeiro em um dia (ordenados e sem sobreposição)."""
+
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.ends = []
+        for start, end in sorted(intervals):
+            if end <= start:
+                continue
+            if self.ends and start <= self.ends[-1]:
+                # Sobrepõe (ou encosta) no anterior: une os dois
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def is_free(self, start, end):
+        """[start, end) não colide com nenhum intervalo ocupado."""
+        # Primeiro intervalo que termina depois de start; livre se ele começa em end ou depois
+        position = bisect_right(self.ends, start)
+        return position == len(self.starts) or self.starts[position] >= end
+
+    def gaps(self, opening, closing):
+        """Intervalos livres [início, fim) dentro do expediente."""
+        position = bisect_right(self.ends, opening)
+        cursor = opening
+        while position < len(self.starts) and self.starts[position] < closing:
+            if self.starts[position] > cursor:
+                yield cursor, self.starts[position]
+            cursor = max(cursor, self.ends[position])
+            position += 1
+        if cursor < closing:
+            yield cursor, closing
+
+    def free_slots(self, duration, opening, closing, step=timedelta(minutes=SLOT_STEP_MINUTES)):
+        """Inícios possíveis (alinhados a `step` a partir da abertura) para um atendimento de `duration`."""
+        for gap_start, gap_end in self.gaps(opening, closing):
+            # Alinha o início à grade de horários do dia
+            offset = (gap_start - opening) % step
+            start = gap_start if not offset else gap_start + (step - offset)
+            while start + duration <= gap_end:
+                yield start
+                start += step
+
+
+def business_hours(day):
+    """Abertura e fechamento (aware) do dia."""
+    opening = local_day_start(day) + timedelta(hours=OPENING_TIME.hour, minutes=OPENING_TIME.minute)
+    closing = local_day_start(day) + timedelta(hours=CLOSING_TIME.hour, minutes=CLOSING_TIME.minute)
+    return opening, closing
+
+
+def services_duration(service_type_ids):
+    """Duração total dos tipos de serviço informados (pelo catálogo em cache)."""
+    estimated = {service_type['id']: service_type['estimated_time'] for service_type in get_catalog()}
+    minutes = sum(estimated.get(int(pk), 0) for pk in service_type_ids)
+    return timedelta(minutes=minutes or DEFAULT_DURATION_MINUTES)
+
+
+def day_index(day, barber_ids=None, exclude_service_id=None):
+    """{barber_id: BarberDay} com os agendamentos do dia, em uma consulta."""
+    lower, upper = local_day_range(day, day)
+    appointments = Service.objects.filter(
+        appointment_datetime__gte=lower,
+        appointment_datetime__lt=upper,
+        barber__isnull=False,
+    )
+    if barber_ids is not None:
+        appointments = appointments.filter(barber_id__in=barber_ids)
+    if exclude_service_id:
+        appointments = appointments.exclude(pk=exclude_service_id)
+    appointments = appointments.values('pk', 'barber_id', 'appointment_datetime').annotate(
+        minutes=Sum('service_types__estimated_time'),
+    ).order_by()
+
+    intervals = {}
+    for appointment in appointments:
+        start = appointment['appointment_datetime']
+        end = start + timedelta(minutes=appointment['minutes'] or DEFAULT_DURATION_MINUTES)
+        intervals.setdefault(appointment['barber_id'], []).append((start, end))
+
+    barber_ids = intervals.keys() if barber_ids is None else barber_ids
+    return {barber_id: BarberDay(intervals.get(barber_id, ())) for barber_id in barber_ids}
+
+
+def is_barber_free(barber_id, start, duration, exclude_service_id=None):
+    """O barbeiro está livre em [start, start + duration)?"""
+    index = day_index(timezone.localtime(start).date(), [barber_id], exclude_service_id)
+    return index[barber_id].is_free(start, start + duration)
+
+
+def availability(day, service_type_ids, barber_ids=None, at=None, exclude_service_id=None):
+    """
+    Horários livres de cada barbeiro no dia para os serviços informados e o primeiro
+    barbeiro disponível: livre em `at`, se informado, ou com o horário mais cedo.
+    """
+    duration = services_duration(service_type_ids)
+    opening, closing = business_hours(day)
+
+    barbers = User.objects.order_by('username')
+    if barber_ids is not None:
+        barbers = barbers.filter(pk__in=barber_ids)
+    barbers = list(barbers.values('id', 'username'))
+    index = day_index(day, [barber['id'] for barber in barbers], exclude_service_id)
+
+    result = []
+    first = None
+    for barber in barbers:
+        busy = index[barber['id']]
+        slots = list(busy.free_slots(duration, opening, closing))
+        result.append({'id': barber['id'], 'username': barber['username'], 'slots': slots})
+
+        if at is not None:
+            if first is None and opening <= at and at + duration <= closing and busy.is_free(at, at + duration):
+                first = {'barber': barber, 'start': at}
+        elif slots and (first is None or slots[0] < first['start']):
+            first = {'barber': barber, 'start': slots[0]}
+
+    return {'duration': duration, 'barbers': result, 'first_available': first}
@@ -0,0 +1,169 @@
+# barbershop/search.py
+"""
+Índice de busca de clientes, serviços, tipos de serviço e despesas.
+
+Cada objeto é quebrado em palavras normalizadas (sem acentos, minúsculas) e, no
+caso do telefone, no número só com dígitos (com e sem DDD); cada palavra vira uma
+linha de SearchToken. Uma busca procura cada termo digitado como prefixo, com o mesmo
+intervalo [termo, termo + maior caractere) do autocomplete de clientes, sobre o
+índice (kind, token, object_id): nenhum LIKE '%x%', nenhum JOIN com o
+ManyToMany, e o custo depende de quantos objetos casam, não do tamanho da tabela.
+
+Preferimos uma tabela de palavras a uma tabela virtual FTS5 do SQLite porque ela
+funciona igual em qualquer banco e segue o mesmo padrão dos campos de busca já
+existentes. O índice é mantido pelos sinais (signals.py) e pelos importadores;
+`manage.py search_index --rebuild` o recria do zero.
+"""
+
+from collections import defaultdict, namedtuple
+
+from django.db.models import Q
+
+from .models import Client, Expense, SearchToken, Service, ServiceType
+from .utils import only_digits, prefix_range, search_tokens
+
+TOKEN_MAX_LENGTH = 40
+MIN_TERM_LENGTH = 2
+SEARCH_BATCH_SIZE = 500
+SEARCH_RESULTS_LIMIT = 20
+
+SearchKind = namedtuple('SearchKind', ['model', 'label', 'words', 'digits'])
+
+SEARCH_KINDS = {
+    'client': SearchKind(Client, 'Clientes', ('name',), ('phone_whatsapp',)),
+    'service': SearchKind(Service, 'Serviços', ('client_name', 'service_types_label'), ()),
+    'service_type': SearchKind(ServiceType, 'Tipos de Serviço', ('name',), ()),
+    'expense': SearchKind(Expense, 'Despesas', ('description',), ()),
+}
+
+
+def indexed_fields(kind):
+    spec = SEARCH_KINDS[kind]
+    return {*spec.words, *spec.digits}
+
+
+def document_tokens(kind, values):
+    """Palavras de um objeto (dicionário com os campos indexados)."""
+    spec = SEARCH_KINDS[kind]
+    tokens = set()
+    for field in spec.words:
+        tokens.update(token[:TOKEN_MAX_LENGTH] for token in search_tokens(values[field]))
+    for field in spec.digits:
+        tokens.update(phone_tokens(values[field]))
+    return tokens
+
+
+def phone_tokens(value):
+    """O telefone só com dígitos e também sem DDD/país (últimos 9 e 8 dígitos), para achar "98765" em "(11) 98765-4321"."""
+    digits = only_digits(value)[:TOKEN_MAX_LENGTH]
+    return {digits[-length:] for length in (len(digits), 9, 8) if len(digits) >= length > 0}
+
+
+def _rows(kind, queryset):
+    return queryset.values('id', *indexed_fields(kind))
+
+
+def reindex(kind, ids, batch_size=SEARCH_BATCH_SIZE):
+    """
+    Atualiza as palavras dos objetos informados, gravando só a diferença. Objetos que
+    não existem mais saem do índice.
+    """
+    ids = list(ids)
+    model = SEARCH_KINDS[kind].model
+    for offset in range(0, len(ids), batch_size):
+        chunk = ids[offset:offset + batch_size]
+        wanted = {
+            (row['id'], token)
+            for row in _rows(kind, model.objects.filter(pk__in=chunk))
+            for token in document_tokens(kind, row)
+        }
+        existing = set(
+            SearchToken.objects.filter(kind=kind, object_id__in=chunk).values_list('object_id', 'token')
+        )
+
+        stale = defaultdict(list)
+        for object_id, token in existing - wanted:
+            stale[object_id].append(token)
+        if stale:
+            condition = Q()
+            for object_id, tokens in stale.items():
+                condition |= Q(object_id=object_id, token__in=tokens)
+            SearchToken.objects.filter(condition, kind=kind).delete()
+
+        SearchToken.objects.bulk_create([
+            SearchToken(kind=kind, object_id=object_id, token=token)
+            for object_id, token in wanted - existing
+        ], batch_size=batch_size)
+
+
+def remove_from_index(kind, object_id):
+    SearchToken.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def rebuild_index(batch_size=SEARCH_BATCH_SIZE, log=None):
+    """Recria o índice inteiro, lendo cada tabela em blocos pela chave primária. Devolve o total de palavras."""
+    SearchToken.objects.all().delete()
+    total = 0
+    for kind, spec in SEARCH_KINDS.items():
+        last_id = 0
+        while True:
+            rows = list(_rows(kind, spec.model.objects.filter(pk__gt=last_id).order_by('pk'))[:batch_size])
+            if not rows:
+                break
+            tokens = [
+                SearchToken(kind=kind, object_id=row['id'], token=token)
+                for row in rows
+                for token in document_tokens(kind, row)
+            ]
+            SearchToken.objects.bulk_create(tokens, batch_size=batch_size)
+            total += len(tokens)
+            last_id = rows[-1]['id']
+        if log:
+            log(f"  {spec.label}: índice atualizado")
+    return total
+
+
+def query_terms(query):
+    """
+    Termos de uma busca. Um texto só de números e separadores ("(11) 9999-") vira um
+    único termo com os dígitos, para casar com o telefone.
+    """
+    if query and not any(char.isalpha() for char in query):
+        digits = only_digits(query)
+        return [digits[:TOKEN_MAX_LENGTH]] if len(digits) >= MIN_TERM_LENGTH else []
+    terms = {token[:TOKEN_MAX_LENGTH] for token in search_tokens(query) if len(token) >= MIN_TERM_LENGTH}
+    # Mais longos primeiro: em geral são os mais seletivos
+    return sorted(terms, key=len, reverse=True)
+
+
+def matching_ids(kind, query):
+    """
+    Subconsulta com os ids dos objetos de `kind` que contêm todos os termos (como
+    prefixo de alguma palavra), ou None se a busca não tiver nenhum termo válido.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return None
+    ids = None
+    for term in terms:
+        lower, upper = prefix_range(term)
+        matches = SearchToken.objects.filter(kind=kind, token__gte=lower, token__lt=upper)
+        if ids is not None:
+            matches = matches.filter(object_id__in=ids)
+        ids = matches.values_list('object_id', flat=True)
+    return ids
+
+
+def search(query, limit=SEARCH_RESULTS_LIMIT):
+    """Busca global: {kind: (rótulo, [objetos mais recentes primeiro])}, ou None sem termos válidos."""
+    if not query_terms(query):
+        return None
+    results = {}
+    for kind, spec in SEARCH_KINDS.items():
+        ids = list(matching_ids(kind, query).distinct().order_by('-object_id')[:limit])
+        objects = spec.model.objects.filter(pk__in=ids)
+        if kind == 'service':
+            objects = objects.select_related('barber')
+        by_id = {obj.pk: obj for obj in objects}
+        results[kind] = (spec.label, [by_id[pk] for pk in ids if pk in by_id])
+    return results
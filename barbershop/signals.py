@@ -0,0 +1,180 @@
+# barbershop/signals.py
+"""
+Sinais que mantêm os dados derivados em dia:
+
+- o rótulo desnormalizado Service.service_types_label ("Corte, Barba"), recalculado
+  quando a relação ManyToMany muda (m2m_changed) e quando um ServiceType é renomeado
+  ou excluído;
+- o nome do cliente copiado em Service.client_name, atualizado quando um cliente
+  ligado aos serviços (Service.client) é renomeado;
+- o cache do catálogo de tipos de serviço (catalog.py), invalidado a cada alteração;
+- os relatórios do caixa em cache (cashier_cache.py), invalidados quando um barbeiro
+  é renomeado (o nome aparece nas transações);
+- os registros de exclusão (Tombstone) de serviços, despesas e clientes, lidos pelo
+  feed de alterações (changefeed.py);
+- o índice de busca (search.py) de clientes, serviços, tipos e despesas.
+"""
+
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cashier_cache import invalidate_all as invalidate_cashier_reports
+from .catalog import invalidate_catalog
+from .changefeed import record_tombstone
+from .models import Client, Expense, Service, ServiceType
+from .search import SEARCH_KINDS, indexed_fields, reindex, remove_from_index
+
+LABEL_BATCH_SIZE = 500
+
+ServiceTypesThrough = Service.service_types.through
+
+
+def refresh_service_types_labels(service_ids, touch=False, batch_size=LABEL_BATCH_SIZE):
+    """
+    Recalcula service_types_label dos serviços informados, em lotes.
+    Com touch=True também atualiza updated_at (sempre que o rótulo pode ter mudado).
+    """
+    service_ids = list(service_ids)
+    fields = ['service_types_label', 'updated_at'] if touch else ['service_types_label']
+    now = timezone.now()
+
+    for offset in range(0, len(service_ids), batch_size):
+        chunk = service_ids[offset:offset + batch_size]
+        names = defaultdict(list)
+        rows = (
+            ServiceTypesThrough.objects.filter(service_id__in=chunk)
+            .order_by('service_id', 'id')
+            .values_list('service_id', 'servicetype__name')
+        )
+        for service_id, name in rows:
+            names[service_id].append(name)
+
+        services = [Service(pk=pk, service_types_label=', '.join(names[pk]), updated_at=now) for pk in chunk]
+        Service.objects.bulk_update(services, fields)
+        # bulk_update não dispara post_save: o rótulo também entra no índice de busca
+        reindex('service', chunk)
+
+
+def _services_with_type(service_type_id):
+    return ServiceTypesThrough.objects.filter(servicetype_id=service_type_id).values_list('service_id', flat=True)
+
+
+@receiver(m2m_changed, sender=ServiceTypesThrough)
+def update_label_on_m2m_change(sender, instance, action, reverse, pk_set, **kwargs):
+    # touch=True: o feed de alterações e o ETag das páginas dependem de updated_at
+    if not reverse:
+        # service.service_types.add/remove/set/clear()
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            refresh_service_types_labels([instance.pk], touch=True)
+        return
+
+    # service_type.appointments.add/remove/clear()
+    if action == 'pre_clear':
+        instance._label_service_ids = list(_services_with_type(instance.pk))
+    elif action in ('post_add', 'post_remove'):
+        refresh_service_types_labels(pk_set, touch=True)
+    elif action == 'post_clear':
+        refresh_service_types_labels(getattr(instance, '_label_service_ids', []), touch=True)
+
+
+@receiver(pre_save, sender=ServiceType)
+def remember_service_type_name(sender, instance, **kwargs):
+    if instance.pk:
+        old_name = ServiceType.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+        instance._label_name_changed = old_name is not None and old_name != instance.name
+
+
+@receiver(post_save, sender=ServiceType)
+def update_labels_on_rename(sender, instance, created, **kwargs):
+    if not created and getattr(instance, '_label_name_changed', False):
+        refresh_service_types_labels(_services_with_type(instance.pk), touch=True)
+
+
+@receiver(pre_delete, sender=ServiceType)
+def remember_services_of_deleted_type(sender, instance, **kwargs):
+    instance._label_service_ids = list(_services_with_type(instance.pk))
+
+
+@receiver(post_delete, sender=ServiceType)
+def update_labels_on_delete(sender, instance, **kwargs):
+    refresh_service_types_labels(getattr(instance, '_label_service_ids', []), touch=True)
+
+
+@receiver(pre_save, sender=Client)
+def remember_client_name(sender, instance, **kwargs):
+    if instance.pk:
+        old_name = Client.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+        instance._client_name_changed = old_name is not None and old_name != instance.name
+
+
+@receiver(post_save, sender=Client)
+def update_services_on_client_rename(sender, instance, created, **kwargs):
+    if created or not getattr(instance, '_client_name_changed', False):
+        return
+    services = Service.objects.filter(client=instance)
+    service_ids = list(services.values_list('pk', flat=True))
+    services.update(client_name=instance.name, updated_at=timezone.now())
+    reindex('service', service_ids)
+
+
+@receiver(pre_delete, sender=Client)
+def touch_services_of_deleted_client(sender, instance, **kwargs):
+    # O SET_NULL do banco não altera updated_at: sem isso o feed não veria a mudança
+    Service.objects.filter(client=instance).update(updated_at=timezone.now())
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, update_fields=None, **kwargs):
+    instance._username_changed = False
+    # Ex.: o login só grava last_login; não precisa consultar o nome anterior
+    if instance.pk and (update_fields is None or 'username' in update_fields):
+        old_username = User.objects.filter(pk=instance.pk).values_list('username', flat=True).first()
+        instance._username_changed = old_username is not None and old_username != instance.username
+
+
+@receiver(post_save, sender=User)
+def invalidate_cashier_on_barber_rename(sender, instance, created, **kwargs):
+    if not created and getattr(instance, '_username_changed', False):
+        transaction.on_commit(invalidate_cashier_reports)
+
+
+@receiver(post_save, sender=ServiceType)
+@receiver(post_delete, sender=ServiceType)
+def invalidate_catalog_cache(sender, **kwargs):
+    # Só após o commit, para que ninguém guarde no cache a versão antiga com a chave nova
+    transaction.on_commit(invalidate_catalog)
+
+
+@receiver(post_delete, sender=Service)
+@receiver(post_delete, sender=Expense)
+@receiver(post_delete, sender=Client)
+def record_deletion(sender, instance, **kwargs):
+    record_tombstone(sender._meta.model_name, instance.pk)
+
+
+SEARCH_KIND_BY_MODEL = {spec.model: kind for kind, spec in SEARCH_KINDS.items()}
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_save, sender=Service)
+@receiver(post_save, sender=ServiceType)
+@receiver(post_save, sender=Expense)
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    kind = SEARCH_KIND_BY_MODEL[sender]
+    # Ex.: marcar como pago não muda nenhum campo indexado
+    if update_fields is not None and not indexed_fields(kind) & set(update_fields):
+        return
+    reindex(kind, [instance.pk])
+
+
+@receiver(post_delete, sender=Client)
+@receiver(post_delete, sender=Service)
+@receiver(post_delete, sender=ServiceType)
+@receiver(post_delete, sender=Expense)
+def remove_from_search_index(sender, instance, **kwargs):
+    remove_from_index(SEARCH_KIND_BY_MODEL[sender], instance.pk)
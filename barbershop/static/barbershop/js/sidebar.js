@@ -0,0 +1,20 @@
+// Abre/fecha a barra lateral em telas pequenas (products/base.html)
+const sidebar = document.getElementById('sidebar');
+const overlay = document.getElementById('overlay');
+const menuToggle = document.getElementById('menu-toggle');
+const app = document.getElementById('app');
+
+function openSidebar() {
+    app.classList.add('sidebar-open');
+    app.classList.remove('sidebar-closed');
+    overlay.style.display = 'block';
+}
+
+function closeSidebar() {
+    app.classList.remove('sidebar-open');
+    app.classList.add('sidebar-closed');
+    overlay.style.display = 'none';
+}
+
+menuToggle?.addEventListener('click', openSidebar);
+overlay?.addEventListener('click', closeSidebar);
@@ -0,0 +1,113 @@
+# barbershop/staticfiles.py
+"""
+Arquivos estáticos com hash no nome, pré-comprimidos e servidos com cache imutável.
+
+`manage.py collectstatic` grava em STATIC_ROOT cada arquivo com o hash do conteúdo
+no nome (sidebar.css -> sidebar.3f2a….css, via ManifestStaticFilesStorage) e, para
+os formatos de texto, uma cópia .gz comprimida uma única vez, no build. A view
+serve_static entrega a cópia .gz a quem aceita gzip e marca os arquivos com hash
+como imutáveis por um ano: uma versão nova tem outro nome, então o navegador nunca
+precisa perguntar de novo. Nenhuma dependência além do Django.
+
+Sem manifest (collectstatic ainda não rodou, como em desenvolvimento e nos testes)
+{% static %} devolve os nomes originais.
+"""
+
+import gzip
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.html', '.txt', '.json', '.map', '.xml')
+COMPRESSION_LEVEL = 9
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Nomes sem hash podem mudar de conteúdo: o navegador revalida (If-Modified-Since)
+REVALIDATE_CACHE_CONTROL = 'public, no-cache'
+
+
+def compress_file(path):
+    """Grava path + '.gz' se a versão comprimida for menor. Devolve (tamanho original, comprimido ou None)."""
+    with open(path, 'rb') as f:
+        content = f.read()
+    # mtime=0: o mesmo conteúdo gera sempre o mesmo .gz
+    compressed = gzip.compress(content, compresslevel=COMPRESSION_LEVEL, mtime=0)
+    if len(compressed) >= len(content):
+        return len(content), None
+    with open(f'{path}.gz', 'wb') as f:
+        f.write(compressed)
+    return len(content), len(compressed)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage que também grava as cópias .gz ao final do collectstatic."""
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        # Originais e versões com hash
+        names = {*paths, *self.hashed_files.values()}
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS) and self.exists(name):
+                compress_file(self.path(name))
+
+    def is_immutable(self, name):
+        """Se `name` é um nome com hash gerado pelo collectstatic."""
+        return name in self.hashed_files.values()
+
+
+def accepts_gzip(request):
+    for coding in request.headers.get('Accept-Encoding', '').split(','):
+        name, _, params = coding.strip().partition(';')
+        if name.strip().lower() in ('gzip', '*'):
+            return params.replace(' ', '').lower() not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def serve_static(request, path):
+    """
+    Serve um arquivo de STATIC_ROOT: a cópia .gz se existir e o cliente aceitar gzip,
+    com cache imutável para os nomes com hash.
+    """
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except (SuspiciousFileOperation, ValueError):
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    immutable = getattr(staticfiles_storage, 'is_immutable', lambda name: False)(path)
+    stat = os.stat(full_path)
+    if not immutable and not was_modified_since(request.headers.get('If-Modified-Since'), stat.st_mtime):
+        return HttpResponseNotModified()
+
+    content_type, _ = mimetypes.guess_type(full_path)
+    compressed_path = f'{full_path}.gz'
+    has_compressed = os.path.isfile(compressed_path)
+    use_compressed = has_compressed and accepts_gzip(request)
+
+    response = FileResponse(
+        open(compressed_path if use_compressed else full_path, 'rb'),
+        content_type=content_type or 'application/octet-stream',
+        filename=os.path.basename(full_path),
+    )
+    if use_compressed:
+        response.headers['Content-Encoding'] = 'gzip'
+    if has_compressed:
+        response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Last-Modified'] = http_date(stat.st_mtime)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+    return response
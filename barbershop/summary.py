@@ -0,0 +1,267 @@
+# barbershop/summary.py
+"""
+Manutenção do resumo diário do caixa (DailyCashierSummary).
+
+As views registram cada mudança que afeta o caixa (pagamento, edição ou exclusão de
+serviço pago, nova despesa) chamando apply_service_changes()/apply_expense() dentro
+da mesma transação da alteração. O comando `manage.py cashier_summary` reconstrói ou
+confere a tabela a partir dos dados brutos. Toda alteração também invalida, após o
+commit, os relatórios do caixa em cache dos dias afetados (cashier_cache.py) e, na
+mesma transação, apaga os fechamentos de comissão guardados desses dias (commissions.py).
+"""
+
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .cashier_cache import invalidate_all, invalidate_days
+from .commissions import drop_stored_periods
+from .models import ArchivedService, DailyCashierSummary, Expense, PayoutPeriod, Service
+from .utils import local_day_range
+
+ZERO = Decimal('0')
+
+# Contribuição de um serviço pago para o caixa
+ServiceSnapshot = namedtuple('ServiceSnapshot', ['date', 'barber_id', 'payment_method', 'price', 'service_type_ids'])
+
+
+def _empty_totals():
+    # [receitas, quantidade de serviços, despesas]
+    return [ZERO, 0, ZERO]
+
+
+def snapshot_service(service):
+    """Captura o estado de um serviço relevante para o caixa (None se não estiver pago)."""
+    if service is None or service.pk is None or not service.payment_date:
+        return None
+    return ServiceSnapshot(
+        date=timezone.localdate(service.payment_date),
+        barber_id=service.barber_id,
+        payment_method=service.payment_method or '',
+        price=service.price,
+        service_type_ids=tuple(service.service_types.values_list('pk', flat=True)),
+    )
+
+
+def snapshot_services(services):
+    """snapshot_service() para vários serviços, buscando os tipos de todos em uma consulta."""
+    paid = [service for service in services if service.pk is not None and service.payment_date]
+    type_ids = defaultdict(list)
+    rows = Service.service_types.through.objects.filter(service_id__in=[service.pk for service in paid])
+    for service_id, service_type_id in rows.values_list('service_id', 'servicetype_id'):
+        type_ids[service_id].append(service_type_id)
+    return [
+        ServiceSnapshot(
+            date=timezone.localdate(service.payment_date),
+            barber_id=service.barber_id,
+            payment_method=service.payment_method or '',
+            price=service.price,
+            service_type_ids=tuple(type_ids[service.pk]),
+        )
+        for service in paid
+    ]
+
+
+def _add_service(deltas, snapshot, sign):
+    if snapshot is None:
+        return
+    base_key = (snapshot.date, snapshot.barber_id, snapshot.payment_method)
+    # Uma linha com o total do serviço e uma linha por tipo de serviço contido nele
+    for service_type_id in (None, *set(snapshot.service_type_ids)):
+        totals = deltas[base_key + (service_type_id,)]
+        totals[0] += sign * snapshot.price
+        totals[1] += sign
+
+
+def _invalidate_reports(days):
+    if days:
+        # Fechamentos de comissão guardados desses dias são apagados junto com a alteração
+        drop_stored_periods(days)
+        # Relatórios do caixa em cache que cobrem esses dias deixam de valer após o commit
+        transaction.on_commit(lambda: invalidate_days(days))
+
+
+def _apply_deltas(deltas):
+    with transaction.atomic():
+        for (day, barber_id, payment_method, service_type_id), (income, count, expenses) in deltas.items():
+            if not (income or count or expenses):
+                continue
+            rows = DailyCashierSummary.objects.filter(
+                date=day, barber_id=barber_id, payment_method=payment_method, service_type_id=service_type_id,
+            )
+            pk = rows.select_for_update().values_list('pk', flat=True).first()
+            if pk is None:
+                DailyCashierSummary.objects.create(
+                    date=day, barber_id=barber_id, payment_method=payment_method, service_type_id=service_type_id,
+                    income=income, services_count=count, expenses=expenses,
+                )
+            else:
+                # Atualização relativa (F) para não perder incrementos concorrentes
+                DailyCashierSummary.objects.filter(pk=pk).update(
+                    income=F('income') + income,
+                    services_count=F('services_count') + count,
+                    expenses=F('expenses') + expenses,
+                )
+
+
+def apply_service_changes(changes):
+    """
+    Aplica ao resumo uma sequência de mudanças (antes, depois) de serviços.
+    Use snapshot_service() antes e depois da alteração; None indica "não pago"/inexistente.
+    """
+    deltas = defaultdict(_empty_totals)
+    days = set()
+    for before, after in changes:
+        _add_service(deltas, before, -1)
+        _add_service(deltas, after, 1)
+        days.update(snapshot.date for snapshot in (before, after) if snapshot is not None)
+    _apply_deltas(deltas)
+    _invalidate_reports(days)
+
+
+def apply_expense(expense, sign=1):
+    """Soma (sign=1) ou remove (sign=-1) uma despesa do resumo."""
+    apply_expenses([expense], sign)
+
+
+def apply_expenses(expenses, sign=1):
+    """Versão em lote de apply_expense() (ex.: importação)."""
+    deltas = defaultdict(_empty_totals)
+    for expense in expenses:
+        deltas[(expense.expense_date, None, '', None)][2] += sign * expense.value
+    _apply_deltas(deltas)
+    _invalidate_reports({day for day, _, _, _ in deltas})
+
+
+def _paid_between(field, lower, upper):
+    condition = Q(**{f'{field}__isnull': False})
+    if lower:
+        condition &= Q(**{f'{field}__gte': lower})
+    if upper:
+        condition &= Q(**{f'{field}__lt': upper})
+    return condition
+
+
+def compute_summary(start=None, end=None):
+    """Recalcula os totais a partir dos dados brutos: {(data, barbeiro, pagamento, tipo): [receitas, serviços, despesas]}."""
+    lower, upper = local_day_range(start, end)
+    totals = defaultdict(_empty_totals)
+
+    # Serviços arquivados (archive.py) continuam contando no caixa
+    for model, service in ((Service, 'service'), (ArchivedService, 'archivedservice')):
+        services = (
+            model.objects.filter(_paid_between('payment_date', lower, upper))
+            .annotate(day=TruncDate('payment_date'))
+            .values('day', 'barber_id', 'payment_method')
+            .annotate(income=Sum('price'), count=Count('id'))
+            .order_by()
+        )
+        for row in services:
+            key = (row['day'], row['barber_id'], row['payment_method'] or '', None)
+            totals[key][0] += row['income']
+            totals[key][1] += row['count']
+
+        per_type = (
+            model.service_types.through.objects.filter(_paid_between(f'{service}__payment_date', lower, upper))
+            .annotate(day=TruncDate(f'{service}__payment_date'))
+            .values('day', f'{service}__barber_id', f'{service}__payment_method', 'servicetype_id')
+            .annotate(income=Sum(f'{service}__price'), count=Count(f'{service}_id'))
+            .order_by()
+        )
+        for row in per_type:
+            key = (row['day'], row[f'{service}__barber_id'], row[f'{service}__payment_method'] or '', row['servicetype_id'])
+            totals[key][0] += row['income']
+            totals[key][1] += row['count']
+
+    expenses = Expense.objects.all()
+    if start:
+        expenses = expenses.filter(expense_date__gte=start)
+    if end:
+        expenses = expenses.filter(expense_date__lte=end)
+    for row in expenses.values('expense_date').annotate(total=Sum('value')).order_by():
+        totals[(row['expense_date'], None, '', None)][2] += row['total']
+
+    return totals
+
+
+def _summary_rows(start=None, end=None):
+    rows = DailyCashierSummary.objects.all()
+    if start:
+        rows = rows.filter(date__gte=start)
+    if end:
+        rows = rows.filter(date__lte=end)
+    return rows
+
+
+def _stored_summary(start=None, end=None):
+    rows = _summary_rows(start, end)
+
+    totals = defaultdict(_empty_totals)
+    grouped = (
+        rows.values('date', 'barber_id', 'payment_method', 'service_type_id')
+        .annotate(income_sum=Sum('income'), count_sum=Sum('services_count'), expenses_sum=Sum('expenses'))
+        .order_by()
+    )
+    for row in grouped:
+        key = (row['date'], row['barber_id'], row['payment_method'], row['service_type_id'])
+        totals[key] = [row['income_sum'], row['count_sum'], row['expenses_sum']]
+    return totals
+
+
+def rebuild_summary(start=None, end=None):
+    """Apaga e recria as linhas do resumo no período (ou inteiro). Devolve a quantidade de linhas."""
+    totals = compute_summary(start, end)
+    with transaction.atomic():
+        _summary_rows(start, end).delete()
+        DailyCashierSummary.objects.bulk_create([
+            DailyCashierSummary(
+                date=day, barber_id=barber_id, payment_method=payment_method, service_type_id=service_type_id,
+                income=income, services_count=count, expenses=expenses,
+            )
+            for (day, barber_id, payment_method, service_type_id), (income, count, expenses) in totals.items()
+        ], batch_size=1000)
+        # Dados alterados fora das telas: os fechamentos guardados do período também são refeitos
+        stored = PayoutPeriod.objects.all()
+        if start:
+            stored = stored.filter(end__gte=start)
+        if end:
+            stored = stored.filter(start__lte=end)
+        stored.delete()
+        transaction.on_commit(invalidate_all)
+    return len(totals)
+
+
+def verify_summary(start=None, end=None):
+    """Compara o resumo com os dados brutos. Devolve [(chave, esperado, armazenado)] das divergências."""
+    expected = compute_summary(start, end)
+    stored = _stored_summary(start, end)
+    mismatches = []
+    for key in sorted(set(expected) | set(stored), key=str):
+        expected_totals = expected.get(key, _empty_totals())
+        stored_totals = stored.get(key, _empty_totals())
+        if expected_totals != stored_totals:
+            mismatches.append((key, expected_totals, stored_totals))
+    return mismatches
+
+
+def get_cashier_totals(start=None, end=None, barber_id=None, payment_method=None, service_type_id=None):
+    """Totais do caixa para o período (datas inclusivas) lidos das linhas pré-agregadas."""
+    rows = _summary_rows(start, end)
+
+    # Filtros de barbeiro/pagamento/tipo só se aplicam às receitas
+    dims = Q(service_type_id=service_type_id) if service_type_id else Q(service_type__isnull=True)
+    if barber_id:
+        dims &= Q(barber_id=barber_id)
+    if payment_method:
+        dims &= Q(payment_method=payment_method)
+
+    totals = rows.aggregate(
+        total_income=Sum('income', filter=dims),
+        total_services=Sum('services_count', filter=dims),
+        total_outcome=Sum('expenses'),
+    )
+    return {key: value or 0 for key, value in totals.items()}
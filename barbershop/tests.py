@@ -1,3 +1,1281 @@
-from django.test import TestCase
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+import base64
+import csv
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, transaction
+from django.db.models import Sum
+from django.templatetags.static import static
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import changefeed
+from .analytics import revenue_report
+from .archive import archive_services
+from .async_views import _aiter_cashier_csv
+from .cashier_cache import report_cache_key
+from .catalog import get_catalog
+from .commissions import payout_statements
+from .database import retry_on_lock
+from .forms import ServiceForm
+from .metrics import registry
+from .scheduling import BarberDay, availability
+from .pagination import decode_cursor, encode_cursor, keyset_paginate
+from .models import ArchivedService, Client, CommissionRule, DailyCashierSummary, Expense, PayoutPeriod, SearchToken, Service, ServiceType
+from .search import rebuild_index, search
+from .summary import rebuild_summary, verify_summary
+from .utils import local_day_start
+from .views import (
+    AUTOCOMPLETE_DEFAULT_LIMIT, AUTOCOMPLETE_MAX_LIMIT, CASHIER_CURSOR_TYPES, CASHIER_PAGE_SIZE,
+    _cashier_page, _cashier_querysets, _cashier_sources, _iter_cashier_csv,
+)
+
+
+class ServiceListQueryCountTests(TestCase):
+    """A agenda do dia deve custar o mesmo número de consultas, com 1 ou 80 agendamentos."""
+
+    # Sessão + usuário + validador do GET condicional (barbeiros e serviços do dia) +
+    # agendamentos do dia (com barbeiro; tipos de serviço pelo rótulo desnormalizado)
+    EXPECTED_QUERIES = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.barber = User.objects.create_user(username='barbeiro', password='senha-segura-123')
+        cls.service_types = [
+            ServiceType.objects.create(name='Corte', price=40, estimated_time=30),
+            ServiceType.objects.create(name='Barba', price=25, estimated_time=20),
+        ]
+        cls.day = timezone.localdate()
+
+    def setUp(self):
+        self.client.force_login(self.barber)
+
+    def _create_services(self, count):
+        start = timezone.make_aware(datetime.combine(self.day, time(9, 0)))
+        for i in range(count):
+            paid = i % 2 == 0
+            service = Service.objects.create(
+                client_name=f'Cliente {i}',
+                barber=self.barber,
+                price=65,
+                appointment_datetime=start + timedelta(minutes=5 * i),
+                payment_method='pix' if paid else None,
+                payment_date=timezone.now() if paid else None,
+            )
+            service.service_types.set(self.service_types)
+
+    def _get_agenda(self):
+        return self.client.get(reverse('barbershop:service_list'), {'filter_date': self.day.isoformat()})
+
+    def test_query_count_does_not_grow_with_appointments(self):
+        self._create_services(1)
+        with CaptureQueriesContext(connection) as few:
+            self._get_agenda()
+
+        self._create_services(80)
+        with CaptureQueriesContext(connection) as many:
+            response = self._get_agenda()
+
+        self.assertEqual(len(many), len(few))
+        self.assertEqual(len(response.context['pending_services']) + len(response.context['completed_services']), 81)
+
+    def test_agenda_query_budget(self):
+        self._create_services(80)
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            response = self._get_agenda()
+        self.assertContains(response, 'Corte, Barba')
+
+
+class SeedDataCommandTests(TestCase):
+    """Os dados sintéticos devem ser coerentes com o que as telas esperam."""
+
+    def test_seed_generates_consistent_data(self):
+        call_command('seed_data', services=300, barbers=3, service_types=4, years=1, stdout=StringIO())
+
+        self.assertEqual(Service.objects.count(), 300)
+        self.assertEqual(Client.objects.count(), 60)
+        self.assertEqual(Expense.objects.count(), 6)
+        self.assertFalse(Service.objects.filter(service_types__isnull=True).exists())
+        self.assertFalse(Service.objects.filter(service_types_label='').exists())
+        self.assertFalse(Client.objects.filter(search_name='').exists())
+        self.assertEqual(verify_summary(), [])
+
+
+class ImportDataCommandTests(TestCase):
+    """import_data grava em blocos, mantém o resumo do caixa e retoma sem duplicar."""
+
+    HEADER = 'client_name,service_types,barber,price,payment_method,payment_date'
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user(username='barbeiro', password='senha-segura-123')
+        ServiceType.objects.create(name='Corte', price=30, estimated_time=30)
+        ServiceType.objects.create(name='Barba', price=20, estimated_time=20)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = f'{directory.name}/servicos.csv'
+        self.state_file = f'{self.path}.import-state.json'
+
+    def _write(self, rows):
+        with open(self.path, 'w', encoding='utf-8') as csv_file:
+            csv_file.write('\n'.join([self.HEADER, *rows]) + '\n')
+
+    def _import(self, **options):
+        call_command('import_data', 'servicos', self.path, chunk_size=2, batch_size=2, stdout=StringIO(), **options)
+
+    def _client_names(self):
+        return list(Service.objects.order_by('client_name').values_list('client_name', flat=True))
+
+    def _rows(self, fourth_barber):
+        return [
+            'Ana,Corte,barbeiro,,pix,2024-05-10 10:00',
+            'Bruno,Corte|Barba,barbeiro,45,dinheiro,2024-05-10 11:00',
+            'Carla,Barba,,,Pix,10/05/2024 12:00',
+            f'Davi,Corte,{fourth_barber},,Cartão de Débito,2024-05-11 09:00',
+            'Elis,Corte,barbeiro,,,',
+        ]
+
+    def test_import_keeps_summary(self):
+        self._write(self._rows('barbeiro'))
+        self._import()
+
+        self.assertEqual(Service.objects.count(), 5)
+        self.assertEqual(Service.service_types.through.objects.count(), 6)
+        self.assertEqual(
+            Service.objects.filter(payment_date__isnull=False).aggregate(total=Sum('price'))['total'], 125,
+        )
+        self.assertEqual(verify_summary(), [])
+        self.assertFalse(os.path.exists(self.state_file))
+
+    def test_failed_chunk_resumes_without_duplicates(self):
+        self._write(self._rows('desconhecido'))
+        with self.assertRaisesMessage(CommandError, 'Linha 5 do CSV'):
+            self._import()
+        # Só o primeiro bloco (linhas 1-2) foi gravado; o progresso fica no arquivo de estado
+        self.assertEqual(self._client_names(), ['Ana', 'Bruno'])
+        with open(self.state_file) as f:
+            self.assertEqual(json.load(f)['rows'], 2)
+
+        self._write(self._rows('barbeiro'))
+        self._import(resume=True)
+
+        self.assertEqual(self._client_names(), ['Ana', 'Bruno', 'Carla', 'Davi', 'Elis'])
+        self.assertEqual(Service.service_types.through.objects.count(), 6)
+        self.assertEqual(verify_summary(), [])
+        self.assertFalse(os.path.exists(self.state_file))
+
+
+class RevenueReportTests(TestCase):
+    """O relatório deve dar o mesmo resultado lendo o resumo diário ou os serviços."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', services=400, barbers=3, service_types=4, years=1, stdout=StringIO())
+        cls.end = timezone.localdate()
+        cls.start = cls.end - timedelta(days=90)
+
+    def test_summary_matches_raw(self):
+        for bucket in ('day', 'week', 'month'):
+            for dimension in ('barber', 'service_type', 'none'):
+                with self.subTest(bucket=bucket, dimension=dimension):
+                    summary = revenue_report(self.start, self.end, bucket, dimension, source='summary')
+                    raw = revenue_report(self.start, self.end, bucket, dimension, source='raw')
+                    for key in ('rows', 'buckets', 'comparison', 'totals', 'previous_totals', 'changes'):
+                        self.assertEqual(summary[key], raw[key], key)
+
+    def test_single_grouped_query(self):
+        with self.assertNumQueries(1):
+            report = revenue_report(self.start, self.end, 'month', 'none', source='summary')
+        self.assertEqual(
+            report['totals']['services'],
+            Service.objects.filter(payment_date__date__gte=self.start, payment_date__date__lte=self.end).count(),
+        )
+
+
+class ArchiveServicesTests(TestCase):
+    """Arquivar serviços antigos não pode mudar o caixa, a exportação nem o faturamento."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', services=300, barbers=3, service_types=4, years=1, stdout=StringIO())
+        cls.barber = User.objects.first()
+        cls.start = timezone.localdate() - timedelta(days=400)
+        cls.end = timezone.localdate()
+
+    def setUp(self):
+        self.client.force_login(self.barber)
+
+    def _snapshot(self):
+        period = {'filter_start': self.start.isoformat(), 'filter_end': self.end.isoformat()}
+        cashier = self.client.get(reverse('barbershop:daily_cashier'), period)
+        export = self.client.get(reverse('barbershop:export_cashier_csv'), period)
+        return (
+            [item.sort_key for item in cashier.context['transactions']],
+            cashier.context['total_income'],
+            b''.join(export.streaming_content),
+            revenue_report(self.start, self.end, 'month', 'service_type', source='raw')['rows'],
+        )
+
+    def test_archived_services_still_count(self):
+        before = self._snapshot()
+        call_command('archive_services', days=120, batch_size=50, stdout=StringIO())
+
+        self.assertTrue(ArchivedService.objects.exists())
+        self.assertFalse(Service.objects.filter(payment_date__date__lt=self.end - timedelta(days=120)).exists())
+        self.assertFalse(ArchivedService.objects.filter(service_types__isnull=True).exists())
+        self.assertEqual(self._snapshot(), before)
+        self.assertEqual(verify_summary(), [])
+
+
+def _legacy_cashier_csv(services_queries, expenses_query):
+    """Exportação como era antes do streaming: tudo em memória, ordenado em Python, totais por aggregate."""
+    output = StringIO()
+    writer = csv.writer(output, delimiter=';')
+    rows = []
+    for query in services_queries:
+        for s in query.select_related('barber'):
+            rows.append((s.payment_date, [
+                s.payment_date.strftime('%d/%m/%Y %H:%M'), 'RECEITA', f"{s.client_name} - {s.service_types_label}",
+                s.barber.username if s.barber else 'N/A', s.get_payment_method_display(), str(s.price).replace('.', ','),
+            ]))
+    for e in expenses_query:
+        rows.append((local_day_start(e.expense_date), [
+            e.expense_date.strftime('%d/%m/%Y'), 'DESPESA', e.description, 'N/A', 'N/A', str(-e.value).replace('.', ','),
+        ]))
+    rows.sort(key=lambda row: row[0], reverse=True)
+
+    total_income = sum((query.aggregate(total=Sum('price'))['total'] or 0 for query in services_queries), Decimal('0'))
+    total_outcome = expenses_query.aggregate(total=Sum('value'))['total'] or 0
+    writer.writerow(['Data/Hora', 'Tipo', 'Descrição', 'Barbeiro', 'Forma Pag.', 'Valor (R$)'])
+    writer.writerows(row for _, row in rows)
+    writer.writerow([])
+    writer.writerow(['', '', '', '', 'Total Receitas', str(total_income).replace('.', ',')])
+    writer.writerow(['', '', '', '', 'Total Despesas', str(total_outcome).replace('.', ',')])
+    writer.writerow(['', '', '', '', 'Total Líquido', str(total_income - total_outcome).replace('.', ',')])
+    return '\ufeff' + output.getvalue()
+
+
+class CashierParityTests(TransactionTestCase):
+    """
+    CSV em streaming (síncrono e assíncrono), caixa assíncrono e caixa síncrono mostram o mesmo
+    que a exportação antiga, com serviços arquivados e mais de uma página de transações.
+    TransactionTestCase: as views assíncronas consultam em outras threads, com outras conexões.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.barber = User.objects.create_user(username='barbeiro', password='senha-segura-123')
+        self.client.force_login(self.barber)
+        # Horários com minuto 13: nenhum empate com as despesas (meia-noite) nem entre serviços
+        latest = timezone.localtime().replace(hour=20, minute=13, second=0, microsecond=0) - timedelta(days=1)
+        Service.objects.bulk_create([
+            Service(
+                client_name=f'Cliente {number}', service_types_label='Corte, Barba' if number % 3 else 'Corte',
+                barber=self.barber if number % 4 else None, price=Decimal('30.50') + number,
+                payment_method=('pix', 'dinheiro', 'credito')[number % 3],
+                payment_date=latest - timedelta(hours=7 * number),
+            )
+            for number in range(CASHIER_PAGE_SIZE + 40)
+        ])
+        Expense.objects.bulk_create([
+            Expense(description=f'Despesa {number}', value=Decimal('12.25') * (number + 1),
+                    expense_date=timezone.localdate(latest) - timedelta(days=4 * number))
+            for number in range(6)
+        ])
+        archive_services(latest - timedelta(days=20))
+        rebuild_summary()
+        self.assertTrue(ArchivedService.objects.exists())
+        self.assertEqual(verify_summary(), [])
+
+        self.start = timezone.localdate(latest) - timedelta(days=60)
+        self.end = timezone.localdate()
+
+    def _pages(self, name, params):
+        """Transações de todas as páginas (seguindo next_cursor) e os totais da primeira."""
+        url = reverse(f'barbershop:{name}')
+        response = self.client.get(url, params)
+        totals = [response.context[key] for key in ('total_income', 'total_outcome', 'total_value', 'total_services')]
+        transactions = list(response.context['transactions'])
+        while response.context['next_cursor']:
+            response = self.client.get(url, {**params, 'cursor': response.context['next_cursor']})
+            transactions += response.context['transactions']
+        return totals, transactions
+
+    def test_all_versions_match(self):
+        for barber in ('', str(self.barber.pk)):
+            with self.subTest(barber=barber):
+                params = {
+                    'filter_start': self.start.isoformat(), 'filter_end': self.end.isoformat(), 'filter_barber': barber,
+                }
+                filters = {
+                    'start': self.start, 'end': self.end, 'service_type': '', 'barber': barber, 'payment_method': '',
+                }
+
+                totals, transactions = self._pages('daily_cashier', params)
+                self.assertGreater(len(transactions), CASHIER_PAGE_SIZE)
+                self.assertEqual(self._pages('daily_cashier_async', params), (totals, transactions))
+
+                export = ''.join(_iter_cashier_csv(*_cashier_querysets(filters)))
+                legacy = _legacy_cashier_csv(*_cashier_sources(filters)).splitlines()
+                # Os totais antigos vinham do aggregate do SQLite, sem as casas decimais fixas
+                self.assertEqual(export.splitlines()[:-3], legacy[:-3])
+                self.assertEqual(self._totals(export.splitlines()), self._totals(legacy))
+                async_export = async_to_sync(self._collect)(_aiter_cashier_csv(*_cashier_querysets(filters)))
+                self.assertEqual(export, ''.join(async_export))
+
+                # Mesmas linhas, na mesma ordem, e mesmos totais do caixa
+                lines = export.splitlines()
+                self.assertEqual(len(lines), 1 + len(transactions) + 4)
+                self.assertEqual(
+                    [line.split(';')[-1] for line in lines[1:len(transactions) + 1]],
+                    [str(t.value).replace('.', ',') for t in transactions],
+                )
+                self.assertEqual(self._totals(lines), totals[:3])
+
+    @staticmethod
+    def _totals(lines):
+        return [Decimal(line.split(';')[-1].replace(',', '.')) for line in lines[-3:]]
+
+    @staticmethod
+    async def _collect(rows):
+        return [row async for row in rows]
+
+
+@mock.patch.object(changefeed, 'SETTLE_SECONDS', -1)
+class ChangeFeedTests(TestCase):
+    """Seguindo os cursores, o consumidor recebe cada alteração e exclusão uma vez."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', services=40, barbers=2, service_types=3, years=1, stdout=StringIO())
+        cls.staff = User.objects.create_user(username='bi', password='senha-segura-123', is_staff=True)
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def _sync(self, cursor=None):
+        changes = []
+        while True:
+            params = {'limit': 7, **({'cursor': cursor} if cursor else {})}
+            response = self.client.get(reverse('barbershop:change_feed'), params)
+            lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+            changes += lines[:-1]
+            cursor = lines[-1]['cursor']
+            if not lines[-1]['has_more']:
+                return changes, cursor
+
+    def test_full_sync_then_deltas(self):
+        changes, cursor = self._sync()
+        upserts = {(change['type'], change['id']) for change in changes}
+        self.assertEqual(len(upserts), len(changes))
+        self.assertEqual(
+            len(upserts), Service.objects.count() + Expense.objects.count() + Client.objects.count(),
+        )
+
+        service_id = Service.objects.values_list('pk', flat=True).first()
+        client = Client.objects.first()
+        client.name = 'Cliente Renomeado'
+        client.save()
+        Service.objects.get(pk=service_id).delete()
+
+        changes, cursor = self._sync(cursor)
+        # Renomear o cliente também altera o nome copiado nos serviços ligados a ele
+        renamed = Service.objects.filter(client=client).order_by('updated_at', 'pk').values_list('pk', flat=True)
+        self.assertEqual(
+            [(change['type'], change['op'], change['id']) for change in changes],
+            [('service', 'upsert', pk) for pk in renamed]
+            + [('client', 'upsert', client.pk), ('service', 'delete', service_id)],
+        )
+        self.assertEqual(self._sync(cursor)[0], [])
+
+    def test_rejects_wrong_typed_cursor(self):
+        now = {'dt': timezone.now().isoformat()}
+        valid = [now, 1] * len(changefeed.SOURCES) + [0]
+        self.assertTrue(changefeed.is_valid_cursor(_raw_cursor(valid)))
+        wrong_updated_at = ['x', 1, *valid[2:]]
+        wrong_tombstone = [*valid[:-1], 'y']
+        for values in (wrong_updated_at, wrong_tombstone):
+            with self.subTest(values=values):
+                response = self.client.get(reverse('barbershop:change_feed'), {'cursor': _raw_cursor(values)})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'error': 'Cursor inválido.'})
+
+
+class SearchIndexTests(TestCase):
+    """O índice de busca acompanha as alterações e a busca exige todos os termos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.corte = ServiceType.objects.create(name='Corte Degradê', price=40, estimated_time=30)
+        cls.client_obj = Client.objects.create(name='José Ávila', phone_whatsapp='(11) 98765-4321')
+        cls.service = Service.objects.create(client_name='Mariana Souza', price=40)
+        cls.service.service_types.set([cls.corte])
+        Expense.objects.create(description='Conta de luz', value=120)
+
+    def _found(self, query, kind):
+        return [obj.pk for obj in search(query)[kind][1]]
+
+    def test_prefix_accent_and_phone(self):
+        self.assertEqual(self._found('jose av', 'client'), [self.client_obj.pk])
+        self.assertEqual(self._found('98765', 'client'), [self.client_obj.pk])
+        self.assertEqual(self._found('(11) 9876', 'client'), [self.client_obj.pk])
+        self.assertEqual(self._found('jose souza', 'client'), [])
+        self.assertEqual(self._found('luz', 'expense'), [Expense.objects.get().pk])
+        self.assertIsNone(search('a'))
+
+    def test_index_follows_changes(self):
+        self.assertEqual(self._found('degrade mari', 'service'), [self.service.pk])
+
+        self.corte.name = 'Corte Navalhado'
+        self.corte.save()
+        self.assertEqual(self._found('degrade', 'service'), [])
+        self.assertEqual(self._found('navalh', 'service'), [self.service.pk])
+
+        service_id = self.service.pk
+        self.service.delete()
+        self.assertFalse(SearchToken.objects.filter(kind='service', object_id=service_id).exists())
+
+        tokens = sorted(SearchToken.objects.values_list('kind', 'object_id', 'token'))
+        rebuild_index()
+        self.assertEqual(sorted(SearchToken.objects.values_list('kind', 'object_id', 'token')), tokens)
+
+
+class ClientAutocompleteTests(TestCase):
+    """Autocomplete por prefixo do nome (sem acentos/maiúsculas) ou do telefone, com limite de resultados."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.barber = User.objects.create_user(username='barbeiro', password='senha-segura-123')
+        Client.objects.create(name='José Ávila', phone_whatsapp='(11) 98888-1234')
+        Client.objects.create(name='Joana', phone_whatsapp='(21) 97777-0000')
+        Client.objects.create(name='Mariana', phone_whatsapp='11 95555-4321')
+        Client.objects.create(name='João')
+        Client.objects.create(name='Ana Jo')
+        for number in range(60):
+            Client.objects.create(name=f'Cliente {number:02}')
+
+    def setUp(self):
+        self.client.force_login(self.barber)
+
+    def _names(self, q, **params):
+        response = self.client.get(reverse('barbershop:client_autocomplete'), {'q': q, **params})
+        return [client['name'] for client in response.json()['results']]
+
+    def test_name_prefix(self):
+        self.assertEqual(self._names('jo'), ['Joana', 'João', 'José Ávila'])
+        self.assertEqual(self._names('  JOSÉ   a'), ['José Ávila'])
+        self.assertEqual(self._names('jo', limit=2), ['Joana', 'João'])
+
+    def test_phone_prefix(self):
+        self.assertEqual(self._names('1198'), ['José Ávila'])
+        self.assertEqual(self._names('(11) 9'), ['Mariana', 'José Ávila'])
+        # Só prefixo: o meio do número não encontra
+        self.assertEqual(self._names('8888'), [])
+
+    def test_result_cap(self):
+        self.assertEqual(len(self._names('cliente')), AUTOCOMPLETE_DEFAULT_LIMIT)
+        self.assertEqual(len(self._names('cliente', limit='abc')), AUTOCOMPLETE_DEFAULT_LIMIT)
+        self.assertEqual(self._names('cliente', limit=3), ['Cliente 00', 'Cliente 01', 'Cliente 02'])
+        self.assertEqual(len(self._names('cliente', limit=500)), AUTOCOMPLETE_MAX_LIMIT)
+        self.assertEqual(self._names(''), [])
+
+
+class CatalogCacheTests(TestCase):
+    """O catálogo vem do cache e é relido do banco uma vez após salvar ou excluir um tipo de serviço."""
+
+    def setUp(self):
+        cache.clear()
+        self.cut = ServiceType.objects.create(name='Corte', price=30, estimated_time=30)
+        self.beard = ServiceType.objects.create(name='Barba', price=20, estimated_time=20)
+
+    def _assert_reloads(self):
+        with self.assertNumQueries(1):
+            catalog = get_catalog()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_catalog(), catalog)
+        return [(item['name'], item['price']) for item in catalog]
+
+    def test_invalidated_on_save_and_delete(self):
+        self.assertEqual(self._assert_reloads(), [('Barba', 20), ('Corte', 30)])
+
+        self.cut.price = 35
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cut.save()
+        self.assertEqual(self._assert_reloads(), [('Barba', 20), ('Corte', 35)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.beard.delete()
+        self.assertEqual(self._assert_reloads(), [('Corte', 35)])
+
+
+class ClientHistoryTests(TestCase):
+    """Serviços ligados ao cliente: pelo nome, após renomear e no histórico (com o arquivo)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.barber = User.objects.create_user(username='barbeiro', password='senha-segura-123')
+        cls.corte = ServiceType.objects.create(name='Corte', price=30, estimated_time=30)
+        cls.ana = Client.objects.create(name='Ana Lima')
+        start = timezone.now() - timedelta(days=100)
+        Service.objects.bulk_create([
+            Service(
+                client_name='Ana Lima', client=cls.ana, barber=cls.barber, price=30,
+                appointment_datetime=start + timedelta(days=day), payment_method='pix',
+                payment_date=start + timedelta(days=day),
+            )
+            for day in range(45)
+        ])
+        Service.objects.create(client_name='Outra Pessoa', price=30, appointment_datetime=start)
+
+    def setUp(self):
+        self.client.force_login(self.barber)
+
+    def _history(self, cursor=None):
+        return self.client.get(
+            reverse('barbershop:client_history', args=[self.ana.pk]), {'cursor': cursor} if cursor else {},
+        )
+
+    def test_form_links_by_name(self):
+        form = ServiceForm(data={
+            'client_name': 'ana  LIMA', 'barber': self.barber.pk, 'service_types': [self.corte.pk],
+            'discount': 0, 'appointment_datetime': '2030-01-02T10:00',
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['client'], self.ana)
+
+    def test_rename_updates_services(self):
+        self.ana.name = 'Ana Lima Souza'
+        self.ana.save()
+        self.assertFalse(Service.objects.filter(client=self.ana).exclude(client_name='Ana Lima Souza').exists())
+        self.assertEqual(len(search('souza')['service'][1]), 20)
+
+    def test_history_includes_archive_with_constant_queries(self):
+        call_command('archive_services', days=70, stdout=StringIO())
+        self.assertTrue(ArchivedService.objects.filter(client=self.ana).exists())
+
+        with CaptureQueriesContext(connection) as first_page:
+            response = self._history()
+        self.assertEqual(response.context['stats']['visits'], 45)
+        self.assertEqual(response.context['stats']['spent'], 45 * 30)
+
+        seen = []
+        cursor = None
+        while True:
+            response = self._history(cursor)
+            seen += [service.pk for service in response.context['services']]
+            cursor = response.context['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 45)
+        self.assertEqual(len(set(seen)), 45)
+
+        Service.objects.bulk_create([
+            Service(client_name='Ana Lima', client=self.ana, price=30, appointment_datetime=timezone.now())
+            for _ in range(100)
+        ])
+        with CaptureQueriesContext(connection) as bigger:
+            self._history()
+        self.assertEqual(len(bigger), len(first_page))
+
+    def test_tampered_cursor_shows_first_page(self):
+        first = [service.pk for service in self._history().context['services']]
+        for values in (['x', 1], [{'dt': timezone.now().isoformat()}, 'y']):
+            with self.subTest(values=values):
+                response = self._history(_raw_cursor(values))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual([service.pk for service in response.context['services']], first)
+
+    def test_backfill_touches_linked_services(self):
+        # Migração que ligou os serviços antigos: o feed precisa ver o client_id novo
+        migration = import_module('barbershop.migrations.0015_service_client')
+        Service.objects.update(client=None, updated_at=timezone.now() - timedelta(days=1))
+        started = timezone.now()
+        migration.link_services_to_clients(django_apps, None)
+        self.assertFalse(Service.objects.filter(client_name='Ana Lima').exclude(client=self.ana).exists())
+        self.assertFalse(Service.objects.filter(client=self.ana, updated_at__lt=started).exists())
+
+
+class PayoutTests(TestCase):
+    """Comissões por barbeiro e tipo, com o desconto dividido entre os tipos do serviço."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = User.objects.create_user(username='ana', password='senha-segura-123')
+        cls.bruno = User.objects.create_user(username='bruno', password='senha-segura-123')
+        cls.corte = ServiceType.objects.create(name='Corte', price=30, estimated_time=30)
+        cls.barba = ServiceType.objects.create(name='Barba', price=20, estimated_time=20)
+        cls.day = timezone.localdate() - timedelta(days=1)
+        paid_at = timezone.make_aware(datetime.combine(cls.day, time(12, 0)))
+
+        def paid(barber, price, discount, service_types):
+            service = Service.objects.create(
+                client_name='Cliente', barber=barber, price=price, discount=discount,
+                payment_method='pix', payment_date=paid_at,
+            )
+            service.service_types.set(service_types)
+
+        paid(cls.ana, 40, 10, [cls.corte, cls.barba])
+        paid(cls.ana, 30, 0, [cls.corte])
+        paid(cls.bruno, 20, 0, [cls.barba])
+        paid(cls.bruno, 15, 0, [])
+        CommissionRule.objects.create(barber=cls.ana, service_type=cls.corte, percentage=60)
+        CommissionRule.objects.create(service_type=cls.barba, percentage=40)
+
+    def setUp(self):
+        # O catálogo em cache pode ser de outro teste (a invalidação só roda após o commit)
+        cache.clear()
+
+    def _lines(self, statement):
+        return [
+            (line.service_type_name, line.services_count, line.net, line.discount, line.commission)
+            for line in statement.line_items
+        ]
+
+    def test_statements_split_discount(self):
+        ana, bruno = payout_statements(self.day, self.day)
+        self.assertEqual(self._lines(ana), [('Barba', 1, 16, 4, Decimal('6.40')), ('Corte', 2, 54, 6, Decimal('32.40'))])
+        self.assertEqual((ana.services_count, ana.net, ana.discount, ana.commission), (2, 70, 10, Decimal('38.80')))
+        self.assertEqual(self._lines(bruno), [('Barba', 1, 20, 0, 8), ('', 1, 15, 0, Decimal('7.50'))])
+        self.assertEqual(bruno.commission, Decimal('15.50'))
+
+    def _payouts_page(self):
+        self.client.force_login(self.ana)
+        return self.client.get(reverse('barbershop:payouts'), {
+            'filter_start': self.day.isoformat(), 'filter_end': self.day.isoformat(),
+        })
+
+    def test_closed_period_is_stored(self):
+        payout_statements(self.day, self.day, store=True)
+        CommissionRule.objects.create(barber=self.bruno, percentage=100)
+        with self.assertNumQueries(3):
+            statements = payout_statements(self.day, self.day)
+        self.assertEqual(statements[1].commission, Decimal('15.50'))
+        self.assertEqual(payout_statements(self.day, self.day, refresh=True)[1].commission, 35)
+        self.assertEqual(PayoutPeriod.objects.count(), 1)
+        self.assertEqual(self._payouts_page().context['total_commission'], 35 + Decimal('38.80'))
+
+    def test_page_does_not_store(self):
+        self.assertEqual(self._payouts_page().status_code, 200)
+        self.assertFalse(PayoutPeriod.objects.exists())
+
+    def test_changes_drop_stored_period(self):
+        rebuild_summary()  # os serviços do setUpTestData não passaram pelas telas
+        other_day = self.day - timedelta(days=10)
+        payout_statements(other_day, other_day, store=True)
+        payout_statements(self.day, self.day, store=True)
+
+        service = Service.objects.filter(barber=self.bruno, service_types__isnull=True).get()
+        self.client.force_login(self.ana)
+        self.client.post(reverse('barbershop:delete_service', args=[service.pk]))
+        # Só o período que cobre o dia alterado é apagado
+        self.assertEqual(list(PayoutPeriod.objects.values_list('start', flat=True)), [other_day])
+        self.assertEqual(payout_statements(self.day, self.day)[1].commission, 8)
+
+        payout_statements(self.day, self.day, store=True)
+        admin_user = User.objects.create_superuser(username='admin', password='senha-segura-123')
+        self.client.force_login(admin_user)
+        service = Service.objects.filter(barber=self.bruno).get()
+        self.client.post(reverse('admin:barbershop_service_delete', args=[service.pk]), {'post': 'yes'})
+        self.assertFalse(Service.objects.filter(pk=service.pk).exists())
+        self.assertFalse(PayoutPeriod.objects.filter(start=self.day).exists())
+        self.assertEqual(verify_summary(), [])
+
+
+class CashierRowsTests(TestCase):
+    """Caixa e exportação a partir de linhas leves: mesmos textos que as instâncias davam."""
+
+    def test_rows_keep_labels(self):
+        user = User.objects.create_user(username='caixa', password='senha-segura-123')
+        Service.objects.create(
+            client_name='Sem Barbeiro', service_types_label='Corte', price=30,
+            payment_method='dinheiro', payment_date=timezone.now(),
+        )
+        self.client.force_login(user)
+
+        transaction, = self.client.get(reverse('barbershop:daily_cashier')).context['transactions']
+        self.assertEqual(
+            (transaction.description, transaction.barber, transaction.payment_method),
+            ('Receita: Sem Barbeiro - Corte', 'N/A', 'Dinheiro'),
+        )
+        export = b''.join(self.client.get(reverse('barbershop:export_cashier_csv')).streaming_content).decode()
+        self.assertIn(';RECEITA;Sem Barbeiro - Corte;N/A;Dinheiro;30,00', export)
+
+
+class ConditionalGetTests(TestCase):
+    """Agenda e caixa sem alterações respondem 304 sem montar a página."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.barber = User.objects.create_user(username='barbeiro', password='senha-segura-123')
+        cls.service = Service.objects.create(
+            client_name='Cliente', barber=cls.barber, price=30, appointment_datetime=timezone.now(),
+            payment_method='pix', payment_date=timezone.now(),
+        )
+
+    def setUp(self):
+        self.client.force_login(self.barber)
+
+    def _assert_revalidates(self, url, change, validator_queries):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        with self.assertNumQueries(2 + validator_queries):  # sessão + usuário + validador
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_agenda(self):
+        self._assert_revalidates(
+            reverse('barbershop:service_list'),
+            lambda: Service.objects.filter(pk=self.service.pk).delete(),
+            # Barbeiros + serviços do dia
+            validator_queries=2,
+        )
+
+    def test_cashier(self):
+        self._assert_revalidates(
+            f"{reverse('barbershop:daily_cashier')}?filter_date={timezone.localdate().isoformat()}",
+            lambda: Expense.objects.create(description='Água', value=15),
+            # Barbeiros + limite do arquivo + receitas + despesas
+            validator_queries=4,
+        )
+
+    def test_catalog_and_barbers_change_the_etag(self):
+        url = reverse('barbershop:daily_cashier')
+        etags = [self.client.get(url)['ETag']]
+
+        # Novo tipo de serviço (filtro do caixa); o catálogo é recarregado após o commit
+        with self.captureOnCommitCallbacks(execute=True):
+            ServiceType.objects.create(name='Sobrancelha', price=15, estimated_time=10)
+        etags.append(self.client.get(url)['ETag'])
+
+        User.objects.create_user(username='novo', password='senha-segura-123')
+        etags.append(self.client.get(url)['ETag'])
+        self.assertEqual(len(set(etags)), 3)
+
+        # Outro processo (cache local vazio) calcula o mesmo ETag
+        cache.clear()
+        self.assertEqual(self.client.get(url)['ETag'], etags[-1])
+
+    def test_barber_rename_changes_the_etag_with_shared_cache(self):
+        location = tempfile.TemporaryDirectory()
+        self.addCleanup(location.cleanup)
+        url = reverse('barbershop:daily_cashier')
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location.name,
+        }}):
+            etag = self.client.get(url)['ETag']
+            self.barber.username = 'barbeiro-chefe'
+            with self.captureOnCommitCallbacks(execute=True):
+                self.barber.save()
+            self.assertNotEqual(self.client.get(url)['ETag'], etag)
+
+
+class StaticPipelineTests(TestCase):
+    """collectstatic grava nomes com hash e cópias .gz; serve_static entrega com cache imutável."""
+
+    def setUp(self):
+        static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(static_root.cleanup)
+        settings_override = override_settings(STATIC_ROOT=static_root.name, DEBUG=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_hashed_asset_served_compressed_and_immutable(self):
+        url = static('barbershop/css/layout.css')
+        self.assertRegex(url, r'/layout\.[0-9a-f]{12}\.css$')
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', response['Cache-Control'])
+        compressed = b''.join(response.streaming_content)
+
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(gzip.decompress(compressed), b''.join(response.streaming_content))
+
+    def test_unhashed_name_revalidates(self):
+        response = self.client.get('/static/barbershop/css/layout.css')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('immutable', response['Cache-Control'])
+        response = self.client.get('/static/barbershop/css/layout.css', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_outside_static_root(self):
+        self.assertEqual(self.client.get('/static/../app/settings.py').status_code, 404)
+
+
+class SummaryMaintenanceTests(TestCase):
+    """O resumo diário do caixa acompanha cada alteração feita pelas telas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.barber = User.objects.create_user(username='barbeiro', password='senha-segura-123')
+        cls.cut = ServiceType.objects.create(name='Corte', price=30, estimated_time=30)
+        cls.beard = ServiceType.objects.create(name='Barba', price=20, estimated_time=20)
+
+    def setUp(self):
+        self.client.force_login(self.barber)
+
+    def _post(self, name, data=None, **kwargs):
+        response = self.client.post(reverse(f'barbershop:{name}', kwargs=kwargs), data or {})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(verify_summary(), [])
+
+    def _income(self):
+        return DailyCashierSummary.objects.filter(service_type__isnull=True).aggregate(total=Sum('income'))['total'] or 0
+
+    def test_service_lifecycle(self):
+        appointment = timezone.localtime().replace(hour=10, minute=0, second=0, microsecond=0)
+        data = {
+            'client_name': 'Cliente', 'service_types': [self.cut.pk], 'barber': self.barber.pk,
+            'discount': '0', 'appointment_datetime': appointment.strftime('%Y-%m-%dT%H:%M'),
+        }
+        self._post('add_service', data)
+        service = Service.objects.get()
+        self.assertEqual(self._income(), 0)
+
+        self._post('mark_as_paid', {'payment_method': 'pix'}, pk=service.pk)
+        # Segundo envio (outra aba): o serviço já está pago e nada muda
+        self._post('mark_as_paid', {'payment_method': 'dinheiro'}, pk=service.pk)
+        service.refresh_from_db()
+        self.assertEqual(service.payment_method, 'pix')
+        self.assertEqual(self._income(), 30)
+
+        self._post('edit_service', {**data, 'service_types': [self.cut.pk, self.beard.pk], 'discount': '5'}, pk=service.pk)
+        self.assertEqual(self._income(), 45)
+
+        self._post('delete_service', pk=service.pk)
+        self.assertEqual(self._income(), 0)
+
+    def test_expense(self):
+        self._post('add_expense', {'description': 'Luz', 'value': '80.50', 'expense_date': timezone.localdate().isoformat()})
+        self.assertEqual(DailyCashierSummary.objects.aggregate(total=Sum('expenses'))['total'], Decimal('80.50'))
+
+
+def _raw_cursor(values):
+    """Cursor montado à mão (como um usuário alterando a URL)."""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+class KeysetPaginationTests(TestCase):
+    """Paginação por cursor: cada linha aparece uma vez, e cursores adulterados valem como a primeira página."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.barber = User.objects.create_user(username='barbeiro', password='senha-segura-123')
+        # Receitas e despesas com a mesma data/hora (meia-noite de hoje): só o tipo e o id desempatam
+        midnight = local_day_start(timezone.localdate())
+        for index in range(7):
+            Service.objects.create(
+                client_name=f'Cliente {index}', barber=cls.barber, price=10 + index,
+                appointment_datetime=midnight, payment_method='pix', payment_date=midnight,
+            )
+        for index in range(3):
+            Expense.objects.create(description=f'Despesa {index}', value=5, expense_date=timezone.localdate())
+
+    def test_cashier_walks_every_page(self):
+        today = timezone.localdate()
+        filters = {'start': today, 'end': today, 'service_type': '', 'barber': '', 'payment_method': ''}
+        seen = []
+        cursor = None
+        while True:
+            page = _cashier_page(*_cashier_querysets(filters), cursor, page_size=3)
+            seen.extend(transaction.sort_key for transaction in page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+
+        self.assertEqual(len(seen), 10)
+        self.assertEqual(len(set(seen)), 10)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_keyset_paginate_with_repeated_names(self):
+        for name in ['Ana', 'Ana', 'Bruno', 'Ana', 'Carla']:
+            Client.objects.create(name=name)
+        seen = []
+        cursor = None
+        while True:
+            page = keyset_paginate(Client.objects.all(), ('name', 'id'), cursor, 2)
+            seen.extend((client.name, client.pk) for client in page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, sorted(Client.objects.values_list('name', 'id')))
+
+    def test_tampered_cursor(self):
+        now = timezone.now()
+        valid = encode_cursor([now, 1, 5])
+        self.assertEqual(decode_cursor(valid, CASHIER_CURSOR_TYPES), [now, 1, 5])
+
+        tampered = [
+            _raw_cursor(['x', 1, 1]),
+            _raw_cursor([{'dt': now.replace(tzinfo=None).isoformat()}, 1, 1]),
+            _raw_cursor([{'dt': now.isoformat()}, 2, 1]),
+            _raw_cursor([{'dt': now.isoformat()}, 1, '1']),
+            _raw_cursor([{'dt': now.isoformat()}, True, 1]),
+            _raw_cursor({'dt': now.isoformat()}),
+        ]
+        self.client.force_login(self.barber)
+        for cursor in tampered:
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(decode_cursor(cursor, CASHIER_CURSOR_TYPES))
+                response = self.client.get(reverse('barbershop:daily_cashier'), {'cursor': cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context['transactions']), 10)
+
+
+class CashierReportCacheTests(TestCase):
+    """O relatório do caixa em cache acompanha pagamentos, despesas e renomeações de barbeiro."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.barber = User.objects.create_user(username='barbeiro', password='senha-segura-123')
+        cls.service = Service.objects.create(
+            client_name='Cliente', barber=cls.barber, price=30, appointment_datetime=timezone.now(),
+        )
+
+    def setUp(self):
+        # Cache compartilhado entre processos (arquivos), como em produção
+        location = tempfile.TemporaryDirectory()
+        self.addCleanup(location.cleanup)
+        shared_cache = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location.name,
+        }})
+        shared_cache.enable()
+        self.addCleanup(shared_cache.disable)
+        self.client.force_login(self.barber)
+        today = timezone.localdate()
+        self.filters = {'start': today, 'end': today, 'service_type': '', 'barber': '', 'payment_method': ''}
+
+    def _cashier(self):
+        return self.client.get(reverse('barbershop:daily_cashier')).context
+
+    def test_local_memory_cache_is_not_used(self):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.assertIsNone(report_cache_key(self.filters, None))
+
+    def test_changes_reach_the_next_cached_report(self):
+        self.assertEqual(self._cashier()['total_income'], 0)
+        self.assertIsNotNone(cache.get(report_cache_key(self.filters, None)))
+
+        # A invalidação acontece após o commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('barbershop:mark_as_paid', args=[self.service.pk]), {'payment_method': 'pix'})
+        self.assertEqual(self._cashier()['total_income'], 30)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('barbershop:add_expense'), {
+                'description': 'Luz', 'value': '12', 'expense_date': timezone.localdate().isoformat(),
+            })
+        self.assertEqual(self._cashier()['total_outcome'], 12)
+
+        self.barber.username = 'barbeiro-chefe'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.barber.save()
+        barbers = {transaction.barber for transaction in self._cashier()['transactions']}
+        self.assertEqual(barbers, {'barbeiro-chefe', 'N/A'})
+
+
+class SchedulingTests(TestCase):
+    """Horários livres e bloqueio de dois agendamentos do mesmo barbeiro no mesmo horário."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.barber = User.objects.create_user(username='barbeiro', password='senha-segura-123')
+        cls.cut = ServiceType.objects.create(name='Corte', price=30, estimated_time=30)
+        cls.day = timezone.localdate() + timedelta(days=1)
+        # Ocupado das 10:00 às 10:30
+        cls.booked = Service.objects.create(
+            client_name='Cliente', barber=cls.barber, price=30, appointment_datetime=cls._at(10, 0),
+        )
+        cls.booked.service_types.add(cls.cut)
+
+    def setUp(self):
+        # O catálogo em cache pode ser de outro teste (a invalidação só roda após o commit)
+        cache.clear()
+
+    @classmethod
+    def _at(cls, hour, minute):
+        return local_day_start(cls.day) + timedelta(hours=hour, minutes=minute)
+
+    def test_barber_day_intervals(self):
+        busy = BarberDay([(self._at(10, 0), self._at(10, 30)), (self._at(10, 30), self._at(11, 0))])
+        self.assertEqual(len(busy), 1)  # intervalos que encostam são unidos
+        self.assertFalse(busy.is_free(self._at(10, 45), self._at(11, 15)))
+        self.assertFalse(busy.is_free(self._at(9, 45), self._at(10, 15)))
+        self.assertTrue(busy.is_free(self._at(9, 30), self._at(10, 0)))
+        self.assertTrue(busy.is_free(self._at(11, 0), self._at(11, 30)))
+
+    def test_slots_around_booking_and_business_hours(self):
+        result = availability(self.day, [self.cut.pk])
+        slots = result['barbers'][0]['slots']
+        self.assertEqual(slots[0], self._at(8, 0))
+        self.assertEqual(slots[-1], self._at(19, 30))
+        # Sobrepõem o atendimento das 10:00; 09:30 e 10:30 encostam nele
+        for hour, minute in [(9, 45), (10, 0), (10, 15)]:
+            self.assertNotIn(self._at(hour, minute), slots)
+        self.assertIn(self._at(9, 30), slots)
+        self.assertIn(self._at(10, 30), slots)
+
+        for hour, minute, free in [(7, 45, False), (8, 0, True), (10, 15, False), (19, 30, True), (19, 45, False)]:
+            with self.subTest(at=f'{hour}:{minute}'):
+                first = availability(self.day, [self.cut.pk], at=self._at(hour, minute))['first_available']
+                self.assertEqual(first is not None, free)
+
+    def test_slots_view(self):
+        self.client.force_login(self.barber)
+        response = self.client.get(reverse('barbershop:service_slots'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['date'], timezone.localdate().isoformat())
+
+        response = self.client.get(reverse('barbershop:service_slots'), {
+            'date': self.day.isoformat(), 'service_types': [self.cut.pk], 'time': '10:00',
+        })
+        self.assertIsNone(response.json()['first_available'])
+
+    def test_form_rejects_double_booking(self):
+        def form(hour, minute, instance=None):
+            return ServiceForm({
+                'client_name': 'Outro', 'service_types': [self.cut.pk], 'barber': self.barber.pk,
+                'discount': '0', 'appointment_datetime': self._at(hour, minute).strftime('%Y-%m-%dT%H:%M'),
+            }, instance=instance)
+
+        overlapping = form(10, 15)
+        self.assertFalse(overlapping.is_valid())
+        self.assertIn('appointment_datetime', overlapping.errors)
+        self.assertTrue(form(10, 30).is_valid())
+        self.assertTrue(form(9, 30).is_valid())
+        # Editar o próprio agendamento não colide com ele mesmo
+        self.assertTrue(form(10, 15, instance=self.booked).is_valid())
+
+
+class BatchCheckoutTests(TestCase):
+    """Fechamento em lote: só os serviços ainda não pagos entram no caixa, uma única vez."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.barber = User.objects.create_user(username='barbeiro', password='senha-segura-123')
+        cut = ServiceType.objects.create(name='Corte', price=30, estimated_time=30)
+        yesterday = timezone.now() - timedelta(days=1)
+        cls.pending = []
+        for price in (30, 45):
+            service = Service.objects.create(
+                client_name='Cliente', barber=cls.barber, price=price, appointment_datetime=yesterday,
+            )
+            service.service_types.add(cut)
+            cls.pending.append(service)
+        cls.paid = Service.objects.create(
+            client_name='Pago', barber=cls.barber, price=50, appointment_datetime=yesterday,
+            payment_method='dinheiro', payment_date=yesterday,
+        )
+        rebuild_summary()
+
+    def setUp(self):
+        self.client.force_login(self.barber)
+
+    def _checkout(self):
+        ids = [service.pk for service in self.pending] + [self.paid.pk, 999999]
+        response = self.client.post(reverse('barbershop:mark_many_as_paid'), {'service_ids': ids, 'payment_method': 'pix'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(verify_summary(), [])
+
+    def _totals(self):
+        return {
+            (row['payment_method'], row['service_type_id']): (row['income'], row['services_count'])
+            for row in DailyCashierSummary.objects.values('payment_method', 'service_type_id', 'income', 'services_count')
+            if row['services_count']
+        }
+
+    def test_only_unpaid_services_change(self):
+        started = timezone.now()
+        self._checkout()
+
+        for service in self.pending:
+            service.refresh_from_db()
+            self.assertEqual(service.payment_method, 'pix')
+            self.assertGreaterEqual(service.payment_date, started)
+            self.assertGreaterEqual(service.updated_at, started)
+        paid = Service.objects.get(pk=self.paid.pk)
+        self.assertEqual((paid.payment_method, paid.payment_date, paid.updated_at),
+                         (self.paid.payment_method, self.paid.payment_date, self.paid.updated_at))
+
+        totals = self._totals()
+        self.assertEqual(totals[('pix', None)], (75, 2))
+        self.assertEqual(totals[('dinheiro', None)], (50, 1))
+
+        # Repetir o mesmo lote (ex.: duplo clique) não muda nada
+        self._checkout()
+        self.assertEqual(self._totals(), totals)
+
+
+class RequestMetricsTests(TestCase):
+    """Server-Timing em cada resposta, histogramas em /metrics (só staff) e streaming contado uma vez."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.barber = User.objects.create_user(username='barbeiro', password='senha-segura-123')
+        cls.staff = User.objects.create_user(username='bi', password='senha-segura-123', is_staff=True)
+
+    def setUp(self):
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    def _series(self, name, view):
+        return f'{name}{{view="barbershop:{view}",method="GET",status="200"}}'
+
+    def test_server_timing_and_queries(self):
+        self.client.force_login(self.barber)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('barbershop:service_list'))
+        self.assertIn(f'desc="{len(queries)} consultas"', response['Server-Timing'])
+        self.assertTrue(response['Server-Timing'].startswith('app;dur='))
+        self.assertIn(f"{self._series('barberapp_request_queries_sum', 'service_list')} {float(len(queries))}", registry.render())
+
+    def test_streamed_csv_counted_once(self):
+        self.client.force_login(self.barber)
+        response = self.client.get(reverse('barbershop:export_cashier_csv'))
+        self.assertTrue(response.streaming)
+        b''.join(response.streaming_content)
+        response.close()
+        self.assertIn(f"{self._series('barberapp_request_duration_seconds_count', 'export_cashier_csv')} 1\n", registry.render())
+
+    def test_metrics_endpoint_is_staff_only(self):
+        url = reverse('barbershop:metrics')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.barber)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(self.staff)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('# TYPE barberapp_request_duration_seconds histogram', response.content.decode())
+
+
+class ServiceTypesLabelTests(TestCase):
+    """O rótulo desnormalizado acompanha a relação e os tipos, sempre movendo updated_at."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cut = ServiceType.objects.create(name='Corte', price=30, estimated_time=30)
+        cls.beard = ServiceType.objects.create(name='Barba', price=20, estimated_time=20)
+        cls.first = Service.objects.create(client_name='Um', price=30)
+        cls.second = Service.objects.create(client_name='Dois', price=20)
+
+    def _assert_label(self, service, label):
+        """Confere o rótulo e que updated_at andou desde o último _backdate()."""
+        service.refresh_from_db()
+        self.assertEqual(service.service_types_label, label)
+        self.assertGreater(service.updated_at, self.backdated)
+
+    def _backdate(self):
+        self.backdated = timezone.now() - timedelta(days=1)
+        Service.objects.update(updated_at=self.backdated)
+
+    def test_service_side(self):
+        self._backdate()
+        self.first.service_types.add(self.cut, self.beard)
+        self._assert_label(self.first, 'Corte, Barba')
+
+        self._backdate()
+        self.first.service_types.remove(self.cut)
+        self._assert_label(self.first, 'Barba')
+
+        self._backdate()
+        self.first.service_types.clear()
+        self._assert_label(self.first, '')
+
+    def test_service_type_side(self):
+        self._backdate()
+        self.beard.appointments.add(self.first, self.second)
+        self._assert_label(self.first, 'Barba')
+        self._assert_label(self.second, 'Barba')
+
+        self._backdate()
+        self.beard.appointments.remove(self.first)
+        self._assert_label(self.first, '')
+
+        self._backdate()
+        self.beard.appointments.clear()
+        self._assert_label(self.second, '')
+
+    def test_rename_and_delete_type(self):
+        self.first.service_types.add(self.cut, self.beard)
+        self.second.service_types.add(self.cut)
+
+        self._backdate()
+        self.cut.name = 'Corte Degradê'
+        self.cut.save()
+        self._assert_label(self.first, 'Corte Degradê, Barba')
+        self._assert_label(self.second, 'Corte Degradê')
+
+        self._backdate()
+        self.cut.delete()
+        self._assert_label(self.first, 'Barba')
+        self._assert_label(self.second, '')
+
+
+@mock.patch('barbershop.database.time.sleep')
+class RetryOnLockTests(TransactionTestCase):
+    """"database is locked" é repetido fora de uma transação e sobe na hora dentro de um atomic()."""
+
+    def _view(self, failures, error='database is locked'):
+        calls = []
+
+        @retry_on_lock(retries=3)
+        def view():
+            calls.append(1)
+            if len(calls) <= failures:
+                raise OperationalError(error)
+            return 'ok'
+        return view, calls
+
+    def test_retried_outside_atomic(self, sleep):
+        view, calls = self._view(failures=2)
+        self.assertEqual(view(), 'ok')
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_gives_up_after_retries(self, sleep):
+        view, calls = self._view(failures=10)
+        with self.assertRaises(OperationalError):
+            view()
+        self.assertEqual(len(calls), 4)
+
+    def test_raised_immediately_inside_atomic(self, sleep):
+        view, calls = self._view(failures=1)
+        with self.assertRaises(OperationalError), transaction.atomic():
+            view()
+        self.assertEqual(len(calls), 1)
+        sleep.assert_not_called()
+
+    def test_other_errors_are_not_retried(self, sleep):
+        view, calls = self._view(failures=1, error='no such table: barbershop_service')
+        with self.assertRaises(OperationalError):
+            view()
+        self.assertEqual(len(calls), 1)
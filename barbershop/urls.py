@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = 'barbershop'
 
@@ -15,12 +15,19 @@ urlpatterns = [
     path('services/edit/<int:pk>/', views.service_form_view, name='edit_service'),
     path('services/delete/<int:pk>/', views.delete_service, name='delete_service'),
     path('services/pay/<int:pk>/', views.mark_as_paid, name='mark_as_paid'),
+    path('services/pay/', views.mark_many_as_paid, name='mark_many_as_paid'),
+    path('services/slots/', views.service_slots, name='service_slots'),
+
+    # Busca
+    path('busca/', views.search, name='search'),
 
     # Clientes
     path('clients/', views.client_list, name='client_list'),
     path('clients/add/', views.add_client, name='add_client'),
+    path('clients/autocomplete/', views.client_autocomplete, name='client_autocomplete'),
     path('clients/edit/<int:pk>/', views.edit_client, name='edit_client'),
     path('clients/delete/<int:pk>/', views.delete_client, name='delete_client'),
+    path('clients/<int:pk>/historico/', views.client_history, name='client_history'),
 
     # Tipos de Serviço
     path('service-types/', views.service_type_list, name='service_type_list'),
@@ -37,4 +44,17 @@ urlpatterns = [
     # Caixa e Exportação
     path('caixa/', views.daily_cashier, name='daily_cashier'),
     path('caixa/export/csv/', views.export_cashier_csv, name='export_cashier_csv'),
+    # Versões assíncronas (ASGI): consultas independentes em paralelo
+    path('caixa/async/', async_views.daily_cashier_async, name='daily_cashier_async'),
+    path('caixa/export/csv/async/', async_views.export_cashier_csv_async, name='export_cashier_csv_async'),
+
+    # Relatórios
+    path('relatorios/faturamento/', views.revenue_report, name='revenue_report'),
+    path('relatorios/comissoes/', views.payouts, name='payouts'),
+
+    # Feed de alterações (NDJSON), apenas staff
+    path('api/changes/', views.change_feed, name='change_feed'),
+
+    # Métricas (Prometheus), apenas staff
+    path('metrics', views.metrics, name='metrics'),
 ]
\ No newline at end of file
@@ -0,0 +1,46 @@
+# barbershop/utils.py
+
+import re
+import unicodedata
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+
+def local_day_start(day):
+    """Meia-noite (aware) do dia informado no fuso horário da barbearia."""
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def local_day_range(start, end):
+    """
+    Converte um período de datas inclusivo [start, end] no intervalo semiaberto
+    [início, fim) de timestamps locais. Qualquer um dos lados pode ser None.
+    """
+    lower = local_day_start(start) if start else None
+    upper = local_day_start(end + timedelta(days=1)) if end else None
+    return lower, upper
+
+
+def normalize_search_text(value):
+    """Texto para busca: sem acentos, em minúsculas e com espaços simples ("José  Ávila" -> "jose avila")."""
+    decomposed = unicodedata.normalize('NFKD', value or '')
+    without_accents = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(without_accents.casefold().split())
+
+
+def search_tokens(value):
+    """Palavras normalizadas de um texto, para o índice de busca ("Corte, Barba" -> ["corte", "barba"])."""
+    return re.findall(r'\w+', normalize_search_text(value))
+
+
+def only_digits(value):
+    return re.sub(r'\D', '', value or '')
+
+
+def prefix_range(prefix):
+    """
+    Limites [prefix, prefix + maior caractere) para buscar por prefixo com comparações
+    simples (>= e <), que qualquer índice B-tree atende, ao contrário de LIKE/ILIKE.
+    """
+    return prefix, prefix + '\U0010ffff'
@@ -7,14 +7,56 @@ from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.models import User # Necessário para o Barbeiro
 from django.urls import reverse
 from django.utils import timezone # CRÍTICO: Necessário para usar timezone.now()
-from datetime import datetime
-from django.db.models import Sum, Count # CRÍTICO: Necessário para a lógica do Caixa
+from datetime import date, datetime, timedelta
+from calendar import monthrange
+from django.db import transaction
+from django.db.models import Count, F, Max, Q
 from urllib.parse import urlencode
-from django.http import HttpResponse
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from decimal import Decimal
+from collections import namedtuple
+from operator import attrgetter, itemgetter
 import csv
+import hashlib
+import heapq
 # ALTERAÇÃO CRÍTICA: Incluir Expense e ExpenseForm nas importações
-from .models import Service, Client, ServiceType, PAYMENT_CHOICES, Expense 
+from .models import Service, Client, ServiceType, PAYMENT_CHOICES, PAYMENT_LABELS, Expense, ArchivedService
+from .analytics import BUCKETS, DIMENSIONS, revenue_report as build_revenue_report
+from .archive import reaches_archive
+from .cashier_cache import cached_report, reports_epoch
+from .catalog import get_catalog, get_price_map, get_service_options
+from .clients import client_history as get_client_history, client_stats
+from .commissions import is_closed, payout_statements
+from . import changefeed
+from .database import retry_on_lock
 from .forms import ServiceForm, ClientForm, BarberCreationForm, ServiceTypeForm, ExpenseForm 
+from .metrics import registry
+from .pagination import KeysetPage, decode_cursor, encode_cursor, keyset_paginate
+from .scheduling import availability
+from .search import MIN_TERM_LENGTH, search as search_index
+from .summary import apply_expense, apply_service_changes, get_cashier_totals, snapshot_service, snapshot_services
+from .utils import local_day_range, local_day_start, normalize_search_text, only_digits, prefix_range
+
+# Quantidade de linhas lidas do banco por vez na exportação em streaming
+CSV_CHUNK_SIZE = 2000
+
+# Tamanho das páginas das listagens (paginação por cursor)
+CLIENTS_PAGE_SIZE = 50
+SERVICE_TYPES_PAGE_SIZE = 50
+CASHIER_PAGE_SIZE = 100
+
+# Colunas lidas para o caixa e a exportação: linhas leves (namedtuple) em vez de instâncias
+SERVICE_ROW_FIELDS = ('id', 'payment_date', 'client_name', 'service_types_label', 'barber_name', 'payment_method', 'price')
+EXPENSE_ROW_FIELDS = ('id', 'expense_date', 'description', 'value')
+
+# Uma linha da lista do caixa (receita ou despesa)
+Transaction = namedtuple('Transaction', [
+    'description', 'value', 'is_expense', 'barber', 'payment_method', 'date', 'sort_time', 'sort_key',
+])
 
 
 # Funções de Autenticação
@@ -52,39 +94,115 @@ def custom_logout_view(request):
     return redirect('barbershop:login')
 
 
+# GET condicional (ETag/Last-Modified) da agenda e do caixa
+# ----------------------------------------------------------------------
+def _page_validator(request, compute):
+    """
+    Validador de uma página: quantidade de linhas e maior updated_at de cada fonte, vindos
+    de compute(request), mais o que muda o HTML sem mudar essas linhas (usuário, token
+    CSRF, dia atual, catálogo de tipos de serviço e barbeiros). Calculado uma vez por
+    requisição e devolvido como (etag, last_modified).
+
+    Tudo vem do banco ou do conteúdo do catálogo, então o ETag é o mesmo em qualquer
+    processo. Barbeiros novos ou excluídos mudam a contagem/maior pk; um barbeiro
+    renomeado só muda o ETag pela geração global do cache do caixa, ou seja, apenas
+    com cache compartilhado (com LocMemCache a página renomeada pode ser revalidada
+    como 304 até outra mudança nas fontes).
+    """
+    validator = getattr(request, '_page_validator', None)
+    if validator is None:
+        sources = compute(request)
+        # get_token() garante o cookie CSRF já na primeira resposta; entra o segredo, não o token mascarado
+        get_token(request)
+        state = [
+            request.user.pk, request.META['CSRF_COOKIE'], timezone.localdate(),
+            _catalog_state(), _barbers_state(), reports_epoch(),
+            *((source['count'], source['updated']) for source in sources),
+        ]
+        etag = hashlib.sha256(repr(state).encode()).hexdigest()[:32]
+        last_modified = max((source['updated'] for source in sources if source['updated']), default=None)
+        validator = request._page_validator = (etag, last_modified)
+    return validator
+
+
+def _catalog_state():
+    # Conteúdo do catálogo (já em cache), não a versão local do processo
+    return [(item['id'], item['name'], item['price']) for item in get_catalog()]
+
+
+def _barbers_state():
+    # Renomeações chegam pela geração do cache do caixa (signals.invalidate_cashier_on_barber_rename)
+    state = User.objects.aggregate(count=Count('pk'), last=Max('pk'))
+    return state['count'], state['last']
+
+
+def _source_state(queryset, field='updated_at'):
+    return queryset.order_by().aggregate(count=Count('pk'), updated=Max(field))
+
+
+def _selected_date(request):
+    filter_date_str = request.GET.get('filter_date')
+    if filter_date_str:
+        try:
+            return datetime.strptime(filter_date_str, '%Y-%m-%d').date()
+        except ValueError:
+            pass
+    return timezone.localdate()
+
+
+def _services_on_date(selected_date):
+    # Intervalo [00:00, 00:00 do dia seguinte) no fuso da barbearia, para que o índice
+    # de appointment_datetime seja usado
+    day_start, day_end = local_day_range(selected_date, selected_date)
+    return Service.objects.filter(appointment_datetime__gte=day_start, appointment_datetime__lt=day_end)
+
+
+def _agenda_sources(request):
+    return [_source_state(_services_on_date(_selected_date(request)))]
+
+
+def _agenda_etag(request):
+    return _page_validator(request, _agenda_sources)[0]
+
+
+def _agenda_last_modified(request):
+    return _page_validator(request, _agenda_sources)[1]
+
+
 # Funções de Serviço (CRUD)
 # ----------------------------------------------------------------------
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_agenda_etag, last_modified_func=_agenda_last_modified)
 def service_list(request):
     filter_date_str = request.GET.get('filter_date')
+    selected_date = _selected_date(request)
 
-    if filter_date_str:
-        try:
-            selected_date = datetime.strptime(filter_date_str, '%Y-%m-%d').date()
-        except ValueError:
-            selected_date = timezone.now().date()
-    else:
-        selected_date = timezone.now().date()
+    # Uma única consulta, com o barbeiro via JOIN; os tipos de serviço vêm do rótulo desnormalizado
+    services_on_date = _services_on_date(selected_date).select_related('barber').order_by('appointment_datetime')
 
-    # Filtra todos os serviços para a data selecionada
-    services_on_date = Service.objects.filter(appointment_datetime__date=selected_date)
+    # Separa em pendentes (não pagos) e concluídos (pagos) em memória
+    pending_services = []
+    completed_services = []
+    for service in services_on_date:
+        if service.payment_date is None:
+            pending_services.append(service)
+        else:
+            completed_services.append(service)
 
-    # Separa em pendentes (não pagos) e concluídos (pagos)
-    pending_services = services_on_date.filter(payment_date__isnull=True).order_by('appointment_datetime')
-    completed_services = services_on_date.filter(payment_date__isnull=False).order_by('appointment_datetime')
-    
     context = {
         'selected_date': selected_date,
         'filter_date_str': filter_date_str,
         'pending_services': pending_services,
         'completed_services': completed_services,
         'payment_choices': PAYMENT_CHOICES,
-        'today_str': timezone.now().strftime('%Y-%m-%d')
+        'today_str': timezone.localdate().strftime('%Y-%m-%d')
     }
     return render(request, 'barbershop/service_list.html', context)
 
 
 @login_required
+@retry_on_lock
 def service_form_view(request, pk=None):
     """View unificada para adicionar e editar serviços."""
     if pk:
@@ -97,6 +215,8 @@ def service_form_view(request, pk=None):
         form = ServiceForm(request.POST or None)
 
     if request.method == 'POST':
+        # Estado anterior do serviço no caixa (o form altera a instância ao validar)
+        before = snapshot_service(service)
         if form.is_valid():
             instance = form.save(commit=False)
 
@@ -106,17 +226,18 @@ def service_form_view(request, pk=None):
                 total_price += service_type.price
 
             instance.price = total_price - form.cleaned_data.get('discount', 0)
-            instance.save()
-            form.save_m2m()  # Salva a relação ManyToMany
+            with transaction.atomic():
+                instance.save()
+                form.save_m2m()  # Salva a relação ManyToMany
+                apply_service_changes([(before, snapshot_service(instance))])
             return redirect('barbershop:service_list')
 
-    clients = Client.objects.all().values('name')
-    service_types_prices = {st.id: st.price for st in ServiceType.objects.all()}
-    all_services_list = list(ServiceType.objects.values('pk', 'name'))
+    # Catálogo de tipos de serviço vindo do cache (sem consultas no estado estável)
+    service_types_prices = get_price_map()
+    all_services_list = get_service_options()
 
     context = {
         'form': form,
-        'clients': clients,
         'service_types_prices': service_types_prices,
         'all_services': all_services_list,
         'service': service, # Passa a instância para o template, útil para o título da página
@@ -125,19 +246,127 @@ def service_form_view(request, pk=None):
 
 
 @login_required
+@retry_on_lock
 def delete_service(request, pk):
     service = get_object_or_404(Service, pk=pk)
     if request.method == 'POST':
-        service.delete()
+        with transaction.atomic():
+            before = snapshot_service(service)
+            service.delete()
+            apply_service_changes([(before, None)])
     return redirect('barbershop:service_list')
 
 
+@login_required
+def service_slots(request):
+    """
+    Horários livres dos barbeiros em um dia para os serviços escolhidos (JSON), usado
+    pelo formulário de agendamento. Com `time` (HH:MM), indica o primeiro barbeiro
+    livre nesse horário; sem ele, o barbeiro com o horário livre mais cedo.
+    """
+    day = _parse_iso_date(request.GET.get('date', '')) or timezone.localdate()
+    service_type_ids = [pk for pk in request.GET.getlist('service_types') if pk.isdigit()]
+    barber = request.GET.get('barber', '')
+    barber_ids = [int(barber)] if barber.isdigit() else None
+    exclude = request.GET.get('exclude', '')
+
+    at = None
+    hour, _, minute = request.GET.get('time', '').partition(':')
+    if hour.isdigit() and minute.isdigit():
+        at = local_day_start(day) + timedelta(hours=int(hour), minutes=int(minute))
+
+    result = availability(day, service_type_ids, barber_ids, at, int(exclude) if exclude.isdigit() else None)
+
+    def hhmm(moment):
+        return timezone.localtime(moment).strftime('%H:%M')
+
+    first = result['first_available']
+    return JsonResponse({
+        'date': day.isoformat(),
+        'duration': int(result['duration'].total_seconds() // 60),
+        'barbers': [
+            {'id': barber['id'], 'username': barber['username'], 'slots': [hhmm(slot) for slot in barber['slots']]}
+            for barber in result['barbers']
+        ],
+        'first_available': first and {
+            'barber_id': first['barber']['id'],
+            'username': first['barber']['username'],
+            'start': hhmm(first['start']),
+        },
+    })
+
+
+# Busca global
+# ----------------------------------------------------------------------
+@login_required
+def search(request):
+    """Clientes, serviços, tipos de serviço e despesas que contêm os termos buscados (ver search.py)."""
+    query = request.GET.get('q', '').strip()
+    context = {
+        'query': query,
+        'results': search_index(query) if query else None,
+        'min_term_length': MIN_TERM_LENGTH,
+    }
+    return render(request, 'barbershop/search.html', context)
+
+
 # Funções de Cliente (CRUD)
 # ----------------------------------------------------------------------
 @login_required
 def client_list(request):
-    clients = Client.objects.all().order_by('name')
-    return render(request, 'barbershop/client_list.html', {'clients': clients})
+    page = keyset_paginate(Client.objects.all(), ('name', 'id'), request.GET.get('cursor'), CLIENTS_PAGE_SIZE)
+    context = {
+        'clients': page,
+        'next_cursor': page.next_cursor,
+        'is_first_page': not request.GET.get('cursor'),
+    }
+    return render(request, 'barbershop/client_list.html', context)
+
+
+# Limites do autocomplete de clientes
+AUTOCOMPLETE_DEFAULT_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+
+@login_required
+def client_autocomplete(request):
+    """
+    Busca de clientes por prefixo do nome (sem diferenciar maiúsculas/acentos) ou do
+    telefone, usando os campos normalizados e indexados. Devolve os N primeiros em JSON.
+    """
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = min(int(request.GET.get('limit', AUTOCOMPLETE_DEFAULT_LIMIT)), AUTOCOMPLETE_MAX_LIMIT)
+    except ValueError:
+        limit = AUTOCOMPLETE_DEFAULT_LIMIT
+
+    results = {}
+    name_prefix = normalize_search_text(query)
+    if name_prefix and limit > 0:
+        lower, upper = prefix_range(name_prefix)
+        by_name = (
+            Client.objects.filter(search_name__gte=lower, search_name__lt=upper)
+            .order_by('search_name', 'id')
+            .values('id', 'name', 'phone_whatsapp')[:limit]
+        )
+        results.update((client['id'], client) for client in by_name)
+
+    phone_prefix = only_digits(query)
+    if phone_prefix and len(results) < limit:
+        lower, upper = prefix_range(phone_prefix)
+        by_phone = (
+            Client.objects.filter(phone_digits__gte=lower, phone_digits__lt=upper)
+            .order_by('phone_digits', 'id')
+            .values('id', 'name', 'phone_whatsapp')[:limit]
+        )
+        for client in by_phone:
+            results.setdefault(client['id'], client)
+
+    clients = [
+        {'id': client['id'], 'name': client['name'], 'phone': client['phone_whatsapp'] or ''}
+        for client in list(results.values())[:limit]
+    ]
+    return JsonResponse({'results': clients})
 
 
 @login_required
@@ -165,6 +394,22 @@ def edit_client(request, pk):
     return render(request, 'barbershop/add_client.html', {'form': form})
 
 
+@login_required
+def client_history(request, pk):
+    """Visitas, total gasto e atendimentos do cliente (ver clients.py), paginados por cursor."""
+    client = get_object_or_404(Client, pk=pk)
+    cursor = request.GET.get('cursor')
+    page = get_client_history(client, cursor)
+    context = {
+        'client': client,
+        'stats': client_stats(client),
+        'services': page,
+        'next_cursor': page.next_cursor,
+        'is_first_page': not cursor,
+    }
+    return render(request, 'barbershop/client_history.html', context)
+
+
 @login_required
 def delete_client(request, pk):
     client = get_object_or_404(Client, pk=pk)
@@ -178,8 +423,12 @@ def delete_client(request, pk):
 @login_required
 def service_type_list(request):
     """Lista todos os tipos de serviço."""
-    service_types = ServiceType.objects.all().order_by('name')
-    context = {'service_types': service_types}
+    page = keyset_paginate(ServiceType.objects.all(), ('name', 'id'), request.GET.get('cursor'), SERVICE_TYPES_PAGE_SIZE)
+    context = {
+        'service_types': page,
+        'next_cursor': page.next_cursor,
+        'is_first_page': not request.GET.get('cursor'),
+    }
     return render(request, 'barbershop/service_type_list.html', context)
 
 
@@ -236,12 +485,15 @@ def add_barber(request):
 # Funções de Despesa (NOVO)
 # ----------------------------------------------------------------------
 @login_required
+@retry_on_lock
 def add_expense(request):
     """Adiciona uma nova despesa no sistema."""
     if request.method == 'POST':
         form = ExpenseForm(request.POST)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                expense = form.save()
+                apply_expense(expense)
             # Redireciona para o caixa do dia da despesa
             redirect_url = f"{reverse('barbershop:daily_cashier')}?filter_date={form.cleaned_data['expense_date'].strftime('%Y-%m-%d')}"
             return redirect(redirect_url)
@@ -255,15 +507,20 @@ def add_expense(request):
 # Funções de Pagamento e Caixa
 # ----------------------------------------------------------------------
 @login_required
+@retry_on_lock
 def mark_as_paid(request, pk):
     if request.method == 'POST':
-        service = get_object_or_404(Service, pk=pk)
         payment_method = request.POST.get('payment_method')
         
         if payment_method:
-            service.payment_method = payment_method
-            service.payment_date = timezone.now()
-            service.save()
+            with transaction.atomic():
+                # Relê a linha travada: um segundo envio (duas abas) não paga o serviço de novo
+                service = get_object_or_404(Service.objects.select_for_update(), pk=pk)
+                if service.payment_date is None:
+                    service.payment_method = payment_method
+                    service.payment_date = timezone.now()
+                    service.save(update_fields=['payment_method', 'payment_date', 'updated_at'])
+                    apply_service_changes([(None, snapshot_service(service))])
             
             # Redireciona para o caixa do dia em que foi pago
             redirect_url = f"{reverse('barbershop:daily_cashier')}?filter_date={service.payment_date.strftime('%Y-%m-%d')}"
@@ -272,183 +529,489 @@ def mark_as_paid(request, pk):
     return redirect('barbershop:service_list')
 
 
-def _get_filtered_cashier_transactions(request):
-    """Função auxiliar para obter serviços (receitas) E despesas (saídas) filtrados."""
-    
-    filter_date = request.GET.get('filter_date', '').strip()
-    filter_month = request.GET.get('filter_month', '').strip()
-    filter_service_type = request.GET.get('filter_service_type', '').strip()
-    filter_barber = request.GET.get('filter_barber', '').strip()
-    filter_payment_method = request.GET.get('filter_payment_method', '').strip()
-    
-    has_filters = any([filter_date, filter_month, filter_service_type, filter_payment_method, filter_barber])
-    
+@login_required
+@retry_on_lock
+def mark_many_as_paid(request):
+    """
+    Fechamento em lote: registra o pagamento de vários serviços de uma vez.
+    As linhas são travadas (select_for_update) e só as ainda não pagas são alteradas,
+    então dois fechamentos simultâneos não pagam o mesmo serviço duas vezes.
+    """
+    if request.method != 'POST':
+        return redirect('barbershop:service_list')
+
+    payment_method = request.POST.get('payment_method')
+    service_ids = [pk for pk in request.POST.getlist('service_ids') if pk.isdigit()]
+    if payment_method not in PAYMENT_LABELS or not service_ids:
+        return redirect('barbershop:service_list')
+
+    now = timezone.now()
+    with transaction.atomic():
+        services = list(
+            Service.objects.select_for_update().filter(pk__in=service_ids, payment_date__isnull=True)
+        )
+        for service in services:
+            service.payment_method = payment_method
+            service.payment_date = now
+            service.updated_at = now  # bulk_update não aplica o auto_now
+        Service.objects.bulk_update(services, ['payment_method', 'payment_date', 'updated_at'])
+        # Uma única atualização do resumo do caixa para o lote inteiro
+        apply_service_changes([(None, snapshot) for snapshot in snapshot_services(services)])
+
+    redirect_url = f"{reverse('barbershop:daily_cashier')}?filter_date={timezone.localdate(now).strftime('%Y-%m-%d')}"
+    return redirect(redirect_url)
+
+
+# Parâmetros de filtro aceitos pelo caixa e pela exportação
+CASHIER_FILTER_KEYS = [
+    'filter_date', 'filter_month', 'filter_start', 'filter_end',
+    'filter_service_type', 'filter_barber', 'filter_payment_method',
+]
+
+
+def _parse_iso_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _get_cashier_filters(request):
+    """
+    Normaliza os filtros do caixa. Devolve os parâmetros brutos (para o template) e um
+    dicionário com o período (datas inclusivas, None = sem limite) e os filtros de serviço.
+    """
+    params = {key: request.GET.get(key, '').strip() for key in CASHIER_FILTER_KEYS}
+
+    filters = {
+        'start': None,
+        'end': None,
+        'service_type': params['filter_service_type'] if params['filter_service_type'].isdigit() else '',
+        'barber': params['filter_barber'] if params['filter_barber'].isdigit() else '',
+        'payment_method': params['filter_payment_method'],
+    }
+
+    if not any(params.values()):
+        # Padrão: receitas e despesas de hoje
+        filters['start'] = filters['end'] = timezone.localdate()
+    elif params['filter_date']:
+        filters['start'] = filters['end'] = _parse_iso_date(params['filter_date'])
+    elif params['filter_month']:
+        try:
+            year, month = map(int, params['filter_month'].split('-'))
+            filters['start'] = date(year, month, 1)
+            filters['end'] = date(year, month, monthrange(year, month)[1])
+        except ValueError:
+            pass
+    else:
+        # Intervalo livre De/Até (qualquer um dos lados pode ficar em branco)
+        filters['start'] = _parse_iso_date(params['filter_start'])
+        filters['end'] = _parse_iso_date(params['filter_end'])
+
+    return params, filters
+
+
+def _cashier_sources(filters):
+    """
+    Monta os QuerySets de receitas (serviços pagos) e despesas para os filtros normalizados.
+    As receitas vêm em uma lista: Service e, se o período alcançar o arquivo, ArchivedService.
+    """
+    # Aplica Filtros de Data como intervalos semiabertos de timestamps locais, sem
+    # funções sobre a coluna (payment_date__date etc.), para aproveitar os índices
+    lower, upper = local_day_range(filters['start'], filters['end'])
+
     # Base Query para RECEITAS (Serviços Pagos)
-    services_query = Service.objects.prefetch_related('service_types').select_related('barber').filter(payment_date__isnull=False)
+    services_queries = [Service.objects.filter(payment_date__isnull=False)]
+    if reaches_archive(lower):
+        services_queries.append(ArchivedService.objects.all())
+    services_queries = [_filter_services(query, filters, lower, upper) for query in services_queries]
+
     # Base Query para DESPESAS
     expenses_query = Expense.objects.all()
+    if lower:
+        expenses_query = expenses_query.filter(expense_date__gte=filters['start'])
+    if upper:
+        expenses_query = expenses_query.filter(expense_date__lte=filters['end'])
 
-    # Aplica Filtros de Data
-    if has_filters:
-        if filter_date:
-            services_query = services_query.filter(payment_date__date=filter_date)
-            expenses_query = expenses_query.filter(expense_date=filter_date)
-        elif filter_month:
-            try:
-                year, month = map(int, filter_month.split('-'))
-                services_query = services_query.filter(payment_date__year=year, payment_date__month=month)
-                expenses_query = expenses_query.filter(expense_date__year=year, expense_date__month=month)
-            except ValueError:
-                pass
-        
-        # Filtros de Serviço/Pagamento/Barbeiro só se aplicam a serviços
-        if filter_service_type:
-            services_query = services_query.filter(service_types__id=filter_service_type)
+    return services_queries, expenses_query
+
+
+def _cashier_querysets(filters):
+    """_cashier_sources() devolvendo linhas (namedtuple) só com as colunas usadas pelo caixa."""
+    services_queries, expenses_query = _cashier_sources(filters)
+    services_queries = [
+        query.annotate(barber_name=F('barber__username')).values_list(*SERVICE_ROW_FIELDS, named=True)
+        for query in services_queries
+    ]
+    return services_queries, expenses_query.values_list(*EXPENSE_ROW_FIELDS, named=True)
+
+
+def _filter_services(services_query, filters, lower, upper):
+    if lower:
+        services_query = services_query.filter(payment_date__gte=lower)
+    if upper:
+        services_query = services_query.filter(payment_date__lt=upper)
+
+    # Filtros de Serviço/Pagamento/Barbeiro só se aplicam a serviços
+    if filters['service_type']:
+        services_query = services_query.filter(service_types__id=filters['service_type'])
+
+    if filters['barber']:
+        services_query = services_query.filter(barber_id=filters['barber'])
+
+    if filters['payment_method']:
+        services_query = services_query.filter(payment_method=filters['payment_method'])
+
+    return services_query
+
+
+def _get_filtered_cashier_transactions(request):
+    """Função auxiliar para obter serviços (receitas) E despesas (saídas) filtrados."""
+    _, filters = _get_cashier_filters(request)
+    return _cashier_querysets(filters) # Retorna as receitas (lista de QuerySets) e as despesas
+
+
+def _get_cashier_totals(filters):
+    """Totais do caixa lidos do resumo diário pré-agregado (sem varrer os lançamentos)."""
+    totals = get_cashier_totals(
+        filters['start'],
+        filters['end'],
+        barber_id=filters['barber'] or None,
+        payment_method=filters['payment_method'] or None,
+        service_type_id=filters['service_type'] or None,
+    )
+    totals['total_value'] = totals['total_income'] - totals['total_outcome']
+    return totals
+
+
+def _expense_sort_time(expense_date):
+    """Cria um datetime para ordenação uniforme das despesas com as receitas."""
+    return timezone.make_aware(datetime.combine(expense_date, datetime.min.time()))
+
+
+def _service_transaction(s):
+    # Formata Receitas (valor positivo); `s` é uma linha de SERVICE_ROW_FIELDS
+    return Transaction(
+        description=f"Receita: {s.client_name} - {s.service_types_label}",
+        value=s.price,
+        is_expense=False,
+        barber=s.barber_name or 'N/A',
+        payment_method=PAYMENT_LABELS.get(s.payment_method, s.payment_method),
+        date=s.payment_date.date(),
+        sort_time=s.payment_date,
+        # Chave de ordenação/paginação: (data/hora, tipo, id); receitas antes das despesas no empate
+        sort_key=(s.payment_date, 1, s.id),
+    )
+
+
+def _expense_transaction(e):
+    # Formata Despesas (valor negativo); `e` é uma linha de EXPENSE_ROW_FIELDS
+    sort_time = _expense_sort_time(e.expense_date)
+    return Transaction(
+        description=f"DESPESA: {e.description}",
+        value=-e.value, # Valor negativo
+        is_expense=True,
+        barber='N/A',
+        payment_method='N/A',
+        date=e.expense_date,
+        sort_time=sort_time,
+        sort_key=(sort_time, 0, e.id),
+    )
+
+
+# Cursor do caixa: (data/hora, tipo: 0 despesa / 1 receita, id), como sort_key
+CASHIER_CURSOR_TYPES = (datetime, frozenset({0, 1}), int)
+
+
+def _services_after(sort_time, kind, pk):
+    """Receitas que vêm depois do cursor (data/hora, tipo, id) na ordem decrescente."""
+    if kind == 1:
+        return Q(payment_date__lt=sort_time) | Q(payment_date=sort_time, id__lt=pk)
+    return Q(payment_date__lt=sort_time)
+
+
+def _expenses_after(sort_time, kind, pk):
+    """Despesas que vêm depois do cursor; a data/hora de uma despesa é a meia-noite do seu dia."""
+    day = timezone.localdate(sort_time)
+    if sort_time != local_day_start(day):
+        return Q(expense_date__lte=day)
+    same_day = Q(expense_date=day) if kind == 1 else Q(expense_date=day, id__lt=pk)
+    return Q(expense_date__lt=day) | same_day
+
+
+def _cashier_page_querysets(services_queries, expenses_query, cursor, page_size=CASHIER_PAGE_SIZE):
+    """
+    Consultas de uma página da lista de transações: cada fonte busca no máximo
+    page_size + 1 linhas a partir do cursor, usando os índices de data.
+    """
+    values = decode_cursor(cursor, CASHIER_CURSOR_TYPES)
+    if values is not None:
+        services_queries = [query.filter(_services_after(*values)) for query in services_queries]
+        expenses_query = expenses_query.filter(_expenses_after(*values))
+    return (
+        [query.order_by('-payment_date', '-id')[:page_size + 1] for query in services_queries],
+        expenses_query.order_by('-expense_date', '-id')[:page_size + 1],
+    )
+
+
+def _merge_cashier_page(services, expenses, page_size=CASHIER_PAGE_SIZE):
+    """Combina e ordena todas as transações (Receitas e Despesas) por (data/hora, tipo, id) decrescente."""
+    transactions = sorted(
+        [_service_transaction(s) for s in services] + [_expense_transaction(e) for e in expenses],
+        key=attrgetter('sort_key'),
+        reverse=True,
+    )
+
+    next_cursor = None
+    if len(transactions) > page_size:
+        transactions = transactions[:page_size]
+        next_cursor = encode_cursor(transactions[-1].sort_key)
+    return KeysetPage(transactions, next_cursor)
+
+
+def _cashier_page(services_queries, expenses_query, cursor, page_size=CASHIER_PAGE_SIZE):
+    """Uma página da lista combinada de transações, a partir do cursor."""
+    services_pages, expenses = _cashier_page_querysets(services_queries, expenses_query, cursor, page_size)
+    services = [service for page in services_pages for service in page]
+    return _merge_cashier_page(services, expenses, page_size)
+
+
+def _cashier_context(request, params, report, service_types, barbers):
+    """Contexto do template do caixa (compartilhado pelas versões síncrona e assíncrona)."""
+    totals = report['totals']
+
+    # Parâmetros de filtro sem o cursor (para exportação e links de paginação)
+    filter_query = request.GET.copy()
+    filter_query.pop('cursor', None)
+
+    return {
+        'transactions': report['transactions'], # Nova lista combinada (página atual)
+        'next_cursor': report['next_cursor'],
+        'is_first_page': not request.GET.get('cursor'),
+        'total_value': totals['total_value'],       # Total Líquido
+        'total_income': totals['total_income'],     # Total de Receitas
+        'total_outcome': totals['total_outcome'],   # Total de Despesas
+        'total_services': totals['total_services'], # Total de serviços (agora só conta receitas)
+
+        'service_types': service_types,
+        'barbers': barbers,
+        'payment_methods': PAYMENT_CHOICES,
+
+        'query_params': filter_query.urlencode(),
+        **params,
+        'has_filters': any(params.values()),
+    }
 
-        if filter_barber:
-            services_query = services_query.filter(barber_id=filter_barber)
-        
-        if filter_payment_method:
-            services_query = services_query.filter(payment_method=filter_payment_method)
-    else:
-        # Padrão: receitas e despesas de hoje
-        today = timezone.now().date()
-        services_query = services_query.filter(payment_date__date=today)
-        expenses_query = expenses_query.filter(expense_date=today)
 
-    return services_query, expenses_query # Retorna dois QuerySets
+def _cashier_validator_sources(request):
+    _, filters = _get_cashier_filters(request)
+    services_queries, expenses_query = _cashier_sources(filters)
+    # Serviços arquivados não mudam: basta a quantidade (e quando foram arquivados)
+    return [
+        *(_source_state(query, 'updated_at' if query.model is Service else 'archived_at') for query in services_queries),
+        _source_state(expenses_query),
+    ]
+
+
+def _cashier_etag(request):
+    return _page_validator(request, _cashier_validator_sources)[0]
+
+
+def _cashier_last_modified(request):
+    return _page_validator(request, _cashier_validator_sources)[1]
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_cashier_etag, last_modified_func=_cashier_last_modified)
 def daily_cashier(request):
     
+    params, filters = _get_cashier_filters(request)
+
     # Obtém Receitas (services) e Despesas (expenses)
-    services_query, expenses_query = _get_filtered_cashier_transactions(request)
-
-    # 1. Cálculo de Totais
-    income_aggregation = services_query.aggregate(total_income=Sum('price'), total_services=Count('id'))
-    total_income = income_aggregation.get('total_income') or 0
-    total_services = income_aggregation.get('total_services') or 0
-
-    outcome_aggregation = expenses_query.aggregate(total_outcome=Sum('value'))
-    total_outcome = outcome_aggregation.get('total_outcome') or 0
-
-    # Total Líquido (Receitas - Despesas)
-    final_total_value = total_income - total_outcome
-
-    # 2. Combinação e Formatação para Display
-    # Formata Receitas (valor positivo)
-    services_list = [{
-        'description': f"Receita: {s.client_name} - {', '.join([st.name for st in s.service_types.all()])}",
-        'value': s.price,
-        'is_expense': False,
-        'barber': s.barber.username if s.barber else 'N/A',
-        'payment_method': s.get_payment_method_display(),
-        'date': s.payment_date.date(),
-        'sort_time': s.payment_date 
-    } for s in services_query]
-
-    # Formata Despesas (valor negativo)
-    expenses_list = [{
-        'description': f"DESPESA: {e.description}",
-        'value': -e.value, # Valor negativo
-        'is_expense': True,
-        'barber': 'N/A',
-        'payment_method': 'N/A',
-        'date': e.expense_date,
-        # Cria um datetime para ordenação uniforme com as receitas
-        'sort_time': timezone.make_aware(datetime.combine(e.expense_date, datetime.min.time())) 
-    } for e in expenses_query]
-    
-    # Combina e ordena todas as transações (Receitas e Despesas) pela data/hora
-    transactions_list = services_list + expenses_list
-    transactions_list.sort(key=lambda x: x['sort_time'], reverse=True)
+    services_queries, expenses_query = _cashier_querysets(filters)
 
-    context = {
-        'transactions': transactions_list, # Nova lista combinada
-        'total_value': final_total_value, # Total Líquido
-        'total_income': total_income,     # Total de Receitas
-        'total_outcome': total_outcome,   # Total de Despesas
-        'total_services': total_services, # Total de serviços (agora só conta receitas)
-        
-        'service_types': ServiceType.objects.all().order_by('name'),
-        'barbers': User.objects.all().order_by('username'),
-        'payment_methods': PAYMENT_CHOICES,
-        
-        'query_params': request.GET.urlencode(),
-        'filter_date': request.GET.get('filter_date', '').strip(),
-        'filter_month': request.GET.get('filter_month', '').strip(),
-        'filter_service_type': request.GET.get('filter_service_type', '').strip(),
-        'filter_barber': request.GET.get('filter_barber', '').strip(),
-        'filter_payment_method': request.GET.get('filter_payment_method', '').strip(),
-        'has_filters': any([request.GET.get(key) for key in ['filter_date', 'filter_month', 'filter_service_type', 'filter_barber', 'filter_payment_method']]),
-    }
+    cursor = request.GET.get('cursor')
+
+    def build_report():
+        # 1. Cálculo de Totais (a partir do resumo diário)
+        totals = _get_cashier_totals(filters)
+        # 2. Página atual da lista combinada (Receitas e Despesas), por cursor
+        page = _cashier_page(services_queries, expenses_query, cursor)
+        return {'totals': totals, 'transactions': page.items, 'next_cursor': page.next_cursor}
+
+    # Relatório em cache por filtros + geração de cada dia do período
+    report = cached_report(filters, cursor, build_report)
+
+    barbers = User.objects.all().order_by('username')
+    context = _cashier_context(request, params, report, get_catalog(), barbers)
     return render(request, 'barbershop/daily_cashier.html', context)
 
 
+class _Echo:
+    """Pseudo-buffer para o csv.writer: devolve a linha em vez de guardá-la (streaming)."""
+    def write(self, value):
+        return value
+
+
+def _format_brl(value):
+    return str(value).replace('.', ',')
+
+
+class _CashierCsv:
+    """Formata as linhas do CSV do caixa e acumula os totais durante a passada."""
+
+    def __init__(self):
+        self.writer = csv.writer(_Echo(), delimiter=';')
+        self.total_income = Decimal('0')
+        self.total_outcome = Decimal('0')
+
+    def header(self):
+        return '\ufeff' + self.writer.writerow(['Data/Hora', 'Tipo', 'Descrição', 'Barbeiro', 'Forma Pag.', 'Valor (R$)'])
+
+    def service_row(self, s):
+        self.total_income += s.price
+        return self.writer.writerow([
+            s.payment_date.strftime('%d/%m/%Y %H:%M'),
+            'RECEITA',
+            f"{s.client_name} - {s.service_types_label}",
+            s.barber_name or 'N/A',
+            PAYMENT_LABELS.get(s.payment_method, s.payment_method),
+            _format_brl(s.price),
+        ])
+
+    def expense_row(self, e):
+        self.total_outcome += e.value
+        return self.writer.writerow([
+            e.expense_date.strftime('%d/%m/%Y'),
+            'DESPESA',
+            e.description,
+            'N/A',
+            'N/A',
+            _format_brl(-e.value),  # Valor negativo para despesas
+        ])
+
+    def summary(self):
+        # Adiciona as linhas de resumo
+        return ''.join([
+            self.writer.writerow([]),
+            self.writer.writerow(['', '', '', '', 'Total Receitas', _format_brl(self.total_income)]),
+            self.writer.writerow(['', '', '', '', 'Total Despesas', _format_brl(self.total_outcome)]),
+            self.writer.writerow(['', '', '', '', 'Total Líquido', _format_brl(self.total_income - self.total_outcome)]),
+        ])
+
+
+def _iter_cashier_csv(services_queries, expenses_query):
+    """
+    Gera as linhas do CSV do caixa sem materializar as transações em memória.
+
+    Receitas (de cada fonte) e despesas são lidas com iteradores do banco já ordenados
+    da mais recente para a mais antiga e intercaladas sob demanda (heapq.merge). Os
+    totais são acumulados na mesma passada e escritos ao final.
+    """
+    rows = _CashierCsv()
+    yield rows.header()
+
+    services = [
+        ((s.payment_date, False, s) for s in query.order_by('-payment_date', '-id').iterator(chunk_size=CSV_CHUNK_SIZE))
+        for query in services_queries
+    ]
+    expenses = expenses_query.order_by('-expense_date', '-id').iterator(chunk_size=CSV_CHUNK_SIZE)
+
+    transactions = heapq.merge(
+        *services,
+        ((_expense_sort_time(e.expense_date), True, e) for e in expenses),
+        key=itemgetter(0),
+        reverse=True,
+    )
+
+    for sort_time, is_expense, obj in transactions:
+        yield rows.expense_row(obj) if is_expense else rows.service_row(obj)
+
+    yield rows.summary()
+
+
 @login_required
 def export_cashier_csv(request):
-    response = HttpResponse(content_type='text/csv')
+    """Exporta o caixa filtrado em CSV, enviando as linhas à medida que são lidas do banco."""
+    # Obtém Receitas e Despesas
+    services_queries, expenses_query = _get_filtered_cashier_transactions(request)
+
+    response = StreamingHttpResponse(
+        _iter_cashier_csv(services_queries, expenses_query),
+        content_type='text/csv; charset=utf-8',
+    )
     response['Content-Disposition'] = f'attachment; filename="caixa_{timezone.now().strftime("%Y-%m-%d")}.csv"'
-    
-    response.write('\ufeff'.encode('utf8'))
+    return response
 
-    writer = csv.writer(response, delimiter=';')
-    writer.writerow(['Data/Hora', 'Tipo', 'Descrição', 'Barbeiro', 'Forma Pag.', 'Valor (R$)'])
 
-    # Obtém Receitas e Despesas
-    services_query, expenses_query = _get_filtered_cashier_transactions(request)
-    
-    transactions_list = []
-
-    # 1. Formata Receitas
-    for s in services_query:
-        transactions_list.append({
-            'sort_time': s.payment_date,
-            'data_hora': s.payment_date.strftime('%d/%m/%Y %H:%M'),
-            'tipo': 'RECEITA',
-            'descricao': f"{s.client_name} - {', '.join([st.name for st in s.service_types.all()])}",
-            'barbeiro': s.barber.username if s.barber else 'N/A',
-            'pagamento': s.get_payment_method_display(),
-            'valor': s.price
-        })
-
-    # 2. Formata Despesas
-    for e in expenses_query:
-        transactions_list.append({
-            'sort_time': timezone.make_aware(datetime.combine(e.expense_date, datetime.min.time())),
-            'data_hora': e.expense_date.strftime('%d/%m/%Y'),
-            'tipo': 'DESPESA',
-            'descricao': e.description,
-            'barbeiro': 'N/A',
-            'pagamento': 'N/A',
-            'valor': -e.value # Valor negativo para despesas
-        })
-
-    # Ordena todas as transações (Receitas e Despesas)
-    transactions_list.sort(key=lambda x: x['sort_time'], reverse=True)
-
-    # Calcula os totais
-    total_income = services_query.aggregate(total=Sum('price'))['total'] or 0
-    total_outcome = expenses_query.aggregate(total=Sum('value'))['total'] or 0
-    final_total_value = total_income - total_outcome
-
-    # Escreve as linhas de transação
-    for t in transactions_list:
-        writer.writerow([
-            t['data_hora'],
-            t['tipo'],
-            t['descricao'],
-            t['barbeiro'],
-            t['pagamento'],
-            # Formata o valor, garantindo o sinal de menos para despesas
-            str(t['valor']).replace('.', ',') 
-        ])
-    
-    # Adiciona as linhas de resumo
-    writer.writerow([])
-    writer.writerow(['', '', '', '', 'Total Receitas', str(total_income).replace('.', ',')])
-    writer.writerow(['', '', '', '', 'Total Despesas', str(total_outcome).replace('.', ',')])
-    writer.writerow(['', '', '', '', 'Total Líquido', str(final_total_value).replace('.', ',')])
+@login_required
+def revenue_report(request):
+    """Faturamento por período e barbeiro/tipo de serviço, comparado ao período anterior (ver analytics.py)."""
+    today = timezone.localdate()
+    start = _parse_iso_date(request.GET.get('filter_start', '')) or today.replace(day=1)
+    end = _parse_iso_date(request.GET.get('filter_end', '')) or today
+    if end < start:
+        start, end = end, start
+    bucket = request.GET.get('bucket', 'day')
+    if bucket not in dict(BUCKETS):
+        bucket = 'day'
+    dimension = request.GET.get('rows', 'barber')
+    if dimension not in dict(DIMENSIONS):
+        dimension = 'barber'
 
-    return response
\ No newline at end of file
+    context = {
+        'report': build_revenue_report(start, end, bucket, dimension),
+        'payment_methods': PAYMENT_CHOICES,
+        'buckets': BUCKETS,
+        'dimensions': DIMENSIONS,
+    }
+    return render(request, 'barbershop/revenue_report.html', context)
+
+
+@login_required
+def payouts(request):
+    """Fechamento e comissão de cada barbeiro no período (ver commissions.py)."""
+    today = timezone.localdate()
+    start = _parse_iso_date(request.GET.get('filter_start', '')) or today.replace(day=1)
+    end = _parse_iso_date(request.GET.get('filter_end', '')) or today
+    if end < start:
+        start, end = end, start
+
+    statements = payout_statements(start, end)
+    context = {
+        'start': start,
+        'end': end,
+        'closed': is_closed(end),
+        'statements': statements,
+        'total_net': sum((statement.net for statement in statements), Decimal('0')),
+        'total_commission': sum((statement.commission for statement in statements), Decimal('0')),
+    }
+    return render(request, 'barbershop/payouts.html', context)
+
+
+@staff_member_required
+def change_feed(request):
+    """
+    Alterações de serviços, despesas e clientes desde `cursor`, em NDJSON (ver changefeed.py).
+    A última linha traz o cursor da próxima chamada.
+    """
+    try:
+        limit = min(max(int(request.GET.get('limit', changefeed.DEFAULT_LIMIT)), 1), changefeed.MAX_LIMIT)
+    except ValueError:
+        limit = changefeed.DEFAULT_LIMIT
+    cursor = request.GET.get('cursor')
+    # Validado antes do streaming: depois do início da resposta não há como devolver 400
+    if cursor and not changefeed.is_valid_cursor(cursor):
+        return JsonResponse({'error': 'Cursor inválido.'}, status=400)
+
+    return StreamingHttpResponse(
+        changefeed.iter_changes(cursor, limit),
+        content_type='application/x-ndjson; charset=utf-8',
+    )
+
+
+@staff_member_required
+def metrics(request):
+    """Histogramas de latência/consultas por view no formato do Prometheus (ver metrics.py)."""
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')